@@ -0,0 +1,71 @@
+"""
+Throughput benchmark for /getbatch/ under concurrent load.
+
+Fires requests from many concurrent clients for a fixed duration and reports
+requests per second and latency percentiles. To compare two versions of the
+cache service, run it once against each build with the same settings, e.g.
+
+    git stash && docker-compose up -d --build cache
+    python benchmarks/bench_getbatch_load.py --concurrency 50
+    git stash pop && docker-compose up -d --build cache
+    python benchmarks/bench_getbatch_load.py --concurrency 50
+
+User ids default to the ones seeded in db/init.sql because
+user_question_store references the users table.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client, url, args, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        payload = {
+            "user_id": random.choice(args.users),
+            "batch_size": len(args.categories),
+            "batch": [{"category": c, "count": args.count} for c in args.categories],
+        }
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json=payload)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(time.perf_counter() - start)
+
+
+async def main(args):
+    latencies = []
+    errors = []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+        deadline = time.perf_counter() + args.duration
+        url = f"{args.url}/getbatch/"
+        await asyncio.gather(*[
+            worker(client, url, args, deadline, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+
+    print(f"concurrency {args.concurrency}, {args.duration}s")
+    print(f"  requests   {len(latencies)} ok, {len(errors)} failed")
+    print(f"  throughput {len(latencies) / args.duration:.1f} req/s")
+    if latencies:
+        ms = sorted(l * 1000 for l in latencies)
+        print(f"  latency    p50 {statistics.median(ms):.1f} ms"
+              f"   p95 {ms[int(len(ms) * 0.95) - 1]:.1f} ms"
+              f"   p99 {ms[int(len(ms) * 0.99) - 1]:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--categories", nargs="+", default=["CAT1", "CAT2"])
+    parser.add_argument("--users", nargs="+", default=[str(i) for i in range(1, 11)])
+    asyncio.run(main(parser.parse_args()))
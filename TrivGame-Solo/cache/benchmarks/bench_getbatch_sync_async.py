@@ -0,0 +1,158 @@
+"""
+Compare /getbatch/ throughput with a blocking and a non-blocking database driver.
+
+Runs the real handler in process, on fakeredis and a stand-in connection that
+answers every query after a fixed latency. In "blocking" mode the latency is
+a time.sleep, which is what psycopg2 calls inside the async handlers did to
+the event loop; in "async" mode it is awaited, as with the asyncpg pool. Every
+request comes from a new user with empty pools, so each one goes through the
+database path. Needs no running services:
+
+    python benchmarks/bench_getbatch_sync_async.py --concurrency 50
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import fakeredis
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import main
+from cachepolicy import UnseenPolicy
+from demand import DemandTracker
+from models import GameBatchResp
+from qstore import QuestionStore
+from seen import make_seen_set
+from singleflight import SingleFlight
+from writebehind import WriteBehindBuffer
+
+
+class LatencyConnection:
+    """
+    Answers every query with ``rows`` after ``latency`` seconds, blocking
+    the event loop or not.
+    """
+    def __init__(self, rows, latency, blocking):
+        self.rows = rows
+        self.latency = latency
+        self.blocking = blocking
+        self.queries = 0
+
+    async def wait(self):
+        self.queries += 1
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, query, *args):
+        await self.wait()
+
+    async def executemany(self, query, args):
+        await self.wait()
+
+    async def fetch(self, query, *args):
+        await self.wait()
+        if "FROM user_question_store" in query:
+            return []
+        return [r for r in self.rows if r["category"] in args]
+
+    async def copy_records_to_table(self, table, records):
+        await self.wait()
+
+
+def question_rows(categories, per_category):
+    return [{
+        "id": f"{cat}-{i}", "category": cat, "hint1": "h1", "hint2": "h2", "hint3": "h3",
+        "answer": "a", "created_at": datetime.datetime(2025, 1, 1),
+        "usage_count": 0, "downvote_count": 0, "random_rank": i / per_category,
+    } for cat in categories for i in range(per_category)]
+
+
+def wire_app(conn):
+    """
+    Point the app's globals at a fresh fakeredis and ``conn``.
+    """
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True, max_connections=10**4)
+
+    @asynccontextmanager
+    async def get_connection():
+        yield conn
+
+    store = QuestionStore(redis_client)
+    main.redis_client = redis_client
+    main.question_store = store
+    main.get_db_connection = get_connection
+    main.DB_SELECT_MODE = "sequential"
+    main.seen_set = make_seen_set(redis_client, "set", 600, 1000, 0.001)
+    main.demand = DemandTracker(redis_client, 3600)
+    main.write_buffer = WriteBehindBuffer(get_connection, 10**6, 5)
+    main.unseen_policy = UnseenPolicy(
+        redis_client, store, idle_ttl=600, max_len=50, memory_budget=2**30,
+        policy="lru", evict_batch=10, sample_size=10
+    )
+    main.getbatch_flight = SingleFlight(
+        redis_client, encode=lambda resp: resp.json(), decode=GameBatchResp.parse_raw,
+        lease_ttl=5, result_ttl=5, poll_interval=0.01
+    )
+
+
+async def run(args, blocking):
+    conn = LatencyConnection(question_rows(args.categories, 50), args.db_latency, blocking)
+    wire_app(conn)
+    latencies = []
+    errors = []
+    users = iter(range(10**9))
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+
+    async def worker(client, deadline):
+        while time.perf_counter() < deadline:
+            payload = {
+                "user_id": f"bench-{next(users)}",
+                "batch_size": len(args.categories),
+                "batch": [{"category": c, "count": args.count} for c in args.categories],
+            }
+            start = time.perf_counter()
+            response = await client.post("/getbatch/", json=payload)
+            (latencies if response.status_code == 200 else errors).append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://cache", timeout=60.0) as client:
+        deadline = time.perf_counter() + args.duration
+        # the handlers log every batch
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.gather(*[worker(client, deadline) for _ in range(args.concurrency)])
+    return latencies, errors, conn.queries
+
+
+def report(mode, args, latencies, errors, queries):
+    ms = sorted(l * 1000 for l in latencies)
+    print(f"{mode:8} {len(latencies) / args.duration:8.1f} req/s"
+          f"   p50 {statistics.median(ms):7.1f} ms"
+          f"   p95 {ms[int(len(ms) * 0.95) - 1]:7.1f} ms"
+          f"   {queries / max(len(latencies), 1):.1f} queries/req"
+          f"   {len(errors)} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--db-latency", type=float, default=0.02, help="seconds per query")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--categories", nargs="+", default=["CAT1", "CAT2"])
+    args = parser.parse_args()
+    print(f"concurrency {args.concurrency}, {args.duration}s per mode, {args.db_latency * 1000:.0f} ms per query")
+    for mode in ("blocking", "async"):
+        report(mode, args, *asyncio.run(run(args, blocking=mode == "blocking")))
@@ -0,0 +1,112 @@
+"""
+Benchmark question selection strategies for one category.
+
+    head:   LIMIT n with no ordering (the original query)
+    random: ORDER BY random() LIMIT n
+    rank:   seek into (category, random_rank) from a random start, wrapping
+
+Reports the time per pick and how many distinct questions a series of picks
+touches, which shows how evenly load spreads over the bank. Uses a temporary
+table, so it can run against the compose database:
+
+    POSTGRES_USER=... POSTGRES_PASSWORD=... POSTGRES_DB=... \
+        python benchmarks/bench_random_selection.py
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+
+import asyncpg
+
+BANK_SIZES = [10_000, 100_000, 1_000_000]
+PICK_SIZE = 10
+PICKS = 200
+CATEGORY = "BENCH"
+
+DB_CONFIG = {
+    "database": os.environ.get("POSTGRES_DB"),
+    "user": os.environ.get("POSTGRES_USER"),
+    "password": os.environ.get("POSTGRES_PASSWORD"),
+    "host": os.environ.get("POSTGRES_HOST", "localhost"),
+    "port": int(os.environ.get("POSTGRES_PORT", 5433)),
+}
+
+HEAD_QUERY = """
+    SELECT id FROM bench_questions
+    WHERE category = $1
+    LIMIT $2
+"""
+
+RANDOM_QUERY = """
+    SELECT id FROM bench_questions
+    WHERE category = $1
+    ORDER BY random()
+    LIMIT $2
+"""
+
+RANK_QUERY = """
+    (SELECT id FROM bench_questions
+    WHERE category = $1 AND random_rank >= $3
+    ORDER BY random_rank
+    LIMIT $2)
+    UNION ALL
+    (SELECT id FROM bench_questions
+    WHERE category = $1 AND random_rank < $3
+    ORDER BY random_rank
+    LIMIT $2)
+"""
+
+
+async def setup_table(conn, size):
+    await conn.execute("DROP TABLE IF EXISTS bench_questions")
+    await conn.execute("""
+        CREATE TEMP TABLE bench_questions (
+            id VARCHAR(255) PRIMARY KEY,
+            category VARCHAR(100) NOT NULL,
+            hint1 TEXT NOT NULL,
+            random_rank DOUBLE PRECISION NOT NULL DEFAULT random()
+        )
+    """)
+    await conn.execute("""
+        INSERT INTO bench_questions (id, category, hint1)
+        SELECT 'q' || i, $1, 'hint' FROM generate_series(1, $2) AS i
+    """, CATEGORY, size)
+    await conn.execute("CREATE INDEX ON bench_questions (category, random_rank)")
+    await conn.execute("ANALYZE bench_questions")
+
+
+async def run(conn, query, with_start):
+    timings = []
+    touched = set()
+    for _ in range(PICKS):
+        args = [CATEGORY, PICK_SIZE] + ([random.random()] if with_start else [])
+        start = time.perf_counter()
+        rows = await conn.fetch(query, *args)
+        timings.append(time.perf_counter() - start)
+        touched.update(r["id"] for r in rows[:PICK_SIZE])
+    return timings, touched
+
+
+async def main():
+    conn = await asyncpg.connect(**DB_CONFIG)
+    try:
+        for size in BANK_SIZES:
+            await setup_table(conn, size)
+            print(f"{size} questions, {PICKS} picks of {PICK_SIZE}")
+            for name, query, with_start in [
+                ("head", HEAD_QUERY, False),
+                ("random", RANDOM_QUERY, False),
+                ("rank", RANK_QUERY, True),
+            ]:
+                timings, touched = await run(conn, query, with_start)
+                ms = [t * 1000 for t in timings]
+                print(f"  {name:<7} median {statistics.median(ms):8.3f} ms"
+                      f"   max {max(ms):8.3f} ms   distinct {len(touched):6d}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
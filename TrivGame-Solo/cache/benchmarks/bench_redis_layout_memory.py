@@ -0,0 +1,122 @@
+"""
+Memory report for the two Redis layouts of per-user unseen lists.
+
+    full:       unseen:{user}:{category} lists of full Question JSON
+    normalized: unseen:{user}:{category} lists of ids, bodies stored once in
+                the qbody hash with a reference count in qbody:refs
+
+Fills an empty Redis database with the same workload in each layout and
+reports used_memory. Needs a scratch database, it refuses to run on a
+non-empty one:
+
+    python benchmarks/bench_redis_layout_memory.py --db 15 --users 100000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from models import Question
+from qstore import BODY_KEY, REFS_KEY
+
+CATEGORIES = ["Geography", "History", "Arts", "People"]
+
+
+def make_bank(size):
+    """
+    Questions with hint and answer lengths similar to generated ones.
+    """
+    bank = []
+    for i in range(size):
+        bank.append(Question(
+            id=f"Article_{i}",
+            category=CATEGORIES[i % len(CATEGORIES)],
+            hint1="This figure was born in a small coastal town and later moved abroad to study.",
+            hint2="They are best known for a series of works completed in the early twentieth century.",
+            hint3="Their most famous piece hangs in a major European museum today.",
+            answer=f"Article {i}",
+            created_at=datetime.datetime(2025, 1, 1),
+            usage_count=0,
+            downvotes=0
+        ))
+    return bank
+
+
+def user_lists(args, bank):
+    """
+    Yield (key, questions) for every user list; popular questions are shared
+    by many users, as when everyone draws from the same category pools.
+    """
+    rng = random.Random(0)
+    by_category = {c: [q for q in bank if q.category == c] for c in CATEGORIES}
+    for user in range(args.users):
+        for cat in rng.sample(CATEGORIES, args.categories_per_user):
+            pool = by_category[cat]
+            hot = pool[:max(args.per_list, len(pool) // 10)]
+            qs = rng.sample(hot, args.per_list)
+            yield f"unseen:{user}:{cat}", qs
+
+
+def fill_full(client, args, bank):
+    pipe = client.pipeline(transaction=False)
+    for i, (key, qs) in enumerate(user_lists(args, bank)):
+        pipe.rpush(key, *[q.json() for q in qs])
+        if i % 5000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def fill_normalized(client, args, bank):
+    pipe = client.pipeline(transaction=False)
+    stored = set()
+    for i, (key, qs) in enumerate(user_lists(args, bank)):
+        for q in qs:
+            if q.id not in stored:
+                pipe.hset(BODY_KEY, q.id, q.json())
+                stored.add(q.id)
+            pipe.hincrby(REFS_KEY, q.id, 1)
+        pipe.rpush(key, *[q.id for q in qs])
+        if i % 5000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def measure(client, fill, args, bank):
+    client.flushdb()
+    base = client.info("memory")["used_memory"]
+    fill(client, args, bank)
+    used = client.info("memory")["used_memory"] - base
+    client.flushdb()
+    return used
+
+
+def main(args):
+    client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    if client.dbsize():
+        sys.exit(f"Redis db {args.db} is not empty, pick a scratch database")
+
+    bank = make_bank(args.bank_size)
+    entries = args.users * args.categories_per_user * args.per_list
+    print(f"{args.users} users, {entries} list entries, {args.bank_size} distinct questions")
+    results = {}
+    for name, fill in [("full", fill_full), ("normalized", fill_normalized)]:
+        results[name] = measure(client, fill, args, bank)
+        print(f"  {name:<11} {results[name] / 2**20:9.1f} MiB"
+              f"   {results[name] / entries:7.1f} B/entry")
+    print(f"  normalized uses {results['normalized'] / results['full']:.1%} of full")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--categories-per-user", type=int, default=2)
+    parser.add_argument("--per-list", type=int, default=7)
+    parser.add_argument("--bank-size", type=int, default=10_000)
+    main(parser.parse_args())
@@ -0,0 +1,189 @@
+"""
+Benchmark the /getbatch/ database miss path for a heavy player.
+
+Compares the old user_question_store anti-join against candidate paging
+filtered through the Redis seen set, at 10k, 100k and 1M seen rows. Pages
+double up to MAX_CANDIDATE_PAGE for at most MAX_CANDIDATE_ROUNDS rounds, as
+in fetch_unseen_candidates in main.py, and the report counts the runs left
+short. Every run scans from the head of the index, the worst case for
+sequential mode, which otherwise resumes where the user's last scan stopped.
+Uses temporary tables, so it can run against the compose database without
+touching real data.
+
+Run from the cache directory with the compose stack up:
+
+    POSTGRES_USER=... POSTGRES_PASSWORD=... POSTGRES_DB=... \
+        python benchmarks/bench_seen_miss_path.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import asyncpg
+import redis.asyncio as redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from seen import make_seen_set, SEEN_READY_KEY
+
+SEEN_SIZES = [10_000, 100_000, 1_000_000]
+UNSEEN_PER_CATEGORY = 1_000
+FETCH_COUNT = 10
+CANDIDATE_FACTOR = 2 # SEEN_CANDIDATE_FACTOR
+MAX_CANDIDATE_ROUNDS = 10 # SEEN_MAX_CANDIDATE_ROUNDS
+MAX_CANDIDATE_PAGE = 1000 # SEEN_MAX_CANDIDATE_PAGE
+REPEATS = 20
+USER_ID = "bench-user"
+CATEGORY = "BENCH"
+
+DB_CONFIG = {
+    "database": os.environ.get("POSTGRES_DB"),
+    "user": os.environ.get("POSTGRES_USER"),
+    "password": os.environ.get("POSTGRES_PASSWORD"),
+    "host": os.environ.get("POSTGRES_HOST", "localhost"),
+    "port": int(os.environ.get("POSTGRES_PORT", 5433)),
+}
+REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+
+ANTI_JOIN_QUERY = """
+    SELECT * FROM bench_questions q
+    LEFT JOIN bench_user_question_store uqs
+        ON q.id = uqs.question_id
+        AND uqs.user_id = $1
+    WHERE uqs.question_id IS NULL
+        AND q.category = $2
+    LIMIT $3
+"""
+
+CANDIDATE_QUERY = """
+    SELECT * FROM bench_questions
+    WHERE category = $1 AND id > $2
+    ORDER BY id
+    LIMIT $3
+"""
+
+
+async def setup_tables(conn, seen_count):
+    """
+    Create a question bank where the user has seen ``seen_count`` questions,
+    spread at random through the category, plus some unseen ones.
+    """
+    total = seen_count + UNSEEN_PER_CATEGORY
+    await conn.execute("DROP TABLE IF EXISTS bench_user_question_store, bench_questions")
+    await conn.execute("""
+        CREATE TEMP TABLE bench_questions (
+            id VARCHAR(255) PRIMARY KEY,
+            category VARCHAR(100) NOT NULL,
+            hint1 TEXT NOT NULL,
+            hint2 TEXT NOT NULL,
+            hint3 TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            usage_count INT DEFAULT 0,
+            downvote_count INT DEFAULT 0
+        )
+    """)
+    await conn.execute("""
+        INSERT INTO bench_questions (id, category, hint1, hint2, hint3, answer)
+        SELECT 'q' || lpad(i::text, 8, '0'), $1, 'h1', 'h2', 'h3', 'ans'
+        FROM generate_series(1, $2) AS i
+    """, CATEGORY, total)
+    await conn.execute("CREATE INDEX ON bench_questions (category, id)")
+    await conn.execute("""
+        CREATE TEMP TABLE bench_user_question_store (
+            user_id VARCHAR(255),
+            question_id VARCHAR(255),
+            PRIMARY KEY (user_id, question_id)
+        )
+    """)
+    await conn.execute("""
+        INSERT INTO bench_user_question_store (user_id, question_id)
+        SELECT $1, id FROM bench_questions ORDER BY random() LIMIT $2
+    """, USER_ID, seen_count)
+    await conn.execute("ANALYZE bench_questions")
+    await conn.execute("ANALYZE bench_user_question_store")
+
+
+async def time_anti_join(conn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        await conn.fetch(ANTI_JOIN_QUERY, USER_ID, CATEGORY, FETCH_COUNT)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def time_candidates(conn, seen_set):
+    """
+    Time paging as shipped: up to MAX_CANDIDATE_ROUNDS pages, each twice the
+    size of the last up to MAX_CANDIDATE_PAGE.
+
+    Returns
+    -------
+    (timings, short) : tuple
+        Seconds per run, and the number of runs the pages left short.
+    """
+    timings = []
+    short = 0
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        found = []
+        last_id = ""
+        page_size = FETCH_COUNT * CANDIDATE_FACTOR
+        for _ in range(MAX_CANDIDATE_ROUNDS):
+            if len(found) >= FETCH_COUNT:
+                break
+            page = await conn.fetch(CANDIDATE_QUERY, CATEGORY, last_id, page_size)
+            if not page:
+                break
+            last_id = page[-1][0]
+            found.extend(await seen_set.filter_unseen(USER_ID, [r[0] for r in page]))
+            page_size = min(page_size * 2, MAX_CANDIDATE_PAGE)
+        if len(found) < FETCH_COUNT:
+            short += 1
+        timings.append(time.perf_counter() - start)
+    return timings, short
+
+
+async def hydrate(conn, seen_set):
+    start = time.perf_counter()
+    rows = await conn.fetch(
+        "SELECT question_id FROM bench_user_question_store WHERE user_id = $1",
+        USER_ID
+    )
+    ids = [r[0] for r in rows]
+    for i in range(0, len(ids), 10_000):
+        await seen_set.hydrate(USER_ID, ids[i:i + 10_000])
+    return time.perf_counter() - start
+
+
+def report(name, timings):
+    ms = [t * 1000 for t in timings]
+    print(f"  {name:<22} median {statistics.median(ms):8.2f} ms   max {max(ms):8.2f} ms")
+
+
+async def main():
+    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    conn = await asyncpg.connect(**DB_CONFIG)
+    try:
+        for seen_count in SEEN_SIZES:
+            print(f"{seen_count} seen rows")
+            await setup_tables(conn, seen_count)
+            report("anti-join", await time_anti_join(conn))
+            for mode in ["set", "bloom"]:
+                seen_set = make_seen_set(redis_client, mode, 600, max(seen_count, 1), 0.001)
+                await redis_client.delete(seen_set._key(USER_ID), SEEN_READY_KEY.format(user_id=USER_ID))
+                print(f"  {mode} hydrate once       {await hydrate(conn, seen_set) * 1000:8.2f} ms")
+                timings, short = await time_candidates(conn, seen_set)
+                report(f"candidates + {mode}", timings)
+                print(f"  {'':<22} {short}/{REPEATS} runs short after {MAX_CANDIDATE_ROUNDS} pages")
+                await redis_client.delete(seen_set._key(USER_ID), SEEN_READY_KEY.format(user_id=USER_ID))
+    finally:
+        await conn.close()
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,220 @@
+import time
+
+from qstore import BODY_KEY, REFS_KEY
+
+UNSEEN_KEY = "unseen:{user_id}:{category}"
+UNSEEN_KEYS_KEY = "unseenkeys:{user_id}"
+UNSEEN_LRU_KEY = "unseenidx:lru"
+UNSEEN_LFU_KEY = "unseenidx:lfu"
+
+
+class UnseenPolicy:
+    """
+    Keeps the per-user unseen:* lists bounded.
+
+    Each user's list keys are tracked in ``unseenkeys:{user_id}`` and their
+    last access time and access count in the ``unseenidx:lru`` and
+    ``unseenidx:lfu`` sorted sets. Users idle for longer than ``idle_ttl``
+    are released, and when the estimated memory of the lists plus the
+    shared question bodies goes over ``memory_budget``, the least recently
+    (or least frequently) used users are released first. Releasing goes
+    through the QuestionStore so body reference counts stay correct, which
+    is why plain Redis key expiry is not used.
+
+    Attributes
+    ----------
+    redis_client : redis.asyncio.Redis
+        The Redis client to use.
+    question_store : QuestionStore
+        Store used to release lists and their body references.
+    idle_ttl : int
+        Seconds without access after which a user's lists are released.
+    max_len : int
+        Maximum length of a single unseen list.
+    memory_budget : int
+        Bytes allowed for unseen lists and question bodies.
+    policy : str
+        "lru" or "lfu", the order in which users are evicted over budget.
+    evict_batch : int
+        Users released per round.
+    sample_size : int
+        Users sampled to estimate memory per user.
+    """
+    def __init__(self, redis_client, question_store, idle_ttl, max_len,
+                 memory_budget, policy, evict_batch, sample_size):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.redis_client = redis_client
+        self.question_store = question_store
+        self.idle_ttl = idle_ttl
+        self.max_len = max_len
+        self.memory_budget = memory_budget
+        self.policy = policy
+        self.evict_batch = evict_batch
+        self.sample_size = sample_size
+
+    def list_key(self, user_id, category):
+        return UNSEEN_KEY.format(user_id=user_id, category=category)
+
+    async def touch(self, user_id):
+        """
+        Record an access to the user's lists.
+        """
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(UNSEEN_LRU_KEY, {user_id: time.time()})
+            pipe.zincrby(UNSEEN_LFU_KEY, 1, user_id)
+            await pipe.execute()
+
+    async def push(self, user_id, questions_by_category):
+        """
+        Append questions to the user's lists, capped at ``max_len`` each.
+        """
+        keys_key = UNSEEN_KEYS_KEY.format(user_id=user_id)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            for cat, qs in questions_by_category.items():
+                list_key = self.list_key(user_id, cat)
+                await self.question_store.push(list_key, qs, max_len=self.max_len, client=pipe)
+                pipe.sadd(keys_key, list_key)
+            pipe.zadd(UNSEEN_LRU_KEY, {user_id: time.time()})
+            await pipe.execute()
+
+    async def list_keys(self, category):
+        """
+        The unseen list of every tracked user that has one for ``category``.
+        """
+        users = await self.redis_client.zrange(UNSEEN_LRU_KEY, 0, -1)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for user_id in users:
+                pipe.sismember(UNSEEN_KEYS_KEY.format(user_id=user_id), self.list_key(user_id, category))
+            held = await pipe.execute()
+        return [self.list_key(u, category) for u, h in zip(users, held) if h]
+
+    async def release_user(self, user_id):
+        await self.question_store.release_set(UNSEEN_KEYS_KEY.format(user_id=user_id))
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zrem(UNSEEN_LRU_KEY, user_id)
+            pipe.zrem(UNSEEN_LFU_KEY, user_id)
+            await pipe.execute()
+
+    async def evict_idle(self):
+        """
+        Release users whose lists have not been accessed for ``idle_ttl``.
+
+        Returns
+        -------
+        evicted : int
+            The number of users released.
+        """
+        evicted = 0
+        cutoff = time.time() - self.idle_ttl
+        while True:
+            users = await self.redis_client.zrangebyscore(
+                UNSEEN_LRU_KEY, "-inf", cutoff, start=0, num=self.evict_batch
+            )
+            if not users:
+                return evicted
+            for user_id in users:
+                await self.release_user(user_id)
+            evicted += len(users)
+
+    async def usage(self):
+        """
+        Estimate the memory used by unseen lists and question bodies.
+
+        Returns
+        -------
+        usage : dict
+            Number of users, estimated bytes of their lists and of the bodies.
+        """
+        users = await self.redis_client.zcard(UNSEEN_LRU_KEY)
+        sample = await self.redis_client.zrandmember(UNSEEN_LRU_KEY, self.sample_size) or []
+        per_user = 0
+        if sample:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for user_id in sample:
+                    pipe.smembers(UNSEEN_KEYS_KEY.format(user_id=user_id))
+                key_sets = await pipe.execute()
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for user_id, keys in zip(sample, key_sets):
+                    pipe.memory_usage(UNSEEN_KEYS_KEY.format(user_id=user_id))
+                    for key in keys:
+                        pipe.memory_usage(key)
+                sizes = await pipe.execute()
+            per_user = sum(size or 0 for size in sizes) / len(sample)
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.memory_usage(BODY_KEY)
+            pipe.memory_usage(REFS_KEY)
+            body_bytes, refs_bytes = await pipe.execute()
+        return {
+            "users": users,
+            "list_bytes": int(per_user * users),
+            "body_bytes": (body_bytes or 0) + (refs_bytes or 0),
+        }
+
+    async def age_scores(self):
+        """
+        Halve the access counts in ``unseenidx:lfu``, so users that were busy
+        a long time ago do not outrank users active now.
+        """
+        await self.redis_client.zunionstore(UNSEEN_LFU_KEY, {UNSEEN_LFU_KEY: 0.5})
+
+    async def enforce_budget(self):
+        """
+        Age the access counts, then release users, coldest first, until usage
+        is within ``memory_budget`` or no users are left.
+
+        Returns
+        -------
+        evicted : int
+            The number of users released.
+        """
+        await self.age_scores()
+        evicted = 0
+        index_key = UNSEEN_LRU_KEY if self.policy == "lru" else UNSEEN_LFU_KEY
+        while True:
+            usage = await self.usage()
+            if usage["list_bytes"] + usage["body_bytes"] <= self.memory_budget:
+                return evicted
+            users = await self.redis_client.zrange(index_key, 0, self.evict_batch - 1)
+            if not users:
+                return evicted
+            for user_id in users:
+                await self.release_user(user_id)
+            evicted += len(users)
+
+async def key_family_usage(redis_client, sample_size=20, scan_count=1000):
+    """
+    Count keys and estimate memory per key family, the part of the key name
+    before the first ':'.
+
+    Scans the whole keyspace and samples up to ``sample_size`` keys per
+    family with MEMORY USAGE, so it is meant for occasional reporting.
+
+    Returns
+    -------
+    families : dict
+        ``{family: {"keys": int, "estimated_bytes": int}}``
+    """
+    counts = {}
+    samples = {}
+    async for key in redis_client.scan_iter(count=scan_count):
+        family = key.split(":", 1)[0]
+        counts[family] = counts.get(family, 0) + 1
+        family_samples = samples.setdefault(family, [])
+        if len(family_samples) < sample_size:
+            family_samples.append(key)
+
+    families = {}
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for family in counts:
+            for key in samples[family]:
+                pipe.memory_usage(key)
+        sizes = iter(await pipe.execute())
+    for family, count in sorted(counts.items()):
+        sampled = [next(sizes) or 0 for _ in samples[family]]
+        families[family] = {
+            "keys": count,
+            "estimated_bytes": int(sum(sampled) / len(sampled) * count),
+        }
+    return families
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+
+import redis.asyncio as redis
+
+CATALOG_CHANNEL = "catalog"
+
+
+class CategoryCatalog:
+    """
+    In-memory catalog of categories with their servable question counts,
+    kept in sync across replicas over Redis pub/sub.
+
+    Every count change is published with the new absolute counts and the
+    time of the change, so a replica applies its own and other replicas'
+    changes alike, and a repeated message or one older than the count held
+    cannot push a count off. A replica that loses its subscription reloads
+    the counts from Redis once it is back.
+
+    Attributes
+    ----------
+    redis_client : redis.asyncio.Redis
+        The Redis client used to publish and subscribe.
+    load_counts : callable
+        Awaited to read the current counts by category.
+    entries : dict
+        Count and time of the last change, by category.
+    synced_at : float or None
+        Time of the last full reload.
+    """
+    def __init__(self, redis_client, load_counts):
+        self.redis_client = redis_client
+        self.load_counts = load_counts
+        self.entries = {}
+        self.synced_at = None
+
+    def apply(self, counts, at=None):
+        """
+        Set the counts of the given categories, except where the count held
+        was changed after ``at``.
+        """
+        at = time.time() if at is None else at
+        for cat, count in counts.items():
+            entry = self.entries.get(cat)
+            if entry is not None and entry["updated_at"] > at:
+                continue
+            self.entries[cat] = {"count": int(count), "updated_at": at}
+
+    async def sync(self, categories=()):
+        """
+        Reload every count, keeping categories without questions at zero.
+        """
+        counts = await self.load_counts()
+        now = time.time()
+        self.entries = {cat: {"count": 0, "updated_at": now} for cat in categories}
+        self.apply(counts, now)
+        self.synced_at = now
+
+    async def publish(self, counts):
+        """
+        Apply new counts here and send them to the other replicas.
+        """
+        at = time.time()
+        self.apply(counts, at)
+        await self.redis_client.publish(
+            CATALOG_CHANNEL, json.dumps({"counts": counts, "at": at})
+        )
+
+    def receive(self, data):
+        message = json.loads(data)
+        self.apply(message["counts"], message["at"])
+
+    async def listen(self, retry_interval=1.0):
+        """
+        Apply messages from other replicas until cancelled.
+        """
+        while True:
+            try:
+                async with self.redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(CATALOG_CHANNEL)
+                    # changes made while unsubscribed were missed
+                    await self.sync(list(self.entries))
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.receive(message["data"])
+            except redis.RedisError as e:
+                print("Catalog subscription lost", e)
+                await asyncio.sleep(retry_interval)
+
+    def snapshot(self):
+        """
+        The catalog as served by ``/categories/``.
+        """
+        return {
+            "categories": [
+                {"name": cat, **entry} for cat, entry in sorted(self.entries.items())
+            ],
+            "synced_at": self.synced_at,
+        }
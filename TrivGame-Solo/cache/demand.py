@@ -0,0 +1,112 @@
+import math
+import time
+
+RATES_KEY = "demand"
+
+# KEYS: rates hash. ARGV[1]: now, ARGV[2]: half-life in seconds, then
+# category, count pairs. Decays each category's rate to now and adds the
+# new questions, keeping an exponentially weighted rate per second.
+RECORD_LUA = """
+local now, half_life = tonumber(ARGV[1]), tonumber(ARGV[2])
+for i = 3, #ARGV, 2 do
+    local rate_field, ts_field = ARGV[i] .. ':rate', ARGV[i] .. ':ts'
+    local rate = tonumber(redis.call('HGET', KEYS[1], rate_field) or '0')
+    local ts = tonumber(redis.call('HGET', KEYS[1], ts_field) or ARGV[1])
+    rate = rate * math.pow(0.5, math.max(now - ts, 0) / half_life)
+    rate = rate + tonumber(ARGV[i + 1]) * math.log(2) / half_life
+    redis.call('HSET', KEYS[1], rate_field, rate, ts_field, now)
+end
+return #ARGV / 2 - 1
+"""
+
+
+def decay(rate, elapsed, half_life):
+    """
+    The rate ``elapsed`` seconds later with nothing recorded in between.
+    """
+    return rate * 0.5 ** (max(elapsed, 0) / half_life)
+
+
+class DemandTracker:
+    """
+    Questions served per second for each category, as an exponentially
+    weighted moving average shared by all replicas through Redis.
+
+    Attributes
+    ----------
+    redis_client : redis.asyncio.Redis
+        The Redis client holding the rates.
+    half_life : float
+        Seconds after which a served question counts half as much.
+    """
+    def __init__(self, redis_client, half_life):
+        self.redis_client = redis_client
+        self.half_life = half_life
+        self.record_script = redis_client.register_script(RECORD_LUA)
+
+    async def record(self, counts):
+        """
+        Add served questions, by category.
+        """
+        args = [time.time(), self.half_life]
+        for cat, n in counts.items():
+            args.extend([cat, n])
+        if len(args) > 2:
+            await self.record_script(keys=[RATES_KEY], args=args)
+
+    async def rates(self):
+        """
+        Current questions per second, by category.
+        """
+        fields = await self.redis_client.hgetall(RATES_KEY)
+        now = time.time()
+        rates = {}
+        for field, value in fields.items():
+            cat, kind = field.rsplit(":", 1)
+            if kind == "rate":
+                ts = float(fields.get(f"{cat}:ts", now))
+                rates[cat] = decay(float(value), now - ts, self.half_life)
+        return rates
+
+
+def plan_generation(available, rates, budget, horizon, floor):
+    """
+    Split a generation budget between categories by time to exhaustion.
+
+    Each category should hold enough questions for ``horizon`` seconds at
+    its current rate, and never fewer than ``floor``. Categories that would
+    run out soonest get their shortfall filled first, until the budget is
+    spent, so cold categories are only topped up to the floor.
+
+    Parameters
+    ----------
+    available : dict
+        Servable questions, by category.
+    rates : dict
+        Questions served per second, by category.
+    budget : int
+        Questions to generate in total.
+    horizon : float
+        Seconds of demand each category should cover.
+    floor : int
+        Questions every category should hold regardless of demand.
+
+    Returns
+    -------
+    plan : dict
+        Questions to generate, by category. Categories needing none are left out.
+    """
+    def time_to_exhaustion(cat):
+        rate = rates.get(cat, 0.0)
+        return available[cat] / rate if rate > 0 else math.inf
+
+    plan = {}
+    for cat in sorted(available, key=lambda c: (time_to_exhaustion(c), available[c])):
+        if budget <= 0:
+            break
+        target = max(math.ceil(rates.get(cat, 0.0) * horizon), floor)
+        shortfall = min(target - available[cat], budget)
+        if shortfall > 0:
+            plan[cat] = shortfall
+            budget -= shortfall
+    return plan
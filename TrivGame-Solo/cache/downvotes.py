@@ -0,0 +1,153 @@
+from qstore import BODY_KEY
+
+PENDING_KEY = "downvotes:pending"
+TOTALS_KEY = "downvotes:totals"
+
+# KEYS: pending, totals, bodies. ARGV[1]: threshold, then question ids.
+# Counts one downvote per id, both as a delta still to be written and in the
+# running total. A total missing from the hash starts from the count carried
+# by the cached question body. Returns the ids at or over the threshold.
+ADD_LUA = """
+local pending, totals, bodies = KEYS[1], KEYS[2], KEYS[3]
+local threshold = tonumber(ARGV[1])
+local crossed = {}
+for i = 2, #ARGV do
+    local id = ARGV[i]
+    redis.call('HINCRBY', pending, id, 1)
+    if redis.call('HEXISTS', totals, id) == 0 then
+        local base = 0
+        local body = redis.call('HGET', bodies, id)
+        if body then
+            base = tonumber(cjson.decode(body)['downvotes']) or 0
+        end
+        redis.call('HSET', totals, id, base)
+    end
+    if redis.call('HINCRBY', totals, id, 1) >= threshold then
+        crossed[#crossed + 1] = id
+    end
+end
+return crossed
+"""
+
+# KEYS: pending. Returns the pending deltas and clears them.
+DRAIN_LUA = """
+local deltas = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return deltas
+"""
+
+# KEYS: pending, totals. ARGV: id, count pairs read from the database.
+# Resets the running totals to the stored count plus what is still pending.
+SYNC_LUA = """
+for i = 1, #ARGV, 2 do
+    local pending = tonumber(redis.call('HGET', KEYS[1], ARGV[i]) or '0')
+    redis.call('HSET', KEYS[2], ARGV[i], tonumber(ARGV[i + 1]) + pending)
+end
+return #ARGV / 2
+"""
+
+
+class DownvoteCounter:
+    """
+    Downvotes counted in Redis and written to Postgres in batches.
+
+    Each downvote bumps a pending delta and a running total per question in
+    two Redis hashes, so ``/downvote/`` never waits on the database and every
+    replica sees the same totals. ``flush`` writes the deltas with a single
+    UPDATE, deletes the questions that reached the threshold and resyncs the
+    totals with the stored counts.
+
+    Attributes
+    ----------
+    redis_client : redis.asyncio.Redis
+        The Redis client holding the counters.
+    get_connection : callable
+        Returns an async context manager yielding an asyncpg connection.
+    threshold : int
+        Downvotes at which a question is evicted.
+    """
+    def __init__(self, redis_client, get_connection, threshold):
+        self.redis_client = redis_client
+        self.get_connection = get_connection
+        self.threshold = threshold
+        self.add_script = redis_client.register_script(ADD_LUA)
+        self.drain_script = redis_client.register_script(DRAIN_LUA)
+        self.sync_script = redis_client.register_script(SYNC_LUA)
+
+    async def add(self, question_ids):
+        """
+        Count one downvote for each of ``question_ids``.
+
+        Returns
+        -------
+        crossed : list of str
+            The ids whose total is now at or over the threshold.
+        """
+        if not question_ids:
+            return []
+        return await self.add_script(
+            keys=[PENDING_KEY, TOTALS_KEY, BODY_KEY],
+            args=[self.threshold] + list(question_ids)
+        )
+
+    async def flush(self):
+        """
+        Write the pending downvotes to the database. On failure they are
+        added back so the next flush retries them.
+
+        Returns
+        -------
+        evicted : list of asyncpg.Record
+            The id, category and usage_count of the questions deleted for
+            reaching the threshold.
+        """
+        raw = await self.drain_script(keys=[PENDING_KEY])
+        deltas = {raw[i]: int(raw[i + 1]) for i in range(0, len(raw), 2)}
+        if not deltas:
+            return []
+        try:
+            counts, evicted = await self._write(deltas)
+        except Exception:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for qid, n in deltas.items():
+                    pipe.hincrby(PENDING_KEY, qid, n)
+                await pipe.execute()
+            raise
+
+        args = []
+        for qid, count in counts.items():
+            args.extend([qid, count])
+        if args:
+            await self.sync_script(keys=[PENDING_KEY, TOTALS_KEY], args=args)
+        # questions already gone from the database need no total
+        gone = [qid for qid in deltas if qid not in counts] + [r["id"] for r in evicted]
+        await self.forget(gone)
+        return evicted
+
+    async def _write(self, deltas):
+        # sorted ids keep row lock order stable across concurrent flushes
+        ids = sorted(deltas)
+        async with self.get_connection() as conn, conn.transaction():
+            rows = await conn.fetch("""
+                UPDATE questions q
+                SET downvote_count = q.downvote_count + v.n
+                FROM unnest($1::text[], $2::int[]) AS v(id, n)
+                WHERE q.id = v.id
+                RETURNING q.id, q.downvote_count
+            """, ids, [deltas[qid] for qid in ids])
+            counts = {r["id"]: r["downvote_count"] for r in rows}
+            over = [qid for qid, count in counts.items() if count >= self.threshold]
+            evicted = []
+            if over:
+                evicted = await conn.fetch("""
+                    DELETE FROM questions WHERE id = ANY($1::text[])
+                    RETURNING id, category, usage_count
+                """, over)
+        return counts, evicted
+
+    async def forget(self, question_ids):
+        """
+        Drop the running totals of questions that no longer exist.
+        """
+        if question_ids:
+            await self.redis_client.hdel(TOTALS_KEY, *question_ids)
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+# One bounded DELETE per predicate. Each selects through an index on the
+# predicate's column and skips rows locked by concurrent writers, so a chunk
+# neither scans the table nor waits on the request path.
+EVICT_QUERY = """
+    DELETE FROM questions
+    WHERE id IN (
+        SELECT id FROM questions
+        WHERE {predicate}
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, category, usage_count, downvote_count
+"""
+
+EVICT_PREDICATES = {
+    "usage": "usage_count >= $1",
+    "downvotes": "downvote_count >= $1",
+    "age": "created_at < NOW() - $1::interval",
+}
+
+
+class ChunkedEvictor:
+    """
+    Deletes questions in small chunks, one transaction per chunk, pausing
+    between chunks so other queries keep getting connections and I/O.
+
+    Attributes
+    ----------
+    get_connection : callable
+        Returns an async context manager yielding an asyncpg connection.
+    chunk_size : int
+        Rows deleted per chunk.
+    pause : float
+        Seconds to sleep between chunks.
+    max_chunks : int
+        Chunks per predicate in one run; the rest waits for the next run.
+    metrics : dict
+        Rows evicted and time spent, for the last run and in total.
+    """
+    def __init__(self, get_connection, chunk_size, pause, max_chunks):
+        self.get_connection = get_connection
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.max_chunks = max_chunks
+        self.metrics = {
+            "runs": 0,
+            "rows_evicted": 0,
+            "rows_by_reason": {reason: 0 for reason in EVICT_PREDICATES},
+            "seconds": 0.0,
+            "last_run_rows": 0,
+            "last_run_chunks": 0,
+            "last_run_seconds": 0.0,
+            "max_chunk_seconds": 0.0,
+        }
+
+    async def run(self, thresholds, on_evicted):
+        """
+        Evict every question matching one of the predicates.
+
+        Parameters
+        ----------
+        thresholds : dict
+            The parameter for each predicate in EVICT_PREDICATES, by reason.
+        on_evicted : callable
+            Awaited with the reason and the rows deleted by each chunk.
+
+        Returns
+        -------
+        evicted : int
+            The number of questions deleted.
+        """
+        start = time.perf_counter()
+        evicted = 0
+        chunks = 0
+        for reason, predicate in EVICT_PREDICATES.items():
+            query = EVICT_QUERY.format(predicate=predicate)
+            for _ in range(self.max_chunks):
+                chunk_start = time.perf_counter()
+                async with self.get_connection() as conn:
+                    rows = await conn.fetch(query, thresholds[reason], self.chunk_size)
+                chunk_seconds = time.perf_counter() - chunk_start
+                self.metrics["max_chunk_seconds"] = max(self.metrics["max_chunk_seconds"], chunk_seconds)
+                chunks += 1
+                if rows:
+                    self.metrics["rows_by_reason"][reason] += len(rows)
+                    evicted += len(rows)
+                    await on_evicted(reason, rows)
+                if len(rows) < self.chunk_size:
+                    break
+                await asyncio.sleep(self.pause)
+
+        elapsed = time.perf_counter() - start
+        self.metrics["runs"] += 1
+        self.metrics["rows_evicted"] += evicted
+        self.metrics["seconds"] += elapsed
+        self.metrics["last_run_rows"] = evicted
+        self.metrics["last_run_chunks"] = chunks
+        self.metrics["last_run_seconds"] = elapsed
+        return evicted
@@ -0,0 +1,155 @@
+import datetime
+import json
+
+
+class JobQueue:
+    """
+    Durable queue of question generation batches in the generation_jobs table.
+
+    Jobs are claimed with FOR UPDATE SKIP LOCKED so any number of workers,
+    on any replica, can share the queue. A claimed job holds a lease; if its
+    worker dies the lease runs out and the job is claimed again. A failed
+    job is retried after an exponential backoff and moved to the ``dead``
+    status once it has used up its attempts.
+
+    Attributes
+    ----------
+    get_connection : callable
+        Returns an async context manager yielding an asyncpg connection.
+    max_attempts : int
+        Attempts before a job is dead-lettered.
+    backoff_base : float
+        Seconds before the first retry, doubled for each later one.
+    backoff_max : float
+        Longest wait between retries, in seconds.
+    lease : float
+        Seconds a claimed job may run before others can claim it.
+    """
+    def __init__(self, get_connection, max_attempts, backoff_base, backoff_max, lease):
+        self.get_connection = get_connection
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+
+    def backoff(self, attempts):
+        """
+        Seconds to wait before retrying a job that failed ``attempts`` times.
+        """
+        return min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+
+    async def enqueue(self, batches):
+        """
+        Add one job per batch of (title, category) pairs.
+        """
+        if not batches:
+            return
+        async with self.get_connection() as conn:
+            await conn.executemany(
+                "INSERT INTO generation_jobs (articles) VALUES ($1::jsonb)",
+                [(json.dumps(batch),) for batch in batches]
+            )
+
+    async def claim(self, count):
+        """
+        Claim up to ``count`` jobs that are due, oldest first.
+
+        Returns
+        -------
+        jobs : list of dict
+            The claimed jobs with their id, articles and attempts so far.
+        """
+        if count <= 0:
+            return []
+        async with self.get_connection() as conn:
+            rows = await conn.fetch("""
+                UPDATE generation_jobs j
+                SET
+                    status = 'running',
+                    attempts = j.attempts + 1,
+                    locked_until = NOW() + $2::interval,
+                    updated_at = NOW()
+                FROM (
+                    SELECT id FROM generation_jobs
+                    WHERE
+                        (status = 'pending' AND run_after <= NOW()) OR
+                        (status = 'running' AND locked_until < NOW())
+                    ORDER BY run_after
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                ) c
+                WHERE j.id = c.id
+                RETURNING j.id, j.articles, j.attempts
+            """, count, datetime.timedelta(seconds=self.lease))
+        return [{
+            "id": r["id"],
+            "articles": [tuple(a) for a in json.loads(r["articles"])],
+            "attempts": r["attempts"],
+        } for r in rows]
+
+    async def extend(self, job):
+        """
+        Push the lease on a running job back to ``lease`` seconds from now.
+        """
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                UPDATE generation_jobs
+                SET locked_until = NOW() + $2::interval, updated_at = NOW()
+                WHERE id = $1 AND status = 'running'
+            """, job["id"], datetime.timedelta(seconds=self.lease))
+
+    async def complete(self, job):
+        async with self.get_connection() as conn:
+            await conn.execute("DELETE FROM generation_jobs WHERE id = $1", job["id"])
+
+    async def fail(self, job, error):
+        """
+        Schedule a retry of a failed job, or dead-letter it. The job's
+        articles are saved as given, so a retry can be narrowed to part of
+        the batch.
+
+        Returns
+        -------
+        dead : bool
+            True if the job has no attempts left.
+        """
+        dead = job["attempts"] >= self.max_attempts
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                UPDATE generation_jobs
+                SET
+                    status = $2,
+                    run_after = NOW() + $3::interval,
+                    locked_until = NULL,
+                    last_error = $4,
+                    articles = $5::jsonb,
+                    updated_at = NOW()
+                WHERE id = $1
+            """,
+                job["id"],
+                "dead" if dead else "pending",
+                datetime.timedelta(seconds=0 if dead else self.backoff(job["attempts"])),
+                str(error),
+                json.dumps(job["articles"])
+            )
+        return dead
+
+    async def depth(self):
+        """
+        Number of jobs per status, and the age of the oldest pending job.
+        """
+        async with self.get_connection() as conn:
+            rows = await conn.fetch("""
+                SELECT
+                    status,
+                    COUNT(*) AS n,
+                    EXTRACT(EPOCH FROM NOW() - MIN(created_at)) AS oldest
+                FROM generation_jobs
+                GROUP BY status
+            """)
+        depth = {"pending": 0, "running": 0, "dead": 0, "oldest_pending_seconds": 0.0}
+        for r in rows:
+            depth[r["status"]] = r["n"]
+            if r["status"] == "pending":
+                depth["oldest_pending_seconds"] = float(r["oldest"])
+        return depth
@@ -1,15 +1,31 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager, contextmanager
+from contextlib import asynccontextmanager, aclosing
 import redis.asyncio as redis
-from psycopg2 import pool
+import asyncpg
 import os
 from models import _GameBatchReqElem, GameBatchReq, Question, GameBatchResp, DownvoteBatchReq
-from apscheduler.schedulers.background import BackgroundScheduler
+from seen import make_seen_set
+from writebehind import WriteBehindBuffer
+from qstore import QuestionStore
+from singleflight import SingleFlight, flight_key
+from cachepolicy import UnseenPolicy, key_family_usage
+from downvotes import DownvoteCounter
+from eviction import ChunkedEvictor
+from qcount import CategoryCounts
+from qgen import AdaptiveLimit, RateMeter, GenerationStopped, parse_retry_after
+from jobqueue import JobQueue
+from demand import DemandTracker, plan_generation
+from catalog import CategoryCatalog
+from snapshot import save_snapshot, load_snapshot
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from apscheduler.executors.pool import ThreadPoolExecutor
 import datetime
 import httpx
+import asyncio
+import json
+import random
+import time
 
 tags_metadata = [
     {
@@ -20,6 +36,22 @@ tags_metadata = [
         "name": "downvote",
         "description": "Downvote a batch of questions",
     },
+    {
+        "name": "cachestats",
+        "description": "Redis memory usage per key family and of the per-user unseen lists",
+    },
+    {
+        "name": "categories",
+        "description": "Categories with their available question counts, served from memory",
+    },
+    {
+        "name": "jobs",
+        "description": "Depth of the question generation job queue",
+    },
+    {
+        "name": "metrics",
+        "description": "Counters and timings of startup and the background jobs",
+    },
     {
         "name": "health",
         "description": "Health check for the service",
@@ -32,33 +64,46 @@ db_user = os.environ.get("POSTGRES_USER")
 db_password = os.environ.get("POSTGRES_PASSWORD")
 db_host = "postgres-db"
 db_port = "5432"
-MAX_DB_CONNECTIONS = 20
-MIN_DB_CONNECTIONS = 1
-
-db_conn_pool = pool.ThreadedConnectionPool(
-    minconn=MIN_DB_CONNECTIONS,
-    maxconn=MAX_DB_CONNECTIONS,
-    user=db_user,
-    password=db_password,
-    host=db_host,
-    port=db_port
-)
-@contextmanager
-def get_db_connection():
+MAX_DB_CONNECTIONS = int(os.environ.get("MAX_DB_CONNECTIONS", 20))
+MIN_DB_CONNECTIONS = int(os.environ.get("MIN_DB_CONNECTIONS", 1))
+DB_STATEMENT_TIMEOUT = float(os.environ.get("DB_STATEMENT_TIMEOUT", 10)) # in seconds
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 256))
+db_conn_pool = None # set by lifespan start
+
+async def create_db_pool():
+    """
+    Create the asyncpg connection pool shared by request handlers and scheduled jobs.
+
+    Statements are prepared and cached per connection. Every statement is
+    bounded both client side (command_timeout) and server side
+    (statement_timeout) so a slow query cannot hold a connection forever.
+    """
+    return await asyncpg.create_pool(
+        database=db_name,
+        user=db_user,
+        password=db_password,
+        host=db_host,
+        port=db_port,
+        min_size=MIN_DB_CONNECTIONS,
+        max_size=MAX_DB_CONNECTIONS,
+        command_timeout=DB_STATEMENT_TIMEOUT,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        server_settings={"statement_timeout": str(int(DB_STATEMENT_TIMEOUT * 1000))}
+    )
+
+@asynccontextmanager
+async def get_db_connection():
     """Context manager for database connection.
 
 
     Returns
     -------
-    conn : psycopg2.extensions.connection
+    conn : asyncpg.Connection
         A database connection object.
     """
 
-    conn = db_conn_pool.getconn()
-    try:
+    async with db_conn_pool.acquire() as conn:
         yield conn
-    finally:
-        db_conn_pool.putconn(conn)
 
 # Redis connection related settings
 MAX_REDIS_CONNECTIONS = 10
@@ -66,114 +111,710 @@ redis_host = "redis"
 redis_port = 6379
 redis_client = None
 
-# Scheduled background tasks that will run periodically on separate thread
-executors = {
-    "default": ThreadPoolExecutor(1)
+# Per-user seen questions kept in Redis, mirrors user_question_store
+SEEN_FILTER_MODE = os.environ.get("SEEN_FILTER_MODE", "set") # "set" (exact) or "bloom"
+SEEN_BLOOM_CAPACITY = int(os.environ.get("SEEN_BLOOM_CAPACITY", 100000))
+SEEN_BLOOM_FP_RATE = float(os.environ.get("SEEN_BLOOM_FP_RATE", 0.001))
+SEEN_TTL = int(os.environ.get("SEEN_TTL", 24 * 60 * 60)) # in seconds
+SEEN_CANDIDATE_FACTOR = int(os.environ.get("SEEN_CANDIDATE_FACTOR", 2))
+SEEN_MAX_CANDIDATE_ROUNDS = int(os.environ.get("SEEN_MAX_CANDIDATE_ROUNDS", 10))
+SEEN_MAX_CANDIDATE_PAGE = int(os.environ.get("SEEN_MAX_CANDIDATE_PAGE", 1000))
+# "random" starts each category at a random point of the (category, random_rank)
+# index and wraps around, "sequential" walks the (category, id) index from where
+# the user's previous scan of the category stopped and wraps around
+DB_SELECT_MODE = os.environ.get("DB_SELECT_MODE", "random")
+SEEN_CURSOR_KEY = "seencursor:{user_id}:{category}"
+seen_set = None
+
+# Lists in Redis hold question ids, bodies are stored once in a shared hash
+question_store = None
+
+# Usage counts and user_question_store rows for served questions are buffered
+# and written behind the request path
+WRITE_BEHIND_MODE = os.environ.get("WRITE_BEHIND_MODE", "async") # "async" or "sync" (flush before responding)
+WRITE_BEHIND_FLUSH_INTERVAL = int(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", 2)) # in seconds
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", 1000))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.environ.get("WRITE_BEHIND_MAX_ATTEMPTS", 3))
+write_buffer = None
+
+# Concurrent identical /getbatch/ requests share one fetch, across replicas
+SINGLEFLIGHT_LEASE_TTL = float(os.environ.get("SINGLEFLIGHT_LEASE_TTL", 5)) # in seconds
+SINGLEFLIGHT_RESULT_TTL = float(os.environ.get("SINGLEFLIGHT_RESULT_TTL", 5)) # in seconds
+SINGLEFLIGHT_POLL_INTERVAL = float(os.environ.get("SINGLEFLIGHT_POLL_INTERVAL", 0.02)) # in seconds
+getbatch_flight = None
+
+# Per-user unseen lists are capped, released after sitting idle, and evicted
+# coldest first when they and the question bodies go over a memory budget
+UNSEEN_IDLE_TTL = int(os.environ.get("UNSEEN_IDLE_TTL", 24 * 60 * 60)) # in seconds
+UNSEEN_MAX_LEN = int(os.environ.get("UNSEEN_MAX_LEN", 50))
+UNSEEN_MEMORY_BUDGET = int(os.environ.get("UNSEEN_MEMORY_BUDGET", 256 * 2**20)) # in bytes
+UNSEEN_EVICTION_POLICY = os.environ.get("UNSEEN_EVICTION_POLICY", "lru") # "lru" or "lfu"
+UNSEEN_EVICT_BATCH = int(os.environ.get("UNSEEN_EVICT_BATCH", 100))
+UNSEEN_SAMPLE_SIZE = int(os.environ.get("UNSEEN_SAMPLE_SIZE", 50))
+UNSEEN_EVICT_PERIOD = int(os.environ.get("UNSEEN_EVICT_PERIOD", 5)) # in minutes
+unseen_policy = None
+
+# Shared pre-shuffled question pools per category, drawn from by every user
+POOL_KEY = "pool:{category}"
+POOL_LOCK_KEY = "pool:{category}:refilling"
+POOL_FRESH_KEY = "pool:{category}:fresh"
+POOL_SIZE = int(os.environ.get("POOL_SIZE", 500))
+POOL_TTL = int(os.environ.get("POOL_TTL", 10 * 60)) # in seconds, pools are rebuilt after this
+POOL_DRAW_FACTOR = int(os.environ.get("POOL_DRAW_FACTOR", 4))
+
+# Categories and pools are saved to a snapshot file periodically and at
+# shutdown; with WARM_START a restart loads them from it instead of waiting
+# on the database
+WARM_START = os.environ.get("WARM_START", "false").lower() == "true"
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "/data/cache_snapshot.json")
+SNAPSHOT_PERIOD = int(os.environ.get("SNAPSHOT_PERIOD", 10)) # in minutes
+SNAPSHOT_MAX_AGE = int(os.environ.get("SNAPSHOT_MAX_AGE", 24 * 60 * 60)) # in seconds
+startup_metrics = {
+    "seconds": None,
+    "warm": False,
+    "pools_restored": 0,
 }
-scheduler = BackgroundScheduler(
-    executors=executors,
+
+background_tasks = set()
+def spawn(coro):
+    """
+    Run a coroutine in the background, keeping a reference until it finishes.
+    """
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+# Scheduled background tasks that run periodically on the app's event loop,
+# sharing its database pool and Redis client
+scheduler = AsyncIOScheduler(
     job_defaults={"misfire_grace_time": 60},
     timezone="UTC"
 )
 
-DOWNVOTE_THRESHOLD = os.environ.get("DOWNVOTE_THRESHOLD", 3)
-USAGE_THRESHOLD = os.environ.get("USAGE_THRESHOLD", 5)
-DB_EVICT_PERIOD = os.environ.get("DB_EVICT_PERIOD", 5) # in minutes
-def evict_questions_from_db():
+DOWNVOTE_THRESHOLD = int(os.environ.get("DOWNVOTE_THRESHOLD", 3))
+USAGE_THRESHOLD = int(os.environ.get("USAGE_THRESHOLD", 5))
+# Usage counts of served questions, so pools stop handing out used up ones
+# before the write-behind flush and the eviction job catch up
+USAGE_TOTALS_KEY = "usage:totals"
+DB_EVICT_PERIOD = int(os.environ.get("DB_EVICT_PERIOD", 5)) # in minutes
+QUESTION_MAX_AGE = float(os.environ.get("QUESTION_MAX_AGE", 2)) # in days
+EVICT_CHUNK_SIZE = int(os.environ.get("EVICT_CHUNK_SIZE", 500))
+EVICT_CHUNK_PAUSE = float(os.environ.get("EVICT_CHUNK_PAUSE", 0.05)) # in seconds
+EVICT_MAX_CHUNKS = int(os.environ.get("EVICT_MAX_CHUNKS", 100)) # per predicate and run
+EVICT_CACHE_CHUNK_SIZE = int(os.environ.get("EVICT_CACHE_CHUNK_SIZE", 100)) # ids per Redis removal script
+evictor = ChunkedEvictor(get_db_connection, EVICT_CHUNK_SIZE, EVICT_CHUNK_PAUSE, EVICT_MAX_CHUNKS)
+
+# Downvotes are counted in Redis and written to the database in batches
+DOWNVOTE_FLUSH_INTERVAL = int(os.environ.get("DOWNVOTE_FLUSH_INTERVAL", 5)) # in seconds
+downvote_counter = None
+
+async def flush_write_buffer():
+    """
+    Write buffered usage counts and seen questions to the database.
     """
-    Evict questions from the database based on usage count and downvote count.
+    try:
+        await write_buffer.flush()
+    except Exception as e:
+        print("Error flushing write-behind buffer: ", e)
+
+async def evict_questions_from_db():
     """
+    Evict questions from the database based on usage count, downvote count and age.
 
+    Runs in chunks of EVICT_CHUNK_SIZE rows, each in its own short
+    transaction, pausing EVICT_CHUNK_PAUSE seconds between chunks.
+    """
     print("Checking for questions to evict")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        query = """
-            DELETE FROM questions
-            WHERE 
-                usage_count >= %s OR 
-                downvote_count >= %s OR
-                created_at < NOW() - Interval '2 days';
-        """
-        cursor.execute(query, (USAGE_THRESHOLD, DOWNVOTE_THRESHOLD))
-        conn.commit()
-        cursor.close()
+    async def on_evicted(reason, rows):
+        await evict_from_cache(ids_by_category(rows))
+        await downvote_counter.forget([r["id"] for r in rows])
+        if reason == "age":
+            # used up and downvoted questions were uncounted when they crossed
+            # their threshold
+            deltas = {}
+            for r in rows:
+                if r["usage_count"] < USAGE_THRESHOLD and r["downvote_count"] < DOWNVOTE_THRESHOLD:
+                    deltas[r["category"]] = deltas.get(r["category"], 0) - 1
+            await update_category_counts(deltas)
+
+    try:
+        evicted = await evictor.run({
+            "usage": USAGE_THRESHOLD,
+            "downvotes": DOWNVOTE_THRESHOLD,
+            "age": datetime.timedelta(days=QUESTION_MAX_AGE),
+        }, on_evicted)
+    except Exception as e:
+        print("Error evicting questions: ", e)
+        return
+    print(f"Evicted {evicted} questions in {evictor.metrics['last_run_seconds']:.2f}s")
+
+async def evict_from_cache(ids_by_category):
+    """
+    Stop serving questions from Redis: remove them from their category's
+    pool and from every user's unseen list for it, then drop their bodies.
+
+    A question can later be regenerated under the same id, so no list may
+    keep an entry that would release a reference of the new one.
+
+    Ids are removed EVICT_CACHE_CHUNK_SIZE at a time, from at most that many
+    lists per script call, so no single script blocks Redis for long.
+
+    Parameters
+    ----------
+    ids_by_category : dict
+        Question ids to evict, by category.
+    """
+    for cat, ids in ids_by_category.items():
+        list_keys = [POOL_KEY.format(category=cat)] + await unseen_policy.list_keys(cat)
+        for i in range(0, len(ids), EVICT_CACHE_CHUNK_SIZE):
+            chunk = ids[i:i + EVICT_CACHE_CHUNK_SIZE]
+            for j in range(0, len(list_keys), EVICT_CACHE_CHUNK_SIZE):
+                await question_store.remove(list_keys[j:j + EVICT_CACHE_CHUNK_SIZE], chunk)
+            await question_store.forget(chunk)
+            await redis_client.hdel(USAGE_TOTALS_KEY, *chunk)
+
+def ids_by_category(rows):
+    """
+    Group the ids of question rows by their category.
+    """
+    by_category = {}
+    for r in rows:
+        by_category.setdefault(r["category"], []).append(r["id"])
+    return by_category
+
+async def flush_downvotes():
+    """
+    Write counted downvotes to the database, evicting questions over the threshold.
+    """
+    try:
+        evicted = await downvote_counter.flush()
+    except Exception as e:
+        print("Error flushing downvotes: ", e)
+        return
+    if evicted:
+        print(f"Evicted {len(evicted)} downvoted questions")
+        await evict_from_cache(ids_by_category(evicted))
+        deltas = {}
+        for r in evicted:
+            if r["usage_count"] < USAGE_THRESHOLD:
+                deltas[r["category"]] = deltas.get(r["category"], 0) - 1
+        await update_category_counts(deltas)
+
+async def evict_unseen_lists():
+    """
+    Release idle users' unseen lists, then evict more if over the memory budget.
+    """
+    try:
+        idle = await unseen_policy.evict_idle()
+        over_budget = await unseen_policy.enforce_budget()
+        print(f"Evicted unseen lists of {idle} idle and {over_budget} cold users")
+    except redis.RedisError as e:
+        print("Failed to evict unseen lists", e)
 
 CATEGORIES = [] # set by lifespan start
-MIN_THRESHOLD_FACTOR = os.environ.get("MIN_THRESHOLD_FACTOR", 0.1)
-MIN_THRESHOLD_FACTOR = 1.1
-PROACTIVE_FETCH_COUNT = os.environ.get("PROACTIVE_FETCH_COUNT", 5)
-QGEN_BATCH_SIZE = os.environ.get("QGEN_BATCH_SIZE", 10)
-GENERATE_CHECK_PERIOD = os.environ.get("GENERATE_CHECK_PERIOD", 5) # in minutes
-def generate_questions_as_needed():
+PROACTIVE_FETCH_COUNT = int(os.environ.get("PROACTIVE_FETCH_COUNT", 5))
+QGEN_BATCH_SIZE = int(os.environ.get("QGEN_BATCH_SIZE", 10))
+ARTICLE_CLAIM_TTL = int(os.environ.get("ARTICLE_CLAIM_TTL", 15 * 60)) # in seconds, lease on articles being generated
+GENERATE_CHECK_PERIOD = int(os.environ.get("GENERATE_CHECK_PERIOD", 60)) # in minutes, full recount
+
+# Questions served per category are tracked as a moving average, and each
+# planning run splits GENERATION_BUDGET between the categories that would
+# run out soonest at that rate
+DEMAND_HALF_LIFE = float(os.environ.get("DEMAND_HALF_LIFE", 15 * 60)) # in seconds
+GENERATION_BUDGET = int(os.environ.get("GENERATION_BUDGET", 50)) # questions per planning run
+GENERATION_HORIZON = float(os.environ.get("GENERATION_HORIZON", 60 * 60)) # in seconds of demand to keep in stock
+GENERATE_PLAN_PERIOD = int(os.environ.get("GENERATE_PLAN_PERIOD", 5)) # in minutes
+demand = None
+
+# Servable questions per category are counted in Redis as they are stored,
+# used up and evicted; a category dropping below the low watermark gets
+# questions generated right away rather than at the next full recount
+QCOUNT_LOW_WATERMARK = int(os.environ.get("QCOUNT_LOW_WATERMARK", 50))
+QCOUNT_TRIGGER_COOLDOWN = int(os.environ.get("QCOUNT_TRIGGER_COOLDOWN", 60)) # in seconds
+category_counts = None
+
+# Every replica keeps the categories and their counts in memory for
+# /categories/, updated from count changes published over Redis pub/sub
+catalog = None
+catalog_listener = None
+
+# Batches are sent to question-gen concurrently over one pooled client, up to
+# a limit that halves when question-gen answers 429/503 or times out and
+# grows back as calls succeed
+QGEN_URL = os.environ.get("QGEN_URL", "http://question-gen:8000")
+QGEN_CONCURRENCY = int(os.environ.get("QGEN_CONCURRENCY", 4))
+QGEN_TIMEOUT = float(os.environ.get("QGEN_TIMEOUT", 120)) # in seconds
+QGEN_MAX_ATTEMPTS = int(os.environ.get("QGEN_MAX_ATTEMPTS", 3))
+QGEN_DEFAULT_RETRY_AFTER = float(os.environ.get("QGEN_DEFAULT_RETRY_AFTER", 5)) # in seconds
+QGEN_STREAM = os.environ.get("QGEN_STREAM", "true").lower() == "true" # store questions as question-gen streams them
+QGEN_STREAM_FLUSH_SIZE = int(os.environ.get("QGEN_STREAM_FLUSH_SIZE", 10))
+QGEN_STREAM_FLUSH_INTERVAL = float(os.environ.get("QGEN_STREAM_FLUSH_INTERVAL", 0.5)) # in seconds
+qgen_client = None
+qgen_limit = AdaptiveLimit(QGEN_CONCURRENCY)
+qgen_rate = RateMeter()
+
+# Generation batches are queued in the generation_jobs table so they survive
+# restarts, and failed ones are retried with exponential backoff
+GENERATION_MAX_ATTEMPTS = int(os.environ.get("GENERATION_MAX_ATTEMPTS", 5))
+GENERATION_BACKOFF_BASE = float(os.environ.get("GENERATION_BACKOFF_BASE", 30)) # in seconds
+GENERATION_BACKOFF_MAX = float(os.environ.get("GENERATION_BACKOFF_MAX", 10 * 60)) # in seconds
+GENERATION_JOB_LEASE = float(os.environ.get("GENERATION_JOB_LEASE", 10 * 60)) # in seconds
+GENERATION_HEARTBEAT_INTERVAL = float(os.environ.get("GENERATION_HEARTBEAT_INTERVAL", 60)) # in seconds, below the lease
+GENERATION_POLL_INTERVAL = int(os.environ.get("GENERATION_POLL_INTERVAL", 15)) # in seconds
+job_queue = JobQueue(
+    get_db_connection,
+    GENERATION_MAX_ATTEMPTS,
+    GENERATION_BACKOFF_BASE,
+    GENERATION_BACKOFF_MAX,
+    GENERATION_JOB_LEASE
+)
+active_jobs = set()
+# claims are made one at a time, so concurrent callers do not both count the
+# same free slots before either has added its jobs to active_jobs
+claim_lock = asyncio.Lock()
+generation_metrics = {
+    "last_first_question_seconds": None,
+    "batches": 0,
+    "failed_batches": 0,
+    "overloaded_responses": 0,
+}
+async def update_category_counts(deltas):
+    """
+    Apply changes to the per-category question counts and start generating
+    questions for categories that dropped below the low watermark.
+
+    Parameters
+    ----------
+    deltas : dict
+        Change in servable questions, by category.
+    """
+    try:
+        low = await category_counts.add(deltas)
+    except redis.RedisError as e:
+        print("Failed to update category counts", e)
+        return
+    for cat in low:
+        print(f"Category {cat} is running low, generating questions")
+        spawn(generate_for_category(cat))
+
+async def claim_articles(conn, category, count):
+    """
+    Claim articles in a category that were not used for questions in the
+    last day and are not claimed by another job.
+
+    A claim is a lease: ``claimed_until`` is set ARTICLE_CLAIM_TTL seconds
+    ahead, so articles of a job that dies become available again. Rows
+    locked by a concurrent claim are skipped, so jobs on different replicas
+    never get the same article.
+
+    Returns
+    -------
+    titles : list of str
+        The titles of the claimed articles.
+    """
+    query = """
+        UPDATE wiki_articles w
+        SET claimed_until = NOW() + $3::interval
+        FROM (
+            SELECT title, category FROM wiki_articles
+            WHERE 
+                category = $1 AND
+                (last_used IS NULL OR
+                last_used < NOW() - INTERVAL '1 day') AND
+                (claimed_until IS NULL OR
+                claimed_until < NOW())
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        ) c
+        WHERE w.title = c.title AND w.category = c.category
+        RETURNING w.title;
+    """
+    articles = await conn.fetch(
+        query, category, count, datetime.timedelta(seconds=ARTICLE_CLAIM_TTL)
+    )
+    return [a["title"] for a in articles]
+
+async def hold_articles(title_category_batch, seconds):
+    """
+    Extend the claim on articles to ``seconds`` from now, or give it up if
+    ``seconds`` is None.
+    """
+    try:
+        async with get_db_connection() as conn:
+            await conn.execute("""
+                UPDATE wiki_articles w
+                SET claimed_until = NOW() + $3::interval
+                FROM unnest($1::text[], $2::text[]) AS b(title, category)
+                WHERE w.title = b.title AND w.category = b.category;
+            """,
+                [t[0] for t in title_category_batch],
+                [t[1] for t in title_category_batch],
+                None if seconds is None else datetime.timedelta(seconds=seconds)
+            )
+    except Exception as e:
+        print("Failed to update article claims", e)
+
+async def release_articles(title_category_batch):
+    """
+    Give up the claim on articles whose questions could not be generated.
+    """
+    await hold_articles(title_category_batch, None)
+
+async def schedule_generation(fetch_batch):
+    """
+    Queue question generation for (title, category) pairs, in batches, and
+    start working on them.
+    """
+    batches = [
+        fetch_batch[i:i+QGEN_BATCH_SIZE]
+        for i in range(0, len(fetch_batch), QGEN_BATCH_SIZE)
+    ]
+    if not batches:
+        return
+    await job_queue.enqueue(batches)
+    spawn(run_generation_jobs())
+
+async def run_generation_jobs():
+    """
+    Claim due generation jobs, as many as there is room for in the
+    question-gen concurrency limit, and run them in the background.
+    """
+    async with claim_lock:
+        try:
+            jobs = await job_queue.claim(QGEN_CONCURRENCY - len(active_jobs))
+        except Exception as e:
+            print("Failed to claim generation jobs", e)
+            return
+        for job in jobs:
+            task = spawn(run_generation_job(job))
+            active_jobs.add(task)
+            task.add_done_callback(active_jobs.discard)
+
+async def run_generation_job(job):
+    """
+    Run one claimed generation job, then record its outcome in the queue.
+
+    The job's articles stay claimed while it runs and until its retry.
+    """
+    await hold_articles(job["articles"], ARTICLE_CLAIM_TTL)
+    heartbeat = spawn(heartbeat_generation_job(job))
+    try:
+        try:
+            await fetch_and_store_questions(job["articles"])
+        finally:
+            heartbeat.cancel()
+    except Exception as e:
+        generation_metrics["failed_batches"] += 1
+        print(f"Generation job {job['id']} failed on attempt {job['attempts']}: ", e)
+        if isinstance(e, GenerationStopped) and e.remaining:
+            # articles that were stored already are not generated again
+            job = dict(job, articles=e.remaining)
+        try:
+            dead = await job_queue.fail(job, e)
+        except Exception as e:
+            print(f"Failed to record failure of generation job {job['id']}", e)
+            return
+        if dead:
+            print(f"Generation job {job['id']} moved to dead letters")
+            await release_articles(job["articles"])
+        else:
+            await hold_articles(job["articles"], job_queue.backoff(job["attempts"]) + ARTICLE_CLAIM_TTL)
+        return
+    try:
+        await job_queue.complete(job)
+    except Exception as e:
+        print(f"Failed to complete generation job {job['id']}", e)
+    # room for the next job
+    spawn(run_generation_jobs())
+
+async def heartbeat_generation_job(job):
+    """
+    Extend the lease on a running job, and the claim on its articles, every
+    GENERATION_HEARTBEAT_INTERVAL seconds, so a job that runs longer than
+    its lease is not claimed and run a second time alongside it.
+    """
+    while True:
+        await asyncio.sleep(GENERATION_HEARTBEAT_INTERVAL)
+        try:
+            await job_queue.extend(job)
+        except Exception as e:
+            print(f"Failed to extend the lease of generation job {job['id']}", e)
+        await hold_articles(job["articles"], ARTICLE_CLAIM_TTL)
+
+async def generate_for_category(category):
+    """
+    Generate questions for one category that is running low.
+    """
+    try:
+        async with get_db_connection() as conn:
+            articles = await claim_articles(conn, category, PROACTIVE_FETCH_COUNT)
+    except Exception as e:
+        print(f"Failed to select articles for {category}", e)
+        return
+    if not articles:
+        print(f"Category {category} exhausted for articles")
+        return
+    try:
+        await schedule_generation([(title, category) for title in articles])
+    except Exception as e:
+        print(f"Failed to queue generation for {category}", e)
+
+async def reconcile_category_counts():
+    """
+    Recount servable questions per category in the database and reset the
+    Redis counts to match, then plan generation from the fresh counts.
+
+    The counts are kept up to date as questions change, so this only
+    corrects drift and runs every GENERATE_CHECK_PERIOD minutes.
+    """
     print("Checking counts per category")
 
-    # Fetch category counts for questions and articles
     question_counts = {}
-    article_counts = {}
-    fetch_batch = []
-    with get_db_connection() as conn, conn.cursor() as cursor:
-        # Assumes that the number of questions marked for eviction is small
+    async with get_db_connection() as conn:
         query = """
             SELECT category, COUNT(*) FROM questions
+            WHERE
+                usage_count < $1 AND
+                downvote_count < $2 AND
+                created_at >= NOW() - $3::interval
             GROUP BY category;
         """
-        cursor.execute(query)
-        q_counts = cursor.fetchall()
+        q_counts = await conn.fetch(
+            query,
+            USAGE_THRESHOLD,
+            DOWNVOTE_THRESHOLD,
+            datetime.timedelta(days=QUESTION_MAX_AGE)
+        )
         for cat, count in q_counts:
             question_counts[cat] = count
 
-        query = """
-            SELECT category, COUNT(*) FROM wiki_articles
-            WHERE 
-                last_used IS NULL OR
-                last_used < NOW() - INTERVAL '1 day'
-                GROUP BY category;
-            """
-        cursor.execute(query)
-        a_counts = cursor.fetchall()
-        for cat, count in a_counts:
-            article_counts[cat] = count
-
-        # See if we need to generate more questions
-        for cat in CATEGORIES:
-            a_count = article_counts.get(cat, None)
-            if a_count is None:
+    try:
+        await category_counts.reset({cat: question_counts.get(cat, 0) for cat in CATEGORIES})
+    except redis.RedisError as e:
+        print("Failed to reset category counts", e)
+        return
+    await generate_questions_as_needed()
+
+async def generate_questions_as_needed():
+    """
+    Generate questions for the categories that would run out soonest.
+
+    GENERATION_BUDGET questions are split by projected time to exhaustion:
+    each category is filled up to GENERATION_HORIZON seconds of its recent
+    demand, and at least QCOUNT_LOW_WATERMARK, most urgent first.
+    """
+    try:
+        counts = await category_counts.get()
+        rates = await demand.rates()
+    except redis.RedisError as e:
+        print("Failed to read category counts and demand", e)
+        return
+    available = {cat: counts.get(cat, 0) for cat in CATEGORIES}
+    plan = plan_generation(
+        available,
+        rates,
+        GENERATION_BUDGET,
+        GENERATION_HORIZON,
+        QCOUNT_LOW_WATERMARK
+    )
+    print("Generation plan: ", plan)
+
+    fetch_batch = []
+    async with get_db_connection() as conn:
+        for cat, count in plan.items():
+            articles = await claim_articles(conn, cat, count)
+            if not articles:
                 print(f"Category {cat} exhausted for articles")
-                continue
-            
-            min_threshold = max(int(MIN_THRESHOLD_FACTOR * a_count), 1)
-            q_count = question_counts.get(cat, 0)
-            if q_count < min_threshold:
-                print(f"Category {cat} needs more questions: {q_count} < {min_threshold}")
-                query = """
-                    SELECT title FROM wiki_articles
-                    WHERE 
-                        category = %s AND
-                        (last_used IS NULL OR
-                        last_used < NOW() - INTERVAL '1 day')
-                    LIMIT %s;
-                """
+            fetch_batch.extend([(title, cat) for title in articles])
 
-                cursor.execute(query, (cat, PROACTIVE_FETCH_COUNT))
-                articles = cursor.fetchall()
-                articles = [a[0] for a in articles]
-                fetch_batch.extend([(title, cat) for title in articles])
-    
     # Fetch questions for articles
-    for i in range(0, len(fetch_batch), QGEN_BATCH_SIZE):
-        batch = fetch_batch[i:i+QGEN_BATCH_SIZE]
-        # will be schedule to run right away
-        scheduler.add_job(
-            fetch_and_store_questions,
-            args=(batch,),
-            replace_existing=False,
-            misfire_grace_time=None, # will run eventually
-        )
+    await schedule_generation(fetch_batch)
 
-def fetch_and_store_questions(title_category_batch):
+async def request_questions(payload):
+    """
+    Post a batch of articles to question-gen within the adaptive concurrency
+    limit, backing off and retrying when it reports being overloaded.
+
+    Returns
+    -------
+    response : dict
+        The Questions response: the questions, ok and error.
+    """
+    for attempt in range(QGEN_MAX_ATTEMPTS):
+        async with qgen_limit:
+            print(">> Posting to question-gen with payload:", payload)
+            try:
+                response = await qgen_client.post("/questions", json=payload)
+            except httpx.TimeoutException:
+                response = None
+        if response is None or response.status_code in (429, 503):
+            generation_metrics["overloaded_responses"] += 1
+            retry_after = QGEN_DEFAULT_RETRY_AFTER
+            if response is not None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"), retry_after)
+            qgen_limit.overloaded(retry_after)
+            print(f"question-gen overloaded, limit now {int(qgen_limit.limit)}")
+            continue
+        response.raise_for_status()
+        qgen_limit.succeeded()
+        return response.json()
+    raise RuntimeError(f"question-gen still overloaded after {QGEN_MAX_ATTEMPTS} attempts")
+
+async def stream_questions(payload):
+    """
+    Streaming counterpart of ``request_questions``: yields each item of
+    question-gen's NDJSON response as soon as it arrives.
+
+    Only a call that has not yielded anything yet is retried. A timeout part
+    way through the stream ends it with an ok=False item instead, so items
+    are never yielded twice and only the articles that did not arrive are
+    generated again.
+
+    Yields
+    ------
+    item : dict
+        A QuestionItem with the article title and its question (or None),
+        or a last item with ok=False if generation stopped early.
+    """
+    for attempt in range(QGEN_MAX_ATTEMPTS):
+        yielded = False
+        async with qgen_limit:
+            print(">> Streaming from question-gen with payload:", payload)
+            try:
+                async with qgen_client.stream("POST", "/questions/stream", json=payload) as response:
+                    if response.status_code not in (429, 503):
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if line:
+                                yielded = True
+                                yield json.loads(line)
+                        qgen_limit.succeeded()
+                        return
+                    retry_after = parse_retry_after(
+                        response.headers.get("Retry-After"), QGEN_DEFAULT_RETRY_AFTER
+                    )
+            except httpx.TimeoutException:
+                if yielded:
+                    yield {"title": "", "question": None, "ok": False, "error": "timed out mid-stream"}
+                    return
+                retry_after = QGEN_DEFAULT_RETRY_AFTER
+        generation_metrics["overloaded_responses"] += 1
+        qgen_limit.overloaded(retry_after)
+        print(f"question-gen overloaded, limit now {int(qgen_limit.limit)}")
+    raise RuntimeError(f"question-gen still overloaded after {QGEN_MAX_ATTEMPTS} attempts")
+
+async def store_questions(items):
+    """
+    Store generated questions in the database and the pools, and mark their
+    articles as used.
+
+    Parameters
+    ----------
+    items : list of tuples
+        (title, category, question) for each article, where question is the
+        question-gen dict or None if no question was generated for it.
+
+    Returns
+    -------
+    stored : int
+        The number of new questions stored.
+    """
+    generated = [(title, cat, q) for title, cat, q in items if q is not None]
+    async with get_db_connection() as conn, conn.transaction():
+        # rows go through COPY into a staging table, then are merged;
+        # a retried batch may bring questions stored by an earlier attempt
+        inserted = []
+        if generated:
+            await conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS question_staging (
+                    id VARCHAR(255),
+                    category VARCHAR(100),
+                    hint1 TEXT,
+                    hint2 TEXT,
+                    hint3 TEXT,
+                    answer TEXT
+                ) ON COMMIT DELETE ROWS
+            """)
+            await conn.copy_records_to_table(
+                "question_staging",
+                records=[
+                    (title, cat, q["prompt1"], q["prompt2"], q["prompt3"], q["answer"])
+                    for title, cat, q in generated
+                ]
+            )
+            inserted = await conn.fetch("""
+                INSERT INTO questions (id, category, hint1, hint2, hint3, answer)
+                SELECT id, category, hint1, hint2, hint3, answer FROM question_staging
+                ON CONFLICT (id) DO NOTHING
+                RETURNING id
+            """)
+
+        # Update last_used for articles and end their claim
+        query = """
+            UPDATE wiki_articles w
+            SET last_used = NOW(), claimed_until = NULL
+            FROM unnest($1::text[], $2::text[]) AS b(title, category)
+            WHERE w.title = b.title AND w.category = b.category;
+        """
+        await conn.execute(query, [t[0] for t in items], [t[1] for t in items])
+
+    inserted = {r["id"] for r in inserted}
+    stored = {}
+    new_qs = []
+    for title, cat, q in generated:
+        if title not in inserted:
+            continue
+        stored[cat] = stored.get(cat, 0) + 1
+        new_qs.append(Question(
+            id=title,
+            category=cat,
+            hint1=q["prompt1"],
+            hint2=q["prompt2"],
+            hint3=q["prompt3"],
+            answer=q["answer"],
+            created_at=datetime.datetime.utcnow(),
+            usage_count=0,
+            downvotes=0
+        ))
+    await update_category_counts(stored)
+
+    # Fresh questions are served from the shared pools right away
+    await add_to_pools(new_qs)
+    qgen_rate.record(len(new_qs))
+    return len(new_qs)
+
+async def store_stream_batch(items, stored, start):
+    """
+    Store a batch of streamed questions, recording the time to the first
+    stored question of the generation batch.
+
+    Parameters
+    ----------
+    items : list of tuples
+        (title, category, question) as taken by ``store_questions``.
+    stored : int
+        Questions of the generation batch stored so far.
+    start : float
+        ``time.perf_counter()`` when the generation batch was requested.
+    """
+    count = await store_questions(items)
+    if count and not stored:
+        generation_metrics["last_first_question_seconds"] = time.perf_counter() - start
+    return count
+
+async def fetch_and_store_questions(title_category_batch):
     """
     Fetch questions for a batch of articles and store them in the database.
+    Raises if question-gen or the database fails, so the job is retried.
+    If question-gen stops part way, what arrived is stored and
+    GenerationStopped names the articles left for the retry.
+
+    With QGEN_STREAM set, questions are requested from question-gen's
+    streaming endpoint and stored as they arrive, in batches of
+    QGEN_STREAM_FLUSH_SIZE, or sooner once the oldest waiting question has
+    waited QGEN_STREAM_FLUSH_INTERVAL seconds when the next one arrives.
 
     Parameters
     ----------
@@ -184,57 +825,60 @@ def fetch_and_store_questions(title_category_batch):
     print("Fetching questions for articles")
     print(title_category_batch)
     titles = [t[0] for t in title_category_batch]
-    categories = [t[1] for t in title_category_batch]
+    categories = dict(title_category_batch)
     payload = {
         "article_names": titles,
     }
 
-    # using synchronous client to avoid overloading question-gen
-    questions = []
-    with httpx.Client(timeout=httpx.Timeout(120.0, connect=10.0)) as client:
-        try:
-            print(">> Posting to question-gen with payload:", payload)
-
-            response = client.post("http://question-gen:8000/questions", json=payload)
-            response.raise_for_status()
-            questions = response.json()["questions"]
-            print("Fetched questions: ", questions)
-        except Exception as e:
-            print("Error fetching questions: ", e)
-            return
-        
-    # Store questions in database
-    with get_db_connection() as conn, conn.cursor() as cursor:
-        placeholders = ",".join(["(%s, %s, %s, %s, %s, %s)"] * len(questions))
-        query = f"""
-            INSERT INTO questions (id, category, hint1, hint2, hint3, answer) VALUES
-            {placeholders}
-            """
-        params = []
-        for i in range(len(questions)):
-            q = questions[i]
-            title = titles[i]
-            category = categories[i]
-            params.extend([
-                title,
-                category,
-                q["prompt1"],
-                q["prompt2"],
-                q["prompt3"],
-                q["answer"]
+    stored = 0
+    if QGEN_STREAM:
+        start = time.perf_counter()
+        pending = []
+        pending_since = None
+        received = set()
+        async with aclosing(stream_questions(payload)) as items:
+            async for item in items:
+                if not item["ok"]:
+                    # keep what was generated, the rest of the batch is retried
+                    if pending:
+                        await store_questions(pending)
+                    remaining = [t for t in title_category_batch if t[0] not in received]
+                    raise GenerationStopped(item["error"], remaining)
+                print("Fetched question: ", item)
+                if item["title"] not in categories:
+                    print("Skipping question for an article not in the batch: ", item["title"])
+                    continue
+                received.add(item["title"])
+                if not pending:
+                    pending_since = time.perf_counter()
+                pending.append((item["title"], categories[item["title"]], item["question"]))
+                if (len(pending) >= QGEN_STREAM_FLUSH_SIZE or
+                        time.perf_counter() - pending_since >= QGEN_STREAM_FLUSH_INTERVAL):
+                    stored += await store_stream_batch(pending, stored, start)
+                    pending = []
+        if pending:
+            stored += await store_stream_batch(pending, stored, start)
+    else:
+        response = await request_questions(payload)
+        questions = response["questions"]
+        print("Fetched questions: ", questions)
+        # questions are keyed by the article they came from, so articles
+        # question-gen skipped are marked used without a question
+        by_title = {q["title"]: q for q in questions if q.get("title") in categories}
+        if questions and not by_title:
+            raise RuntimeError("question-gen returned questions without their titles")
+        if response.get("ok", True):
+            stored = await store_questions([
+                (title, categories[title], by_title.get(title)) for title in titles
             ])
-        cursor.execute(query, params)
-        conn.commit()
-
-        # Update last_used for articles
-        placeholders = ",".join(["%s"] * len(titles))
-        query = f"""
-            UPDATE wiki_articles
-            SET last_used = NOW()
-            WHERE title IN ({placeholders});
-        """
-        cursor.execute(query, titles)
-        conn.commit()
+        else:
+            # keep what was generated, the rest of the batch is retried
+            await store_questions([(title, categories[title], q) for title, q in by_title.items()])
+            remaining = [t for t in title_category_batch if t[0] not in by_title]
+            raise GenerationStopped(response.get("error"), remaining)
+    if not stored:
+        raise RuntimeError("question-gen returned no questions")
+    generation_metrics["batches"] += 1
 
 # FastAPI app
 @asynccontextmanager
@@ -247,6 +891,7 @@ async def lifespan(app):
     starts the background scheduler.
     """
     print("Starting up")
+    startup_start = time.perf_counter()
 
     # Initialize Redis client (no need to manage connection pool)
     global redis_client
@@ -257,6 +902,63 @@ async def lifespan(app):
         decode_responses=True
     )
     redis_client = redis.Redis(connection_pool=redis_pool)
+    global question_store
+    question_store = QuestionStore(redis_client)
+    global unseen_policy
+    unseen_policy = UnseenPolicy(
+        redis_client,
+        question_store,
+        idle_ttl=UNSEEN_IDLE_TTL,
+        max_len=UNSEEN_MAX_LEN,
+        memory_budget=UNSEEN_MEMORY_BUDGET,
+        policy=UNSEEN_EVICTION_POLICY,
+        evict_batch=UNSEEN_EVICT_BATCH,
+        sample_size=UNSEEN_SAMPLE_SIZE
+    )
+    global qgen_client
+    qgen_client = httpx.AsyncClient(
+        base_url=QGEN_URL,
+        timeout=httpx.Timeout(QGEN_TIMEOUT, connect=10.0),
+        limits=httpx.Limits(max_connections=QGEN_CONCURRENCY, max_keepalive_connections=QGEN_CONCURRENCY)
+    )
+    global demand
+    demand = DemandTracker(redis_client, DEMAND_HALF_LIFE)
+    global category_counts
+    category_counts = CategoryCounts(
+        redis_client,
+        QCOUNT_LOW_WATERMARK,
+        QCOUNT_TRIGGER_COOLDOWN,
+        on_change=lambda counts: catalog.publish(counts)
+    )
+    global catalog
+    catalog = CategoryCatalog(redis_client, category_counts.get)
+    global write_buffer
+    write_buffer = WriteBehindBuffer(
+        get_db_connection,
+        WRITE_BEHIND_MAX_PENDING,
+        USAGE_THRESHOLD,
+        on_exhausted=lambda counts: update_category_counts({cat: -n for cat, n in counts.items()}),
+        max_attempts=WRITE_BEHIND_MAX_ATTEMPTS
+    )
+    global downvote_counter
+    downvote_counter = DownvoteCounter(redis_client, get_db_connection, DOWNVOTE_THRESHOLD)
+    global getbatch_flight
+    getbatch_flight = SingleFlight(
+        redis_client,
+        encode=lambda resp: resp.json(),
+        decode=GameBatchResp.parse_raw,
+        lease_ttl=SINGLEFLIGHT_LEASE_TTL,
+        result_ttl=SINGLEFLIGHT_RESULT_TTL,
+        poll_interval=SINGLEFLIGHT_POLL_INTERVAL
+    )
+    global seen_set
+    seen_set = make_seen_set(
+        redis_client,
+        SEEN_FILTER_MODE,
+        SEEN_TTL,
+        SEEN_BLOOM_CAPACITY,
+        SEEN_BLOOM_FP_RATE
+    )
     # Test Redis connection
     try:
         await redis_client.ping()
@@ -265,27 +967,40 @@ async def lifespan(app):
         print("Failed to connect to Redis")
         raise
 
-    # Test database connection
+    # Initialize and test database connection pool
+    global db_conn_pool
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
+        db_conn_pool = await create_db_pool()
+        async with get_db_connection() as conn:
+            await conn.fetchval("SELECT 1")
             print("Connected to PostgreSQL")
-            cursor.close()
     except Exception as e:
         print("Failed to connect to PostgreSQL", e)
         raise
 
-    # Fetch categories from databse
-    print("Fetching categories")
+    # Load categories and pools from the snapshot when warm starting,
+    # otherwise fetch categories from the database
     global CATEGORIES
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT category FROM wiki_articles")
-        CATEGORIES = cursor.fetchall()
-        CATEGORIES = [c[0] for c in CATEGORIES]
-        cursor.close()
+    snapshot = None
+    if WARM_START:
+        snapshot = await asyncio.to_thread(load_snapshot, SNAPSHOT_PATH, SNAPSHOT_MAX_AGE)
+    if snapshot:
+        CATEGORIES = snapshot["categories"]
+        try:
+            startup_metrics["pools_restored"] = await restore_pools(snapshot["pools"])
+        except (redis.RedisError, asyncpg.PostgresError) as e:
+            print("Failed to restore pools", e)
+        spawn(refresh_categories())
+    else:
+        print("Fetching categories")
+        CATEGORIES = await fetch_categories()
     print("Categories: ", CATEGORIES)
+    try:
+        await catalog.sync(CATEGORIES)
+    except redis.RedisError as e:
+        print("Failed to load category catalog", e)
+    global catalog_listener
+    catalog_listener = spawn(catalog.listen())
 
     # Start background scheduler
     scheduler.add_job(
@@ -295,20 +1010,65 @@ async def lifespan(app):
         replace_existing=False,
     )
     scheduler.add_job(
-        generate_questions_as_needed,
+        reconcile_category_counts,
         trigger=IntervalTrigger(minutes=GENERATE_CHECK_PERIOD),
         next_run_time=datetime.datetime.now(), # run right away, then periodically
+        id="reconcile_category_counts",
+        replace_existing=False,
+    )
+    scheduler.add_job(
+        generate_questions_as_needed,
+        trigger=IntervalTrigger(minutes=GENERATE_PLAN_PERIOD),
         id="generate_questions",
         replace_existing=False,
     )
+    scheduler.add_job(
+        flush_write_buffer,
+        trigger=IntervalTrigger(seconds=WRITE_BEHIND_FLUSH_INTERVAL),
+        id="flush_write_buffer",
+        replace_existing=False,
+    )
+    scheduler.add_job(
+        run_generation_jobs,
+        trigger=IntervalTrigger(seconds=GENERATION_POLL_INTERVAL),
+        id="run_generation_jobs",
+        replace_existing=False,
+    )
+    scheduler.add_job(
+        flush_downvotes,
+        trigger=IntervalTrigger(seconds=DOWNVOTE_FLUSH_INTERVAL),
+        id="flush_downvotes",
+        replace_existing=False,
+    )
+    scheduler.add_job(
+        evict_unseen_lists,
+        trigger=IntervalTrigger(minutes=UNSEEN_EVICT_PERIOD),
+        id="evict_unseen_lists",
+        replace_existing=False,
+    )
+    scheduler.add_job(
+        save_cache_snapshot,
+        trigger=IntervalTrigger(minutes=SNAPSHOT_PERIOD),
+        id="save_cache_snapshot",
+        replace_existing=False,
+    )
     scheduler.start()
 
+    startup_metrics["seconds"] = time.perf_counter() - startup_start
+    startup_metrics["warm"] = snapshot is not None
+    print(f"Started in {startup_metrics['seconds']:.3f}s ({'warm' if snapshot else 'cold'})")
+
     yield
 
     print("Shutting down")
-    db_conn_pool.closeall()
-    await redis_client.aclose()
     scheduler.shutdown(wait=False)
+    catalog_listener.cancel()
+    await save_cache_snapshot()
+    await flush_write_buffer()
+    await flush_downvotes()
+    await db_conn_pool.close()
+    await redis_client.aclose()
+    await qgen_client.aclose()
 
 app = FastAPI(lifespan=lifespan, openapi_tags=tags_metadata)
 app.add_middleware(
@@ -325,6 +1085,10 @@ async def read_root():
 async def get_redis_batch(batch_req: GameBatchReq):
     """
     Check Redis cache for unseen questions for the user.
+
+    Takes up to the requested count from each of the user's unseen lists in a
+    single atomic script call, which also reports the per-category shortfall,
+    so the forwarded request is built without decoding any cached question.
     
     Parameters
     ----------
@@ -333,37 +1097,482 @@ async def get_redis_batch(batch_req: GameBatchReq):
     """
     print("CHECKING CACHE")
     user_id = batch_req.user_id
-    async with redis_client.pipeline(transaction=True) as pipe:
-        for elem in batch_req.batch:
-            count = elem.count
-            cache_key = f"unseen:{user_id}:{elem.category}"
-            pipe.lrange(cache_key, 0, count-1)
-            pipe.ltrim(cache_key, count, -1) # remove the unseen questions from cache
-        cached_results = await pipe.execute()
-    print(f"Cached results: {cached_results}")
+    keys = [unseen_policy.list_key(user_id, elem.category) for elem in batch_req.batch]
+    counts = [elem.count for elem in batch_req.batch]
+    await unseen_policy.touch(user_id)
+    items, shortfalls = await question_store.take(keys, counts)
+    print(f"Cached results: {items}")
 
     # see how many questions we need to fetch from db
-    counts = {elem.category: elem.count for elem in batch_req.batch}
+    missing = {}
+    for elem, shortfall in zip(batch_req.batch, shortfalls):
+        if shortfall > 0:
+            missing[elem.category] = missing.get(elem.category, 0) + shortfall
+
+    fwd_batch_req = GameBatchReq(
+        user_id=user_id,
+        batch_size=batch_req.batch_size,
+        batch=[_GameBatchReqElem(category=k, count=v) for k, v in missing.items()]
+    )
+
+    return [Question.parse_raw(q) for q in items], fwd_batch_req
+
+async def hydrate_seen_set(user_id):
+    """
+    Load the user's history from user_question_store into the Redis seen set,
+    unless it is already there.
+    """
+    if await seen_set.is_ready(user_id):
+        return
+    async with get_db_connection() as conn:
+        rows = await conn.fetch(
+            "SELECT question_id FROM user_question_store WHERE user_id = $1",
+            user_id
+        )
+    await seen_set.hydrate(user_id, [r["question_id"] for r in rows])
+
+def row_to_question(q):
+    """
+    Build a Question from a ``SELECT * FROM questions`` row.
+    """
+    return Question(
+        id=q["id"],
+        category=q["category"],
+        hint1=q["hint1"],
+        hint2=q["hint2"],
+        hint3=q["hint3"],
+        answer=q["answer"],
+        created_at=q["created_at"],
+        usage_count=q["usage_count"],
+        downvotes=q["downvote_count"]
+    )
+
+async def record_served(user_id, questions):
+    """
+    Record that questions were served to a user: bump their usage counts,
+    add them to user_question_store and to the user's seen set, and count
+    them towards their categories' demand.
+
+    The seen set is updated right away. The database writes go through the
+    write-behind buffer and, unless WRITE_BEHIND_MODE is "sync", happen
+    after the response on a timer or once the buffer is full.
+
+    Parameters
+    ----------
+    user_id : str
+        The user the questions were served to.
+    questions : list of Question
+        The served questions.
+    """
+    if not questions:
+        return
+    ids = [q.id for q in questions]
+    await seen_set.add(user_id, ids)
+    served = {}
+    for q in questions:
+        served[q.category] = served.get(q.category, 0) + 1
+    await demand.record(served)
+    await remove_used_up(questions)
+    should_flush = write_buffer.add(user_id, ids)
+    if WRITE_BEHIND_MODE == "sync":
+        await write_buffer.flush()
+    elif should_flush:
+        spawn(flush_write_buffer())
+
+async def remove_used_up(questions):
+    """
+    Count served questions towards USAGE_THRESHOLD in Redis, and remove the
+    ones reaching it from their category's pool.
+
+    A question's count starts from the usage_count of the body that was
+    served, as the database only catches up when the write-behind buffer
+    flushes.
+    """
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for q in questions:
+            pipe.hsetnx(USAGE_TOTALS_KEY, q.id, q.usage_count)
+            pipe.hincrby(USAGE_TOTALS_KEY, q.id, 1)
+        totals = (await pipe.execute())[1::2]
+    used_up = {}
+    for q, total in zip(questions, totals):
+        if total >= USAGE_THRESHOLD:
+            used_up.setdefault(q.category, []).append(q.id)
+    for cat, ids in used_up.items():
+        await question_store.remove([POOL_KEY.format(category=cat)], ids)
+
+async def refill_pool(category):
+    """
+    Rebuild the shared pool for a category with a shuffled sample of its questions.
+
+    Only one caller across all replicas refills a given category at a time.
+
+    Parameters
+    ----------
+    category : str
+        The category to refill.
+    """
+    lock_key = POOL_LOCK_KEY.format(category=category)
+    if not await redis_client.set(lock_key, 1, nx=True, ex=30):
+        return
+    try:
+        print(f"Refilling pool for category {category}")
+        async with get_db_connection() as conn:
+            rows = await sample_questions(conn, category, POOL_SIZE)
+        if not rows:
+            return
+        random.shuffle(rows)
+        await question_store.push(
+            POOL_KEY.format(category=category),
+            [row_to_question(r) for r in rows],
+            replace=True
+        )
+        await redis_client.set(POOL_FRESH_KEY.format(category=category), 1, ex=POOL_TTL)
+    finally:
+        await redis_client.delete(lock_key)
+
+async def add_to_pools(questions):
+    """
+    Append questions to the pools of their categories.
+    """
+    by_category = {}
+    for q in questions:
+        by_category.setdefault(q.category, []).append(q)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for cat, qs in by_category.items():
+            await question_store.push(POOL_KEY.format(category=cat), qs, client=pipe)
+        await pipe.execute()
+
+async def save_cache_snapshot():
+    """
+    Save the categories and the current contents of every pool to SNAPSHOT_PATH.
+    """
+    if not CATEGORIES:
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for cat in CATEGORIES:
+                await question_store.read_window(POOL_KEY.format(category=cat), POOL_SIZE, 0, client=pipe)
+            windows = await pipe.execute()
+        pools = {cat: bodies for cat, bodies in zip(CATEGORIES, windows) if bodies}
+        await asyncio.to_thread(save_snapshot, SNAPSHOT_PATH, CATEGORIES, pools)
+        print(f"Saved snapshot of {len(pools)} pools to {SNAPSHOT_PATH}")
+    except (redis.RedisError, OSError) as e:
+        print("Failed to save snapshot", e)
+
+async def servable_ids(question_ids):
+    """
+    The subset of ``question_ids`` still in the database and not used up,
+    downvoted out or too old.
+    """
+    async with get_db_connection() as conn:
+        rows = await conn.fetch("""
+            SELECT id FROM questions
+            WHERE
+                id = ANY($1::text[]) AND
+                usage_count < $2 AND
+                downvote_count < $3 AND
+                created_at >= NOW() - $4::interval
+        """,
+            question_ids,
+            USAGE_THRESHOLD,
+            DOWNVOTE_THRESHOLD,
+            datetime.timedelta(days=QUESTION_MAX_AGE)
+        )
+    return {r["id"] for r in rows}
+
+async def restore_pools(pools):
+    """
+    Rebuild pools from a snapshot, leaving alone pools that are still fresh
+    in Redis or being refilled.
+
+    Questions deleted or no longer servable since the snapshot was saved are
+    dropped, checked against the database in one query.
+
+    Parameters
+    ----------
+    pools : dict
+        Serialized question bodies in pool order, by category.
+
+    Returns
+    -------
+    restored : int
+        Number of pools rebuilt.
+    """
+    questions = {cat: [Question.parse_raw(b) for b in bodies] for cat, bodies in pools.items()}
+    servable = await servable_ids([q.id for qs in questions.values() for q in qs])
+    restored = 0
+    for cat, qs in questions.items():
+        qs = [q for q in qs if q.id in servable]
+        if not qs or await redis_client.exists(POOL_FRESH_KEY.format(category=cat)):
+            continue
+        lock_key = POOL_LOCK_KEY.format(category=cat)
+        if not await redis_client.set(lock_key, 1, nx=True, ex=30):
+            continue
+        try:
+            await question_store.push(POOL_KEY.format(category=cat), qs, replace=True)
+            await redis_client.set(POOL_FRESH_KEY.format(category=cat), 1, ex=POOL_TTL)
+            restored += 1
+        finally:
+            await redis_client.delete(lock_key)
+    return restored
+
+async def fetch_categories():
+    """
+    Read the categories of the known wiki articles from the database.
+    """
+    async with get_db_connection() as conn:
+        rows = await conn.fetch("SELECT DISTINCT category FROM wiki_articles")
+    return [c["category"] for c in rows]
+
+async def refresh_categories():
+    """
+    Replace snapshot categories with the ones in the database.
+    """
+    global CATEGORIES
+    try:
+        CATEGORIES = await fetch_categories()
+        await catalog.sync(CATEGORIES)
+    except Exception as e:
+        print("Failed to refresh categories", e)
+
+async def get_pool_batch(batch_req: GameBatchReq):
+    """
+    Draw unseen questions for the user from the shared category pools.
+
+    A random window of each pool is read and filtered against the user's seen
+    set. Missing or stale pools are refilled in the background; until then
+    the request is served from what is there and falls through to the
+    database for the rest.
+
+    Parameters
+    ----------
+    batch_req : GameBatchReq
+        The batch request containing user_id and batch of categories and counts.
+
+    Returns
+    -------
+    (return_qs, fwd_batch_req) : tuple
+        The questions drawn from the pools and a request for the remainder.
+    """
+    print("CHECKING POOLS")
+    user_id = batch_req.user_id
+    counts = {}
+    for elem in batch_req.batch:
+        counts[elem.category] = counts.get(elem.category, 0) + elem.count
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for cat, count in counts.items():
+            pipe.exists(POOL_FRESH_KEY.format(category=cat))
+            await question_store.read_window(
+                POOL_KEY.format(category=cat),
+                count * POOL_DRAW_FACTOR,
+                random.random(),
+                client=pipe
+            )
+        results = await pipe.execute()
+
+    candidates = {}
+    for cat, fresh, window in zip(counts, results[0::2], results[1::2]):
+        if not fresh:
+            spawn(refill_pool(cat))
+        for raw in window:
+            q = Question.parse_raw(raw)
+            candidates.setdefault(q.id, q)
+    if not candidates:
+        return [], batch_req
+
+    await hydrate_seen_set(user_id)
+    unseen = await seen_set.filter_unseen(user_id, list(candidates))
     return_qs = []
-    for i in range(0, len(cached_results), 2):
-        for q in cached_results[i]:
-            print(q)
-            q = Question.parse_raw(q)
+    for qid in unseen:
+        q = candidates[qid]
+        if counts.get(q.category, 0) > 0:
             return_qs.append(q)
-
-            if counts[q.category] > 0:
-                counts[q.category] -= 1
-                if counts[q.category] == 0:
-                    del counts[q.category]
+            counts[q.category] -= 1
+    await record_served(user_id, return_qs)
 
     fwd_batch_req = GameBatchReq(
         user_id=user_id,
         batch_size=batch_req.batch_size,
-        batch=[_GameBatchReqElem(category=k, count=v) for k, v in counts.items()]
+        batch=[_GameBatchReqElem(category=k, count=v) for k, v in counts.items() if v > 0]
     )
-
     return return_qs, fwd_batch_req
 
+class CandidateCursor:
+    """
+    Position of the candidate scan for one category.
+
+    In "sequential" mode the scan walks the category in id order from
+    ``start``, the id where the user's previous scan stopped, up to the end
+    of the (category, id) index and then wraps around to ``start``. In
+    "random" mode it starts at a random rank, walks up to the end of the
+    (category, random_rank) index and then wraps around to the start rank,
+    so every pick is an index seek and load spreads over the whole bank.
+    """
+    def __init__(self, mode, start=""):
+        self.mode = mode
+        self.done = False
+        if mode == "sequential":
+            self.start = start
+            self.after = start
+            self.upto = None
+            # a scan from the head has nothing to wrap around to
+            self.wrapped = not start
+        elif mode == "random":
+            self.start = random.random()
+            self.after = self.start
+            self.upto = 1.0
+            self.wrapped = False
+        else:
+            raise ValueError(f"Unknown selection mode: {mode}")
+
+    def page_query(self, category, limit, n):
+        """
+        SQL for the next page, with parameters numbered from ``$n + 1``.
+        """
+        if self.mode == "sequential":
+            if self.upto is None:
+                query = f"""
+                    (SELECT * FROM questions
+                    WHERE category = ${n + 1} AND id > ${n + 2}
+                    ORDER BY id
+                    LIMIT ${n + 3})
+                """
+                return query, [category, self.after, limit]
+            query = f"""
+                (SELECT * FROM questions
+                WHERE category = ${n + 1} AND id > ${n + 2} AND id <= ${n + 3}
+                ORDER BY id
+                LIMIT ${n + 4})
+            """
+            return query, [category, self.after, self.upto, limit]
+        query = f"""
+            (SELECT * FROM questions
+            WHERE category = ${n + 1}
+                AND random_rank > ${n + 2} AND random_rank <= ${n + 3}
+            ORDER BY random_rank
+            LIMIT ${n + 4})
+        """
+        return query, [category, self.after, self.upto, limit]
+
+    def advance(self, last_row, page_count, limit):
+        """
+        Move past a page of ``page_count`` rows ending at ``last_row``.
+        """
+        if last_row is not None:
+            self.after = last_row["id" if self.mode == "sequential" else "random_rank"]
+        if page_count < limit:
+            if self.wrapped:
+                self.done = True
+            else:
+                self.wrapped = True
+                self.after = "" if self.mode == "sequential" else -1.0
+                self.upto = self.start
+
+async def sample_questions(conn, category, count):
+    """
+    Fetch up to ``count`` random questions of a category.
+
+    Uses a seek into the (category, random_rank) index from a random start,
+    wrapping around, instead of sorting the whole category by random().
+    """
+    if DB_SELECT_MODE != "random":
+        return await conn.fetch("""
+            SELECT * FROM questions
+            WHERE category = $1
+            ORDER BY random()
+            LIMIT $2
+        """, category, count)
+    rows = await conn.fetch("""
+        (SELECT * FROM questions
+        WHERE category = $1 AND random_rank >= $2
+        ORDER BY random_rank
+        LIMIT $3)
+        UNION ALL
+        (SELECT * FROM questions
+        WHERE category = $1 AND random_rank < $2
+        ORDER BY random_rank
+        LIMIT $3)
+    """, category, random.random(), count)
+    return rows[:count]
+
+async def fetch_unseen_candidates(conn, user_id, wanted):
+    """
+    Page through candidate questions per category, keeping the ones the user
+    has not seen according to the Redis seen set.
+
+    Each round asks Postgres for the next page of every category that is
+    still short, walking an index chosen by DB_SELECT_MODE, so the database
+    never has to join against the user's history. A category's page doubles
+    every round it stays short, up to SEEN_MAX_CANDIDATE_PAGE, so players
+    who have seen most of a category get through it in a few rounds. In
+    "sequential" mode the scan resumes after the last question picked for
+    the user by the previous scan, rather than from the head of the index
+    every time.
+
+    Parameters
+    ----------
+    conn : asyncpg.Connection
+        Connection to run the candidate queries on.
+    user_id : str
+        The user to fetch questions for.
+    wanted : dict
+        The number of unseen questions wanted for each category.
+
+    Returns
+    -------
+    rows : list of asyncpg.Record
+        Unseen question rows, at most ``wanted[category]`` per category.
+    """
+    rows = []
+    remaining = dict(wanted)
+    cursor_keys = {cat: SEEN_CURSOR_KEY.format(user_id=user_id, category=cat) for cat in wanted}
+    if DB_SELECT_MODE == "sequential":
+        starts = await redis_client.mget(list(cursor_keys.values()))
+        cursors = {cat: CandidateCursor(DB_SELECT_MODE, start or "") for cat, start in zip(wanted, starts)}
+    else:
+        cursors = {cat: CandidateCursor(DB_SELECT_MODE) for cat in wanted}
+    page_sizes = {cat: count * SEEN_CANDIDATE_FACTOR for cat, count in wanted.items()}
+    last_picked = {}
+    for _ in range(SEEN_MAX_CANDIDATE_ROUNDS):
+        if not remaining:
+            break
+        queries = []
+        params = []
+        for cat in remaining:
+            query, query_params = cursors[cat].page_query(cat, page_sizes[cat], len(params))
+            queries.append(query)
+            params.extend(query_params)
+        candidates = await conn.fetch(" UNION ALL ".join(queries), *params)
+
+        unseen = set(await seen_set.filter_unseen(user_id, [c["id"] for c in candidates]))
+        page_counts = {cat: 0 for cat in remaining}
+        last_rows = {cat: None for cat in remaining}
+        for c in candidates:
+            cat = c["category"]
+            page_counts[cat] += 1
+            last_rows[cat] = c # pages are ordered by the index being walked
+            if c["id"] in unseen and remaining[cat] > 0:
+                rows.append(c)
+                remaining[cat] -= 1
+                last_picked[cat] = c["id"]
+
+        # drop categories that are satisfied or have no more candidates,
+        # and widen the next page of the others
+        for cat in list(remaining):
+            cursors[cat].advance(last_rows[cat], page_counts[cat], page_sizes[cat])
+            if remaining[cat] == 0 or cursors[cat].done:
+                del remaining[cat]
+            else:
+                page_sizes[cat] = min(page_sizes[cat] * 2, SEEN_MAX_CANDIDATE_PAGE)
+
+    if DB_SELECT_MODE == "sequential" and last_picked:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for cat, qid in last_picked.items():
+                pipe.set(cursor_keys[cat], qid, ex=SEEN_TTL)
+            await pipe.execute()
+    return rows
+
 async def get_db_batch(batch_req: GameBatchReq, fetch_count: int = 10):
     """
     Fetch a batch of questions from the database.
@@ -377,83 +1586,41 @@ async def get_db_batch(batch_req: GameBatchReq, fetch_count: int = 10):
     """
     print("CHECKING DB")
     user_id = batch_req.user_id
-    queries = []
-    params = []
+    wanted = {}
     for elem in batch_req.batch:
-        query = f"""
-            (SELECT * FROM questions q
-            LEFT JOIN user_question_store uqs
-                ON q.id = uqs.question_id
-                AND uqs.user_id = %s
-            WHERE uqs.question_id IS NULL
-                AND q.category = %s
-            LIMIT %s)
-        """
-        queries.append(query)
-        params.extend([user_id, elem.category, max(fetch_count, elem.count)])       
-    query = " UNION ALL ".join(queries)
-    
+        wanted[elem.category] = wanted.get(elem.category, 0) + max(fetch_count, elem.count)
+
     questions = []
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        questions = cursor.fetchall()
+    await hydrate_seen_set(user_id)
+    async with get_db_connection() as conn:
+        questions = await fetch_unseen_candidates(conn, user_id, wanted)
 
-        print("Fetched questions: ", questions)
-        questions = [Question(
-            id=q[0],
-            category=q[1],
-            hint1=q[2],
-            hint2=q[3],
-            hint3=q[4],
-            answer=q[5],
-            created_at=q[6],
-            usage_count=q[7],
-            downvotes=q[8]
-        ) for q in questions]
-        
-        if not questions:
-            return
-        # update usage count
-        placeholders = ",".join(["%s"] * len(questions))
-        query = f"""
-            UPDATE questions
-            SET usage_count = usage_count + 1
-            WHERE id IN ({placeholders})
-        """
-        params = [q.id for q in questions]
-        cursor.execute(query, params)
+    print("Fetched questions: ", questions)
+    questions = [row_to_question(q) for q in questions]
+    
+    if not questions:
+        return
+    await record_served(user_id, questions)
 
-        # update user_quesiton_store
-        placeholders = ",".join(["(%s, %s)"] * len(questions))
-        query = f"""
-            INSERT INTO user_question_store (user_id, question_id) VALUES 
-            {placeholders}
-        """
-        params = [ item for q in questions for item in (user_id, q.id) ]
-        cursor.execute(query, params)
-        conn.commit()
-        cursor.close()
-
-        # split questions into return and excess
-        return_qs = []
-        excess_qs = []
-        counts = {elem.category: elem.count for elem in batch_req.batch}
-        for q in questions:
-            if counts[q.category] > 0:
-                counts[q.category] -= 1
-                return_qs.append(q)
-            else:
-                excess_qs.append(q)
-        # cache excess questions
-        print("Caching excess questions: ", excess_qs)
-        async with redis_client.pipeline(transaction=True) as pipe:
-            for q in excess_qs:
-                cache_key = f"unseen:{user_id}:{q.category}"
-                pipe.rpush(cache_key, q.json())
-            await pipe.execute()
+    # split questions into return and excess
+    return_qs = []
+    excess_qs = []
+    counts = {elem.category: elem.count for elem in batch_req.batch}
+    for q in questions:
+        if counts[q.category] > 0:
+            counts[q.category] -= 1
+            return_qs.append(q)
+        else:
+            excess_qs.append(q)
+    # cache excess questions
+    print("Caching excess questions: ", excess_qs)
+    by_category = {}
+    for q in excess_qs:
+        by_category.setdefault(q.category, []).append(q)
+    if by_category:
+        await unseen_policy.push(user_id, by_category)
 
-        return return_qs
+    return return_qs
 
 @app.post("/getbatch/", tags=["getbatch"])
 async def serve_game_batch(batch_req: GameBatchReq) -> GameBatchResp:
@@ -472,12 +1639,28 @@ async def serve_game_batch(batch_req: GameBatchReq) -> GameBatchResp:
 
         The response containing the batch of questions.
     """
+    # duplicates of an in-flight request, on any replica, get the same batch
+    key = flight_key(
+        batch_req.user_id,
+        sorted((elem.category, elem.count) for elem in batch_req.batch)
+    )
+    return await getbatch_flight.do(key, lambda: build_game_batch(batch_req))
 
+async def build_game_batch(batch_req: GameBatchReq) -> GameBatchResp:
+    """
+    Build a batch from the user's unseen lists, then the pools, then the database.
+    """
     cached_qs, fwd_req = await get_redis_batch(batch_req)
     print("FWD REQ: ", fwd_req)
     if len(fwd_req.batch) == 0:
         return GameBatchResp(batch=cached_qs)
 
+    pool_qs, fwd_req = await get_pool_batch(fwd_req)
+    cached_qs += pool_qs
+    print("FWD REQ AFTER POOLS: ", fwd_req)
+    if len(fwd_req.batch) == 0:
+        return GameBatchResp(batch=cached_qs)
+
     db_results = await get_db_batch(fwd_req)
     print("DB RESULTS: ", db_results)
     print("CACHED QS: ", cached_qs)
@@ -487,6 +1670,10 @@ async def serve_game_batch(batch_req: GameBatchReq) -> GameBatchResp:
 async def downvote_questions(downvote_req: DownvoteBatchReq):
     """
     Downvote a batch of questions.
+
+    Downvotes are counted in Redis and written to the database in batches.
+    A question reaching DOWNVOTE_THRESHOLD is pulled from the cache right
+    away and deleted from the database by an immediate flush.
     
     Parameters
     ----------
@@ -495,24 +1682,73 @@ async def downvote_questions(downvote_req: DownvoteBatchReq):
         The batch request containing user_id and batch of question ids.
         Should be part of payload for request, not query params.
     """
-    # update database records
     print("Downvoting questions: ", downvote_req)
     if len(downvote_req.batch) == 0:
         return {"status": "success"}
 
-    placeholders = ",".join(["%s"] * len(downvote_req.batch))
-    query = f"""
-        UPDATE questions
-        SET downvote_count = downvote_count + 1
-        WHERE id IN ({placeholders})"""
-    
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, downvote_req.batch)
-        conn.commit()
-        cursor.close()
+    crossed = await downvote_counter.add(downvote_req.batch)
+    if crossed:
+        print("Questions over the downvote threshold: ", crossed)
+        # questions without a cached body are in no pool, the flush deletes them
+        categories = await question_store.categories(crossed)
+        await evict_from_cache(ids_by_category(
+            {"id": qid, "category": cat} for qid, cat in categories.items()
+        ))
+        spawn(flush_downvotes())
     return {"status": "success"}
 
+@app.get("/cachestats/", tags=["cachestats"])
+async def cache_stats():
+    """
+    Report Redis memory usage per key family and of the per-user unseen lists.
+
+    Scans the keyspace, so it is meant for occasional monitoring.
+    """
+    usage = await unseen_policy.usage()
+    return {
+        "families": await key_family_usage(redis_client),
+        "unseen": {
+            **usage,
+            "budget_bytes": UNSEEN_MEMORY_BUDGET,
+            "policy": UNSEEN_EVICTION_POLICY,
+            "max_len": UNSEEN_MAX_LEN,
+            "idle_ttl": UNSEEN_IDLE_TTL,
+        },
+    }
+
+@app.get("/categories/", tags=["categories"])
+def get_categories():
+    """
+    Categories with the number of questions available in each and when
+    that number last changed, from this replica's in-memory catalog.
+    """
+    return catalog.snapshot()
+
+@app.get("/jobs/", tags=["jobs"])
+async def get_job_queue_depth():
+    """
+    Number of generation jobs pending, running and dead-lettered, and the
+    age in seconds of the oldest pending one.
+    """
+    return await job_queue.depth()
+
+@app.get("/metrics", tags=["metrics"])
+def get_metrics():
+    """
+    Counters and timings of startup and the background jobs.
+    """
+    return {
+        "startup": startup_metrics,
+        "eviction": evictor.metrics,
+        "generation": {
+            **generation_metrics,
+            "questions_generated": qgen_rate.total,
+            "questions_per_minute": qgen_rate.per_minute(),
+            "concurrency_limit": int(qgen_limit.limit),
+            "in_flight": qgen_limit.in_flight,
+        },
+    }
+
 @app.get("/health", tags=["health"])
 def health_check():
     """
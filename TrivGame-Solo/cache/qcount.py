@@ -0,0 +1,78 @@
+COUNT_KEY = "qcount"
+TRIGGER_KEY = "qcount:{category}:triggered"
+
+
+class CategoryCounts:
+    """
+    Number of servable questions per category, kept in the ``qcount`` hash.
+
+    Counts go up when questions are stored and down when a question is used
+    up, downvoted out or evicted for age, so a category running low is seen
+    as soon as it happens instead of at the next full count. ``reset``
+    overwrites them with counts taken from the database.
+
+    Attributes
+    ----------
+    redis_client : redis.asyncio.Redis
+        The Redis client holding the counts.
+    low_watermark : int
+        Count below which a category needs more questions.
+    trigger_cooldown : int
+        Seconds after a low category is reported before it can be reported
+        again, across replicas.
+    on_change : callable, optional
+        Awaited with the new count of every category that changed.
+    """
+    def __init__(self, redis_client, low_watermark, trigger_cooldown, on_change=None):
+        self.redis_client = redis_client
+        self.low_watermark = low_watermark
+        self.trigger_cooldown = trigger_cooldown
+        self.on_change = on_change
+
+    async def add(self, deltas):
+        """
+        Apply count changes by category.
+
+        Returns
+        -------
+        low : list of str
+            Categories below the low watermark that this call claimed for
+            generation.
+        """
+        deltas = {cat: n for cat, n in deltas.items() if n}
+        if not deltas:
+            return []
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cat, n in deltas.items():
+                pipe.hincrby(COUNT_KEY, cat, n)
+            counts = dict(zip(deltas, await pipe.execute()))
+        if self.on_change is not None:
+            await self.on_change(counts)
+        return await self.claim_low([
+            cat for cat, count in counts.items() if count < self.low_watermark
+        ])
+
+    async def claim_low(self, categories):
+        """
+        Keep the categories no other caller reported within the cooldown.
+        """
+        claimed = []
+        for cat in categories:
+            if await self.redis_client.set(
+                TRIGGER_KEY.format(category=cat), 1, nx=True, ex=self.trigger_cooldown
+            ):
+                claimed.append(cat)
+        return claimed
+
+    async def reset(self, counts):
+        """
+        Overwrite the counts, e.g. with ones taken from the database.
+        """
+        if counts:
+            await self.redis_client.hset(COUNT_KEY, mapping=counts)
+            if self.on_change is not None:
+                await self.on_change(counts)
+
+    async def get(self):
+        counts = await self.redis_client.hgetall(COUNT_KEY)
+        return {cat: int(n) for cat, n in counts.items()}
@@ -0,0 +1,110 @@
+import asyncio
+import collections
+import time
+
+
+class GenerationStopped(RuntimeError):
+    """
+    question-gen stopped part way through a batch.
+
+    Attributes
+    ----------
+    remaining : list of tuples
+        The (title, category) pairs it did not get to, the only ones a retry
+        needs to ask for again.
+    """
+    def __init__(self, error, remaining):
+        super().__init__(f"question-gen stopped: {error}")
+        self.remaining = remaining
+
+
+def parse_retry_after(value, default):
+    """
+    Seconds to wait from a Retry-After header, or ``default`` if it is
+    missing or not a number of seconds.
+    """
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit for calls to question-gen that adapts to its responses.
+
+    Used as ``async with limit:`` around each call. Successful calls raise
+    the limit by about one per ``limit`` successes, up to ``max_limit``;
+    an overloaded response halves it and holds back every new call until
+    the server's Retry-After has passed (additive increase, multiplicative
+    decrease).
+
+    Attributes
+    ----------
+    max_limit : int
+        The most calls allowed in flight.
+    limit : float
+        The current limit, between 1 and ``max_limit``.
+    in_flight : int
+        Calls currently running.
+    """
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.cond:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(self.cond.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < int(self.limit):
+                    break
+                await self.cond.wait()
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+        return False
+
+    def succeeded(self):
+        self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def overloaded(self, retry_after):
+        self.limit = max(1.0, self.limit / 2)
+        self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+
+
+class RateMeter:
+    """
+    Events per minute over a sliding window.
+
+    Attributes
+    ----------
+    window : float
+        Seconds of history kept.
+    """
+    def __init__(self, window=60.0):
+        self.window = window
+        self.events = collections.deque()
+        self.total = 0
+
+    def record(self, n=1):
+        self.events.append((time.monotonic(), n))
+        self.total += n
+
+    def per_minute(self):
+        cutoff = time.monotonic() - self.window
+        while self.events and self.events[0][0] < cutoff:
+            self.events.popleft()
+        return sum(n for _, n in self.events) * 60 / self.window
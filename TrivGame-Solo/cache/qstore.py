@@ -0,0 +1,276 @@
+import json
+
+BODY_KEY = "qbody"
+REFS_KEY = "qbody:refs"
+
+# KEYS: list, bodies, refs. ARGV[1]: "1" to release the list first,
+# ARGV[2]: max list length (0 for no cap), then id, body pairs. Stores each
+# body once and counts one reference per entry. Entries beyond the cap are
+# dropped from the head of the list.
+PUSH_LUA = """
+local list, bodies, refs = KEYS[1], KEYS[2], KEYS[3]
+local function release(id)
+    if redis.call('HINCRBY', refs, id, -1) <= 0 then
+        redis.call('HDEL', refs, id)
+        redis.call('HDEL', bodies, id)
+    end
+end
+if ARGV[1] == '1' then
+    for _, id in ipairs(redis.call('LRANGE', list, 0, -1)) do
+        release(id)
+    end
+    redis.call('DEL', list)
+end
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', bodies, ARGV[i], ARGV[i + 1])
+    redis.call('HINCRBY', refs, ARGV[i], 1)
+    redis.call('RPUSH', list, ARGV[i])
+end
+local max_len = tonumber(ARGV[2])
+local len = redis.call('LLEN', list)
+while max_len > 0 and len > max_len do
+    release(redis.call('LPOP', list))
+    len = len - 1
+end
+return len
+"""
+
+# KEYS: lists..., bodies, refs. ARGV: count per list. Pops up to ARGV[i]
+# live questions from each list, dropping ids whose body was evicted, and
+# returns the bodies with the per-list shortfall.
+TAKE_LUA = """
+local nlists = #KEYS - 2
+local bodies, refs = KEYS[nlists + 1], KEYS[nlists + 2]
+local items = {}
+local shortfalls = {}
+for i = 1, nlists do
+    local count = tonumber(ARGV[i])
+    local got = 0
+    while got < count do
+        local id = redis.call('LPOP', KEYS[i])
+        if not id then
+            break
+        end
+        local body = redis.call('HGET', bodies, id)
+        if body then
+            items[#items + 1] = body
+            got = got + 1
+        end
+        if redis.call('HINCRBY', refs, id, -1) <= 0 then
+            redis.call('HDEL', refs, id)
+            redis.call('HDEL', bodies, id)
+        end
+    end
+    shortfalls[i] = count - got
+end
+return {items, shortfalls}
+"""
+
+# KEYS: list, bodies. ARGV: window size, random fraction for the start.
+# Reads a window of the list, wrapping around its end, without removing it.
+READ_WINDOW_LUA = """
+local len = redis.call('LLEN', KEYS[1])
+if len == 0 then
+    return {}
+end
+local window = math.min(tonumber(ARGV[1]), len)
+local start = math.floor(tonumber(ARGV[2]) * len)
+local ids = redis.call('LRANGE', KEYS[1], start, start + window - 1)
+if start + window > len then
+    for _, id in ipairs(redis.call('LRANGE', KEYS[1], 0, start + window - len - 1)) do
+        ids[#ids + 1] = id
+    end
+end
+if #ids == 0 then
+    return {}
+end
+local found = redis.call('HMGET', KEYS[2], unpack(ids))
+local items = {}
+for _, body in ipairs(found) do
+    if body then
+        items[#items + 1] = body
+    end
+end
+return items
+"""
+
+# KEYS: lists..., bodies, refs. Deletes the lists, releasing their references.
+RELEASE_LUA = """
+local nlists = #KEYS - 2
+local bodies, refs = KEYS[nlists + 1], KEYS[nlists + 2]
+local released = 0
+for i = 1, nlists do
+    for _, id in ipairs(redis.call('LRANGE', KEYS[i], 0, -1)) do
+        if redis.call('HINCRBY', refs, id, -1) <= 0 then
+            redis.call('HDEL', refs, id)
+            redis.call('HDEL', bodies, id)
+        end
+        released = released + 1
+    end
+    redis.call('DEL', KEYS[i])
+end
+return released
+"""
+
+# KEYS: set of list keys, bodies, refs. Releases every list named in the set
+# and deletes the set. The list keys are read from the set, so this relies on
+# a single Redis instance rather than a cluster.
+RELEASE_SET_LUA = """
+local bodies, refs = KEYS[2], KEYS[3]
+local released = 0
+for _, list in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    for _, id in ipairs(redis.call('LRANGE', list, 0, -1)) do
+        if redis.call('HINCRBY', refs, id, -1) <= 0 then
+            redis.call('HDEL', refs, id)
+            redis.call('HDEL', bodies, id)
+        end
+        released = released + 1
+    end
+    redis.call('DEL', list)
+end
+redis.call('DEL', KEYS[1])
+return released
+"""
+
+# KEYS: lists..., bodies, refs. ARGV: question ids. Removes every entry of
+# the ids from the lists, releasing one reference per removed entry.
+REMOVE_LUA = """
+local nlists = #KEYS - 2
+local bodies, refs = KEYS[nlists + 1], KEYS[nlists + 2]
+local removed = 0
+for i = 1, nlists do
+    for _, id in ipairs(ARGV) do
+        local n = redis.call('LREM', KEYS[i], 0, id)
+        if n > 0 then
+            if redis.call('HINCRBY', refs, id, -n) <= 0 then
+                redis.call('HDEL', refs, id)
+                redis.call('HDEL', bodies, id)
+            end
+            removed = removed + n
+        end
+    end
+end
+return removed
+"""
+
+
+class QuestionStore:
+    """
+    Normalized question storage in Redis.
+
+    Lists (per-user unseen lists and shared pools) hold question ids only.
+    Each question body is stored once, pre-serialized, in the ``qbody`` hash,
+    with a reference count per id in ``qbody:refs``. A body is deleted as soon
+    as no list references it any more.
+
+    Attributes
+    ----------
+    redis_client : redis.asyncio.Redis
+        The Redis client to use.
+    """
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.push_script = redis_client.register_script(PUSH_LUA)
+        self.take_script = redis_client.register_script(TAKE_LUA)
+        self.read_window_script = redis_client.register_script(READ_WINDOW_LUA)
+        self.release_script = redis_client.register_script(RELEASE_LUA)
+        self.release_set_script = redis_client.register_script(RELEASE_SET_LUA)
+        self.remove_script = redis_client.register_script(REMOVE_LUA)
+
+    async def push(self, list_key, questions, replace=False, max_len=0, client=None):
+        """
+        Append questions to a list, or replace its contents if ``replace``.
+
+        Parameters
+        ----------
+        list_key : str
+            The list to push to.
+        questions : list of Question
+            The questions to store.
+        replace : bool, optional
+            Release the current contents of the list first, by default False.
+        max_len : int, optional
+            Drop the oldest entries beyond this length, by default 0 (no cap).
+        client : redis.asyncio.client.Pipeline, optional
+            Queue the call on a pipeline instead of running it.
+        """
+        args = ["1" if replace else "0", max_len]
+        for q in questions:
+            args.extend([q.id, q.json()])
+        return await self.push_script(
+            keys=[list_key, BODY_KEY, REFS_KEY], args=args, client=client
+        )
+
+    async def take(self, list_keys, counts):
+        """
+        Pop up to ``counts[i]`` questions from each of ``list_keys``.
+
+        Returns
+        -------
+        (items, shortfalls) : tuple
+            Serialized question bodies and the number missing per list.
+        """
+        return await self.take_script(
+            keys=list_keys + [BODY_KEY, REFS_KEY], args=counts
+        )
+
+    async def read_window(self, list_key, window, start_fraction, client=None):
+        """
+        Read up to ``window`` question bodies from a list starting at a
+        position given as a fraction of its length, without removing them.
+        """
+        return await self.read_window_script(
+            keys=[list_key, BODY_KEY], args=[window, start_fraction], client=client
+        )
+
+    async def release(self, list_keys):
+        """
+        Delete lists, dropping bodies that are no longer referenced.
+        """
+        if not list_keys:
+            return 0
+        return await self.release_script(keys=list_keys + [BODY_KEY, REFS_KEY])
+
+    async def release_set(self, set_key):
+        """
+        Delete every list named in the set ``set_key``, and the set itself.
+        """
+        return await self.release_set_script(keys=[set_key, BODY_KEY, REFS_KEY])
+
+    async def remove(self, list_keys, question_ids):
+        """
+        Remove every entry of ``question_ids`` from the given lists.
+        """
+        if not list_keys or not question_ids:
+            return 0
+        return await self.remove_script(
+            keys=list_keys + [BODY_KEY, REFS_KEY],
+            args=question_ids
+        )
+
+    async def categories(self, question_ids):
+        """
+        The category of each question whose body is cached, by id.
+        """
+        if not question_ids:
+            return {}
+        bodies = await self.redis_client.hmget(BODY_KEY, question_ids)
+        return {
+            qid: json.loads(body)["category"]
+            for qid, body in zip(question_ids, bodies) if body is not None
+        }
+
+    async def forget(self, question_ids):
+        """
+        Drop the bodies and reference counts of evicted questions.
+
+        Remove the ids from the lists holding them first. An entry left
+        behind would release a reference it does not own once the question
+        is regenerated under the same id, freeing the new body while other
+        lists still hold it.
+        """
+        if question_ids:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.hdel(BODY_KEY, *question_ids)
+                pipe.hdel(REFS_KEY, *question_ids)
+                await pipe.execute()
@@ -0,0 +1,157 @@
+import hashlib
+import math
+
+SEEN_KEY = "seen:{user_id}"
+SEEN_BLOOM_KEY = "seenbf:{user_id}"
+SEEN_READY_KEY = "seen:{user_id}:ready"
+
+
+def bloom_parameters(capacity, fp_rate):
+    """
+    Compute the size and hash count of a Bloom filter.
+
+    Parameters
+    ----------
+    capacity : int
+        The expected number of members.
+    fp_rate : float
+        The target false positive rate, e.g. 0.001.
+
+    Returns
+    -------
+    (num_bits, num_hashes) : tuple of int
+    """
+    if capacity <= 0:
+        raise ValueError("capacity must be positive")
+    if not 0 < fp_rate < 1:
+        raise ValueError("fp_rate must be between 0 and 1")
+    num_bits = math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+def bloom_positions(member, num_bits, num_hashes):
+    """
+    Bit positions of a member using double hashing over one blake2b digest.
+    """
+    digest = hashlib.blake2b(member.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+
+class SeenSet:
+    """
+    Exact per-user set of question ids the user has been served, kept in Redis.
+
+    Mirrors the user's rows in user_question_store. The set is hydrated from
+    the database the first time it is needed and expires after ``ttl`` seconds
+    of inactivity, after which it is hydrated again.
+
+    Attributes
+    ----------
+    redis_client : redis.asyncio.Redis
+        The Redis client to use.
+    ttl : int
+        Expiry in seconds, refreshed on every write.
+    """
+    def __init__(self, redis_client, ttl):
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+    def _key(self, user_id):
+        return SEEN_KEY.format(user_id=user_id)
+
+    async def is_ready(self, user_id):
+        return bool(await self.redis_client.exists(SEEN_READY_KEY.format(user_id=user_id)))
+
+    async def hydrate(self, user_id, question_ids):
+        """
+        Load the user's history from user_question_store and mark the set ready.
+        """
+        ready_key = SEEN_READY_KEY.format(user_id=user_id)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            self._queue_add(pipe, user_id, question_ids)
+            pipe.set(ready_key, 1, ex=self.ttl)
+            await pipe.execute()
+
+    async def add(self, user_id, question_ids):
+        if not question_ids:
+            return
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            self._queue_add(pipe, user_id, question_ids)
+            pipe.expire(SEEN_READY_KEY.format(user_id=user_id), self.ttl)
+            await pipe.execute()
+
+    def _queue_add(self, pipe, user_id, question_ids):
+        key = self._key(user_id)
+        if question_ids:
+            pipe.sadd(key, *question_ids)
+        pipe.expire(key, self.ttl)
+
+    async def filter_unseen(self, user_id, question_ids):
+        """
+        Return the ids from ``question_ids`` the user has not seen, in order.
+        """
+        if not question_ids:
+            return []
+        seen = await self.redis_client.smismember(self._key(user_id), question_ids)
+        return [qid for qid, s in zip(question_ids, seen) if not int(s)]
+
+
+class BloomSeenSet(SeenSet):
+    """
+    Approximate per-user seen set stored as a Redis bitmap Bloom filter.
+
+    Uses a fixed amount of memory per user regardless of history length. A
+    false positive only means an unseen question is skipped, never that a
+    seen question is served again.
+
+    Attributes
+    ----------
+    capacity : int
+        The expected number of questions a user will see.
+    fp_rate : float
+        The false positive rate at ``capacity`` members.
+    """
+    def __init__(self, redis_client, ttl, capacity, fp_rate):
+        super().__init__(redis_client, ttl)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.num_bits, self.num_hashes = bloom_parameters(capacity, fp_rate)
+
+    def _key(self, user_id):
+        return SEEN_BLOOM_KEY.format(user_id=user_id)
+
+    def _queue_add(self, pipe, user_id, question_ids):
+        key = self._key(user_id)
+        for qid in question_ids:
+            for pos in bloom_positions(qid, self.num_bits, self.num_hashes):
+                pipe.setbit(key, pos, 1)
+        pipe.expire(key, self.ttl)
+
+    async def filter_unseen(self, user_id, question_ids):
+        if not question_ids:
+            return []
+        key = self._key(user_id)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for qid in question_ids:
+                for pos in bloom_positions(qid, self.num_bits, self.num_hashes):
+                    pipe.getbit(key, pos)
+            bits = await pipe.execute()
+        unseen = []
+        for i, qid in enumerate(question_ids):
+            if not all(bits[i * self.num_hashes:(i + 1) * self.num_hashes]):
+                unseen.append(qid)
+        return unseen
+
+
+def make_seen_set(redis_client, mode, ttl, capacity, fp_rate):
+    """
+    Build the seen set implementation selected by ``mode`` ("set" or "bloom").
+    """
+    if mode == "set":
+        return SeenSet(redis_client, ttl)
+    if mode == "bloom":
+        return BloomSeenSet(redis_client, ttl, capacity, fp_rate)
+    raise ValueError(f"Unknown seen set mode: {mode}")
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import uuid
+
+LEASE_KEY = "singleflight:{key}"
+RESULT_KEY = "singleflight:{key}:{token}"
+
+# Delete the lease only if it still belongs to us
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def flight_key(*parts):
+    """
+    Short, stable key for a request made of ``parts``.
+    """
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls so they share one execution.
+
+    Within a process, duplicates await the same task. Across replicas, the
+    first caller takes a short Redis lease and publishes its encoded result
+    under the lease token; callers that find the lease taken poll for that
+    result instead of running the call themselves. If the leader dies or
+    its lease runs out, waiters fall back to running the call.
+
+    Attributes
+    ----------
+    redis_client : redis.asyncio.Redis
+        The Redis client holding leases and results.
+    encode : callable
+        Serializes a result to a string for other replicas.
+    decode : callable
+        Parses a result published by another replica.
+    lease_ttl : float
+        Seconds a leader may hold the lease, also the longest a waiter waits.
+    result_ttl : float
+        Seconds a published result stays readable.
+    poll_interval : float
+        Seconds between result checks while waiting on another replica.
+    """
+    def __init__(self, redis_client, encode, decode, lease_ttl, result_ttl, poll_interval):
+        self.redis_client = redis_client
+        self.encode = encode
+        self.decode = decode
+        self.lease_ttl = lease_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.release_script = redis_client.register_script(RELEASE_LUA)
+        self.inflight = {}
+
+    async def do(self, key, fn):
+        """
+        Run ``fn()`` unless an identical call keyed by ``key`` is in flight,
+        in which case return that call's result.
+        """
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._do_shared(key, fn))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _do_shared(self, key, fn):
+        lease_key = LEASE_KEY.format(key=key)
+        token = uuid.uuid4().hex
+        lease_ms = int(self.lease_ttl * 1000)
+        if await self.redis_client.set(lease_key, token, nx=True, px=lease_ms):
+            try:
+                result = await fn()
+                await self.redis_client.set(
+                    RESULT_KEY.format(key=key, token=token),
+                    self.encode(result),
+                    px=int(self.result_ttl * 1000)
+                )
+                return result
+            finally:
+                await self.release_script(keys=[lease_key], args=[token])
+
+        owner = await self.redis_client.get(lease_key)
+        if owner is not None:
+            result = await self._wait_for(key, owner)
+            if result is not None:
+                return result
+        return await fn()
+
+    async def _wait_for(self, key, owner):
+        lease_key = LEASE_KEY.format(key=key)
+        result_key = RESULT_KEY.format(key=key, token=owner)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lease_ttl
+        while loop.time() < deadline:
+            raw = await self.redis_client.get(result_key)
+            if raw is not None:
+                return self.decode(raw)
+            if await self.redis_client.get(lease_key) != owner:
+                # leader finished or gave up, its result may have just landed
+                raw = await self.redis_client.get(result_key)
+                return self.decode(raw) if raw is not None else None
+            await asyncio.sleep(self.poll_interval)
+        return None
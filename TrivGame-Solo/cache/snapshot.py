@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import time
+
+SNAPSHOT_VERSION = 1
+
+
+def save_snapshot(path, categories, pools):
+    """
+    Write the categories and pool contents to ``path`` atomically.
+
+    The snapshot is written to a temporary file in the same directory and
+    renamed over ``path``, so a crash mid-write never leaves a torn file.
+
+    Parameters
+    ----------
+    path : str
+        Where to write the snapshot.
+    categories : list of str
+        The known categories.
+    pools : dict
+        Serialized question bodies in pool order, by category.
+    """
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "categories": categories,
+        "pools": pools,
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_snapshot(path, max_age):
+    """
+    Read a snapshot written by ``save_snapshot``.
+
+    Returns
+    -------
+    snapshot : dict or None
+        The snapshot, or None if it is missing, unreadable, from another
+        version or older than ``max_age`` seconds.
+    """
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        print("No usable snapshot", e)
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        print("Snapshot version mismatch")
+        return None
+    if time.time() - snapshot.get("saved_at", 0) > max_age:
+        print("Snapshot too old")
+        return None
+    return snapshot
@@ -0,0 +1,76 @@
+import datetime
+from contextlib import asynccontextmanager
+
+import fakeredis
+import pytest
+
+from models import Question
+
+
+class MockConnection:
+    """
+    Stand-in for an asyncpg connection that records every query.
+
+    ``fetch`` answers with ``respond(query, *args)`` when it is set, and with
+    ``rows`` otherwise. With ``fail`` set every query raises.
+    """
+    def __init__(self):
+        self.rows = []
+        self.respond = None
+        self.fail = False
+        self.executed = []
+        self.copied = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, query, *args):
+        if self.fail:
+            raise Exception("Database connection error")
+        self.executed.append((query, args))
+
+    async def executemany(self, query, args):
+        if self.fail:
+            raise Exception("Database connection error")
+        self.executed.append((query, args))
+
+    async def fetch(self, query, *args):
+        await self.execute(query, *args)
+        if self.respond is not None:
+            return self.respond(query, *args)
+        return self.rows
+
+    async def copy_records_to_table(self, table, records):
+        self.copied.append((table, records))
+
+
+@pytest.fixture
+def redis_client():
+    """
+    An in-memory Redis that runs the Lua scripts, empty for every test.
+    """
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+@pytest.fixture
+def db():
+    return MockConnection()
+
+@pytest.fixture
+def get_connection(db):
+    """
+    Same shape as ``main.get_db_connection``, yielding ``db``.
+    """
+    @asynccontextmanager
+    async def get_connection():
+        yield db
+    return get_connection
+
+@pytest.fixture
+def make_question():
+    def make_question(qid, category="CAT1", downvotes=0):
+        return Question(
+            id=qid, category=category, hint1="h1", hint2="h2", hint3="h3", answer="a",
+            created_at=datetime.datetime(2025, 1, 1), usage_count=0, downvotes=downvotes
+        )
+    return make_question
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from cachepolicy import UnseenPolicy, UNSEEN_KEYS_KEY, UNSEEN_LRU_KEY, UNSEEN_LFU_KEY
+from qstore import QuestionStore
+
+
+def make_policy(redis_client, policy="lru", budget=0, idle_ttl=60):
+    return UnseenPolicy(
+        redis_client,
+        QuestionStore(redis_client),
+        idle_ttl=idle_ttl,
+        max_len=10,
+        memory_budget=budget,
+        policy=policy,
+        evict_batch=1,
+        sample_size=10
+    )
+
+
+def count_entries(policy, redis_client):
+    # Redis MEMORY USAGE is not available here, count one byte per list entry
+    async def usage():
+        lengths = [await redis_client.llen(key) for key in await redis_client.keys("unseen:*")]
+        return {"users": len(lengths), "list_bytes": sum(lengths), "body_bytes": 0}
+
+    policy.usage = usage
+
+
+def test_push_registers_keys(redis_client, make_question):
+    policy = make_policy(redis_client)
+
+    async def run():
+        await policy.push("1", {"CAT1": [make_question("a"), make_question("b")], "CAT2": [make_question("c")]})
+        return (
+            await redis_client.smembers(UNSEEN_KEYS_KEY.format(user_id="1")),
+            await redis_client.zscore(UNSEEN_LRU_KEY, "1"),
+        )
+
+    keys, last_used = asyncio.run(run())
+    assert keys == {"unseen:1:CAT1", "unseen:1:CAT2"}
+    assert last_used is not None
+
+def test_evict_idle_releases_only_idle_users(redis_client, make_question):
+    policy = make_policy(redis_client)
+
+    async def run():
+        await policy.push("old", {"CAT1": [make_question("a")]})
+        await policy.push("new", {"CAT1": [make_question("b")]})
+        await redis_client.zadd(UNSEEN_LRU_KEY, {"old": time.time() - 120})
+        evicted = await policy.evict_idle()
+        return evicted, await redis_client.keys("unseen:*"), await redis_client.zrange(UNSEEN_LRU_KEY, 0, -1)
+
+    evicted, lists, users = asyncio.run(run())
+    assert evicted == 1
+    assert lists == ["unseen:new:CAT1"]
+    assert users == ["new"]
+
+@pytest.mark.parametrize("mode, survivor", [("lru", "hot"), ("lfu", "frequent")])
+def test_enforce_budget_evicts_coldest(redis_client, make_question, mode, survivor):
+    policy = make_policy(redis_client, policy=mode, budget=1)
+    count_entries(policy, redis_client)
+
+    async def run():
+        # "frequent" is used often but not lately, "hot" once but most recently
+        await policy.push("frequent", {"CAT1": [make_question("a")]})
+        for _ in range(5):
+            await policy.touch("frequent")
+        await policy.push("hot", {"CAT1": [make_question("b")]})
+        await redis_client.zincrby(UNSEEN_LRU_KEY, -10, "frequent")
+        await policy.touch("hot")
+        evicted = await policy.enforce_budget()
+        return (
+            evicted,
+            await redis_client.zrange(UNSEEN_LRU_KEY, 0, -1),
+            await redis_client.zrange(UNSEEN_LFU_KEY, 0, -1),
+        )
+
+    evicted, lru, lfu = asyncio.run(run())
+    assert evicted == 1
+    assert lru == [survivor]
+    assert lfu == [survivor]
+
+def test_enforce_budget_runs_until_under_budget(redis_client, make_question):
+    policy = make_policy(redis_client, budget=2)
+    count_entries(policy, redis_client)
+
+    async def run():
+        # one user per round, more rounds than the old cap of ten
+        for i in range(15):
+            await policy.push(str(i), {"CAT1": [make_question(f"q{i}")]})
+        return await policy.enforce_budget(), await redis_client.zcard(UNSEEN_LRU_KEY)
+
+    assert asyncio.run(run()) == (13, 2)
+
+def test_enforce_budget_ages_lfu_scores(redis_client):
+    policy = make_policy(redis_client, policy="lfu", budget=10**9)
+    count_entries(policy, redis_client)
+
+    async def run():
+        await redis_client.zadd(UNSEEN_LFU_KEY, {"old": 8, "new": 1})
+        await policy.enforce_budget()
+        await policy.enforce_budget()
+        return await redis_client.zrange(UNSEEN_LFU_KEY, 0, -1, withscores=True)
+
+    assert asyncio.run(run()) == [("new", 0.25), ("old", 2.0)]
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+import main
+from main import CandidateCursor
+from seen import make_seen_set
+
+
+def test_sequential_cursor():
+    cursor = CandidateCursor("sequential")
+    query, params = cursor.page_query("CAT1", 20, 3)
+    assert "id > $5" in query
+    assert params == ["CAT1", "", 20]
+
+    cursor.advance({"id": "q20"}, 20, 20)
+    assert not cursor.done
+    assert cursor.page_query("CAT1", 20, 0)[1] == ["CAT1", "q20", 20]
+
+    cursor.advance({"id": "q25"}, 5, 20)
+    assert cursor.done
+
+def test_random_cursor_wraps_once():
+    cursor = CandidateCursor("random")
+    start = cursor.start
+    query, params = cursor.page_query("CAT1", 10, 0)
+    assert "random_rank > $2 AND random_rank <= $3" in query
+    assert params == ["CAT1", start, 1.0, 10]
+
+    # end of the index reached, wrap around up to the start rank
+    cursor.advance({"random_rank": 0.99}, 3, 10)
+    assert not cursor.done
+    assert cursor.page_query("CAT1", 10, 0)[1] == ["CAT1", -1.0, start, 10]
+
+    cursor.advance(None, 0, 10)
+    assert cursor.done
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        CandidateCursor("ordered")
+
+def test_sequential_cursor_resumes_and_wraps():
+    cursor = CandidateCursor("sequential", "q50")
+    assert cursor.page_query("CAT1", 10, 0)[1] == ["CAT1", "q50", 10]
+
+    # end of the index reached, wrap around up to where the last scan stopped
+    cursor.advance(None, 0, 10)
+    assert not cursor.done
+    query, params = cursor.page_query("CAT1", 10, 0)
+    assert "id > $2 AND id <= $3" in query
+    assert params == ["CAT1", "", "q50", 10]
+
+    cursor.advance({"id": "q07"}, 3, 10)
+    assert cursor.done
+
+def use_bank(db, ids):
+    """
+    Answer sequential candidate pages from a category holding ``ids``,
+    recording the parameters of every page.
+    """
+    db.pages = []
+
+    def respond(query, category, after, *rest):
+        db.pages.append([category, after, *rest])
+        upto, limit = rest if len(rest) == 2 else (None, rest[0])
+        page = [qid for qid in sorted(ids) if qid > after and (upto is None or qid <= upto)]
+        return [{"id": qid, "category": category} for qid in page[:limit]]
+    db.respond = respond
+
+@pytest.fixture
+def seen_set(monkeypatch, redis_client):
+    monkeypatch.setattr(main, "redis_client", redis_client)
+    monkeypatch.setattr(main, "DB_SELECT_MODE", "sequential")
+    seen_set = make_seen_set(redis_client, "set", 600, 1000, 0.001)
+    monkeypatch.setattr(main, "seen_set", seen_set)
+    return seen_set
+
+def test_pages_grow_while_short(monkeypatch, db, seen_set):
+    monkeypatch.setattr(main, "SEEN_MAX_CANDIDATE_PAGE", 20)
+    bank = [f"q{i:03}" for i in range(100)]
+    use_bank(db, bank)
+
+    async def run():
+        # a heavy player who has seen all but the last questions
+        await seen_set.hydrate("user1", bank[:45])
+        return await main.fetch_unseen_candidates(db, "user1", {"CAT1": 2})
+
+    rows = asyncio.run(run())
+    assert [r["id"] for r in rows] == ["q045", "q046"]
+    assert [page[-1] for page in db.pages] == [4, 8, 16, 20]
+    # Postgres is never asked to join against the user's history
+    assert not [query for query, _ in db.executed if "user_question_store" in query]
+
+def test_sequential_scan_resumes_after_last_pick(db, redis_client, seen_set):
+    bank = [f"q{i:03}" for i in range(10)]
+    use_bank(db, bank)
+
+    async def run():
+        await seen_set.hydrate("user1", [])
+        first = await main.fetch_unseen_candidates(db, "user1", {"CAT1": 2})
+        await seen_set.add("user1", [r["id"] for r in first])
+        second = await main.fetch_unseen_candidates(db, "user1", {"CAT1": 2})
+        return first, second, await redis_client.get("seencursor:user1:CAT1")
+
+    first, second, cursor = asyncio.run(run())
+    assert [r["id"] for r in first] == ["q000", "q001"]
+    assert [r["id"] for r in second] == ["q002", "q003"]
+    assert cursor == "q003"
+    # the second scan starts after q001 instead of at the head of the index
+    assert db.pages[1][:2] == ["CAT1", "q001"]
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+from catalog import CategoryCatalog, CATALOG_CHANNEL
+
+
+def make_catalog(redis_client, counts):
+    async def load_counts():
+        return counts
+    return CategoryCatalog(redis_client, load_counts)
+
+
+def test_sync_keeps_empty_categories(redis_client):
+    catalog = make_catalog(redis_client, {"CAT1": 4})
+    asyncio.run(catalog.sync(["CAT1", "CAT2"]))
+    snapshot = catalog.snapshot()
+    assert [(c["name"], c["count"]) for c in snapshot["categories"]] == [("CAT1", 4), ("CAT2", 0)]
+    assert snapshot["synced_at"] is not None
+
+def test_publish_applies_locally_and_sends_counts(redis_client):
+    catalog = make_catalog(redis_client, {})
+
+    async def run():
+        async with redis_client.pubsub() as pubsub:
+            await pubsub.subscribe(CATALOG_CHANNEL)
+            await catalog.publish({"CAT1": 7})
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    return message
+
+    message = asyncio.run(asyncio.wait_for(run(), 1))
+    assert catalog.entries["CAT1"]["count"] == 7
+    assert message["channel"] == CATALOG_CHANNEL
+    assert json.loads(message["data"])["counts"] == {"CAT1": 7}
+
+def test_receive_sets_absolute_counts(redis_client):
+    catalog = make_catalog(redis_client, {})
+    message = json.dumps({"counts": {"CAT1": 3}, "at": 100.0})
+    # a repeated message leaves the count where it was
+    catalog.receive(message)
+    catalog.receive(message)
+    assert catalog.entries["CAT1"] == {"count": 3, "updated_at": 100.0}
+
+def test_out_of_order_messages_keep_newest_count(redis_client):
+    catalog = make_catalog(redis_client, {})
+    catalog.receive(json.dumps({"counts": {"CAT1": 5, "CAT2": 1}, "at": 200.0}))
+    # delivered late, older than what is held for CAT1
+    catalog.receive(json.dumps({"counts": {"CAT1": 3, "CAT2": 2}, "at": 100.0}))
+    assert catalog.entries["CAT1"] == {"count": 5, "updated_at": 200.0}
+    assert catalog.entries["CAT2"] == {"count": 1, "updated_at": 200.0}
+    catalog.receive(json.dumps({"counts": {"CAT1": 4, "CAT3": 9}, "at": 150.0}))
+    assert catalog.entries["CAT1"]["count"] == 5
+    # a category not held yet is taken whatever its time
+    assert catalog.entries["CAT3"] == {"count": 9, "updated_at": 150.0}
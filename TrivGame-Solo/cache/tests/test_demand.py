@@ -0,0 +1,24 @@
+from demand import decay, plan_generation
+
+
+def test_decay_halves_per_half_life():
+    assert decay(8.0, 20, 10) == 2.0
+    assert decay(8.0, -5, 10) == 8.0
+
+def test_plan_fills_most_urgent_first():
+    available = {"HOT": 10, "WARM": 100, "COLD": 60}
+    rates = {"HOT": 0.1, "WARM": 0.05}
+    # HOT runs out in 100 s, WARM in 2000 s, COLD never
+    plan = plan_generation(available, rates, budget=100, horizon=3600, floor=50)
+    assert plan == {"HOT": 100}
+
+def test_plan_spreads_remaining_budget():
+    available = {"HOT": 10, "WARM": 100, "COLD": 20}
+    rates = {"HOT": 0.01, "WARM": 0.05}
+    plan = plan_generation(available, rates, budget=200, horizon=3600, floor=50)
+    # HOT is below the floor, WARM wants 180 - 100, COLD only up to the floor
+    assert plan == {"HOT": 40, "WARM": 80, "COLD": 30}
+
+def test_plan_nothing_when_stocked():
+    plan = plan_generation({"A": 500}, {"A": 0.01}, budget=100, horizon=3600, floor=50)
+    assert plan == {}
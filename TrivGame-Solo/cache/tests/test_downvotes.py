@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from downvotes import DownvoteCounter, PENDING_KEY, TOTALS_KEY
+from qstore import QuestionStore
+
+
+def use_questions(db, stored):
+    """
+    Answer the downvote UPDATE and DELETE from ``stored``, downvotes by id.
+    """
+    def respond(query, *args):
+        if query.strip().startswith("UPDATE"):
+            rows = []
+            for qid, n in zip(*args):
+                if qid in stored:
+                    stored[qid] += n
+                    rows.append({"id": qid, "downvote_count": stored[qid]})
+            return rows
+        ids = [qid for qid in args[0] if qid in stored]
+        for qid in ids:
+            del stored[qid]
+        return [{"id": qid, "category": "CAT1", "usage_count": 0} for qid in ids]
+    db.respond = respond
+
+
+def test_add_reports_crossed(redis_client, get_connection):
+    counter = DownvoteCounter(redis_client, get_connection, threshold=3)
+
+    async def run():
+        await counter.add(["a", "b"])
+        await counter.add(["a"])
+        crossed = await counter.add(["a", "b"])
+        return crossed, await redis_client.hgetall(PENDING_KEY)
+
+    crossed, pending = asyncio.run(run())
+    assert crossed == ["a"]
+    assert pending == {"a": "3", "b": "2"}
+
+def test_total_starts_from_cached_body(redis_client, get_connection, make_question):
+    counter = DownvoteCounter(redis_client, get_connection, threshold=3)
+
+    async def run():
+        # the cached body carries the downvotes already stored
+        await QuestionStore(redis_client).push("pool:CAT1", [make_question("a", downvotes=2)])
+        crossed = await counter.add(["a", "b"])
+        return crossed, await redis_client.hgetall(TOTALS_KEY)
+
+    crossed, totals = asyncio.run(run())
+    assert crossed == ["a"]
+    assert totals == {"a": "3", "b": "1"}
+
+def test_flush_writes_and_evicts(redis_client, get_connection, db):
+    stored = {"a": 1, "b": 0, "c": 0}
+    use_questions(db, stored)
+    counter = DownvoteCounter(redis_client, get_connection, threshold=3)
+
+    async def run():
+        await counter.add(["a", "a", "b", "gone"])
+        evicted = await counter.flush()
+        return evicted, await redis_client.exists(PENDING_KEY), await redis_client.hgetall(TOTALS_KEY)
+
+    evicted, pending, totals = asyncio.run(run())
+    assert [r["id"] for r in evicted] == ["a"]
+    assert stored == {"b": 1, "c": 0}
+    assert not pending
+    assert totals == {"b": "1"}
+
+def test_flush_failure_requeues(redis_client, get_connection, db):
+    db.fail = True
+    counter = DownvoteCounter(redis_client, get_connection, threshold=3)
+
+    async def run():
+        await counter.add(["a", "a"])
+        with pytest.raises(Exception):
+            await counter.flush()
+        return await redis_client.hgetall(PENDING_KEY)
+
+    assert asyncio.run(run()) == {"a": "2"}
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import main
+from cachepolicy import UnseenPolicy
+from qstore import QuestionStore, BODY_KEY
+
+
+@pytest.fixture
+def store(monkeypatch, redis_client):
+    store = QuestionStore(redis_client)
+    monkeypatch.setattr(main, "redis_client", redis_client)
+    monkeypatch.setattr(main, "question_store", store)
+    monkeypatch.setattr(main, "unseen_policy", UnseenPolicy(
+        redis_client, store, idle_ttl=600, max_len=50, memory_budget=2**20,
+        policy="lru", evict_batch=10, sample_size=10
+    ))
+    return store
+
+
+def test_evict_only_touches_own_category(monkeypatch, redis_client, make_question, store):
+    monkeypatch.setattr(main, "EVICT_CACHE_CHUNK_SIZE", 2)
+    removed = []
+    remove = store.remove
+
+    async def spy_remove(list_keys, question_ids):
+        removed.append((list_keys, list(question_ids)))
+        return await remove(list_keys, question_ids)
+
+    monkeypatch.setattr(store, "remove", spy_remove)
+
+    async def run():
+        await store.push("pool:CAT1", [make_question(q, "CAT1") for q in ["a", "b", "c", "d"]])
+        await store.push("pool:CAT2", [make_question("e", "CAT2")])
+        await main.unseen_policy.push("u1", {"CAT1": [make_question("a", "CAT1")]})
+        await main.unseen_policy.push("u2", {"CAT2": [make_question("e", "CAT2")]})
+        rows = [{"id": q, "category": "CAT1"} for q in ["a", "b", "c"]]
+        await main.evict_from_cache(main.ids_by_category(rows))
+        return (
+            await redis_client.lrange("pool:CAT1", 0, -1),
+            await redis_client.lrange("unseen:u1:CAT1", 0, -1),
+            await redis_client.hkeys(BODY_KEY),
+        )
+
+    pool, unseen, bodies = asyncio.run(run())
+    assert pool == ["d"]
+    assert unseen == []
+    assert sorted(bodies) == ["d", "e"]
+    # chunked, and never sent to other categories' lists
+    assert removed == [
+        (["pool:CAT1", "unseen:u1:CAT1"], ["a", "b"]),
+        (["pool:CAT1", "unseen:u1:CAT1"], ["c"]),
+    ]
+
+def test_regenerated_question_survives_stale_entries(redis_client, make_question, store):
+    async def run():
+        await store.push("pool:CAT1", [make_question("a")])
+        await main.unseen_policy.push("u1", {"CAT1": [make_question("a")]})
+        await main.evict_from_cache({"CAT1": ["a"]})
+        # the article is used again and its question regenerated under the same id
+        await store.push("pool:CAT1", [make_question("a")])
+        # nothing of the old question is left for the user's list to release
+        _, shortfalls = await store.take(["unseen:u1:CAT1"], [1])
+        return shortfalls, await store.read_window("pool:CAT1", 1, 0)
+
+    shortfalls, window = asyncio.run(run())
+    assert shortfalls == [1]
+    assert len(window) == 1
+
+def test_categories_from_cached_bodies(redis_client, make_question):
+    store = QuestionStore(redis_client)
+
+    async def run():
+        await store.push("pool:CAT1", [make_question("a", "CAT1")])
+        return await store.categories(["a", "missing"])
+
+    assert asyncio.run(run()) == {"a": "CAT1"}
@@ -0,0 +1,63 @@
+import asyncio
+
+from eviction import ChunkedEvictor
+
+
+def use_matching(db, matching):
+    """
+    Delete up to the LIMIT of matching ids per query, by predicate column,
+    recording the column of each query in ``db.calls``.
+    """
+    db.calls = []
+
+    def respond(query, threshold, limit):
+        column = next(c for c in matching if f"WHERE {c}" in query)
+        db.calls.append(column)
+        chunk, matching[column] = matching[column][:limit], matching[column][limit:]
+        return [{"id": qid} for qid in chunk]
+    db.respond = respond
+
+
+def make_evictor(get_connection, max_chunks=10):
+    return ChunkedEvictor(get_connection, chunk_size=2, pause=0, max_chunks=max_chunks)
+
+
+def run(evictor):
+    evicted_ids = []
+
+    async def on_evicted(reason, rows):
+        evicted_ids.extend(r["id"] for r in rows)
+
+    count = asyncio.run(evictor.run({"usage": 5, "downvotes": 3, "age": 2}, on_evicted))
+    return count, evicted_ids
+
+
+def test_evicts_in_chunks(db, get_connection):
+    use_matching(db, {
+        "usage_count": ["1", "2", "3"],
+        "downvote_count": ["4", "5"],
+        "created_at": [],
+    })
+    evictor = make_evictor(get_connection)
+    count, ids = run(evictor)
+    assert count == 5
+    assert ids == ["1", "2", "3", "4", "5"]
+    # a full chunk is followed by another, a short one ends the predicate
+    assert db.calls == ["usage_count", "usage_count", "downvote_count", "downvote_count", "created_at"]
+    assert evictor.metrics["rows_by_reason"] == {"usage": 3, "downvotes": 2, "age": 0}
+    assert evictor.metrics["last_run_chunks"] == 5
+
+def test_max_chunks_bounds_a_run(db, get_connection):
+    matching = {
+        "usage_count": ["1", "2", "3", "4", "5"],
+        "downvote_count": [],
+        "created_at": [],
+    }
+    use_matching(db, matching)
+    evictor = make_evictor(get_connection, max_chunks=1)
+    count, _ = run(evictor)
+    assert count == 2
+    assert matching["usage_count"] == ["3", "4", "5"]
+    count, _ = run(evictor)
+    assert evictor.metrics["rows_evicted"] == 4
+    assert evictor.metrics["runs"] == 2
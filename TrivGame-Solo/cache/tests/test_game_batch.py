@@ -1,77 +1,188 @@
+import asyncio
+import datetime
+
+import httpx
 import pytest
-import json
-from fastapi.testclient import TestClient
-import sys
-import os
-
-
-from main import app, get_db_connection
-client = TestClient(app)
-
-def mock_get_db_connection():
-    class MockCursor:
-        def execute(self, query, params):
-            if "WHERE uqs.question_id IS NULL" in query:
-                self.result = [
-                    (1, "What is AI?", "Science", "2025-01-01"),
-                    (2, "Who invented Python?", "Technology", "2025-01-02"),
-                ]
-            else:
-                self.result = []
-        
-        def fetchall(self):
-            return self.result
-        
-        def close(self):
-            pass
-    
-    class MockConnection:
-        def cursor(self):
-            return MockCursor()
-        
-        def close(self):
-            pass
-
-    return MockConnection()
-
-@pytest.fixture(autouse=True)
-def patch_db(monkeypatch):
-    monkeypatch.setattr("main.get_db_connection", mock_get_db_connection)
-
-def test_getbatch_success():
+
+import main
+from cachepolicy import UnseenPolicy
+from demand import DemandTracker
+from models import GameBatchResp
+from qstore import QuestionStore
+from seen import make_seen_set
+from singleflight import SingleFlight
+from writebehind import WriteBehindBuffer
+
+
+def question_row(qid, category):
+    return {
+        "id": qid, "category": category, "hint1": "h1", "hint2": "h2", "hint3": "h3",
+        "answer": "a", "created_at": datetime.datetime(2025, 1, 1),
+        "usage_count": 0, "downvote_count": 0,
+    }
+
+def use_questions(db, rows, history=()):
+    """
+    Answer the history query with ``history`` and the first candidate page
+    of each category with its ``rows``.
+    """
+    paged = set()
+
+    def respond(query, *params):
+        if "FROM user_question_store WHERE user_id" in query:
+            return [{"question_id": q} for q in history]
+        page = []
+        for cat in params:
+            if cat in paged:
+                continue
+            paged.add(cat)
+            page += [r for r in rows if r["category"] == cat]
+        return page
+    db.respond = respond
+
+@pytest.fixture
+def app_state(monkeypatch, redis_client, get_connection):
+    """
+    Wire the app's globals to the test Redis and database connection.
+    """
+    store = QuestionStore(redis_client)
+    monkeypatch.setattr(main, "redis_client", redis_client)
+    monkeypatch.setattr(main, "question_store", store)
+    monkeypatch.setattr(main, "get_db_connection", get_connection)
+    monkeypatch.setattr(main, "DB_SELECT_MODE", "sequential")
+    monkeypatch.setattr(main, "seen_set", make_seen_set(redis_client, "set", 600, 1000, 0.001))
+    monkeypatch.setattr(main, "demand", DemandTracker(redis_client, 3600))
+    monkeypatch.setattr(main, "write_buffer", WriteBehindBuffer(get_connection, 1000, 5))
+    monkeypatch.setattr(main, "unseen_policy", UnseenPolicy(
+        redis_client, store, idle_ttl=600, max_len=50, memory_budget=2**20,
+        policy="lru", evict_batch=10, sample_size=10
+    ))
+    monkeypatch.setattr(main, "getbatch_flight", SingleFlight(
+        redis_client, encode=lambda resp: resp.json(), decode=GameBatchResp.parse_raw,
+        lease_ttl=5, result_ttl=5, poll_interval=0.01
+    ))
+
+async def post_batch(payload):
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://cache") as client:
+        return await client.post("/getbatch/", json=payload)
+
+async def mark_fresh(redis_client, *categories):
+    for cat in categories:
+        await redis_client.set(main.POOL_FRESH_KEY.format(category=cat), 1)
+
+def test_getbatch_success(app_state, redis_client, db):
+    use_questions(
+        db,
+        [question_row(f"s{i}", "Science") for i in range(3)] +
+        [question_row(f"t{i}", "Technology") for i in range(3)],
+        history=["s0"]
+    )
     payload = {
         "user_id": "123",
         "batch_size": 2,
         "batch": [{"category": "Science", "count": 1}, {"category": "Technology", "count": 1}]
     }
-    response = client.post("/getbatch/", json=payload)
+
+    async def run():
+        await mark_fresh(redis_client, "Science", "Technology")
+        response = await post_batch(payload)
+        excess = await redis_client.lrange(main.unseen_policy.list_key("123", "Science"), 0, -1)
+        return response, excess
+
+    response, excess = asyncio.run(run())
+    assert response.status_code == 200
+    batch = response.json()["batch"]
+    # s0 is in the user's history, so it is skipped
+    assert [q["id"] for q in batch] == ["s1", "t0"]
+    # the rest is kept for the user's next batch
+    assert excess == ["s2"]
+
+
+def test_getbatch_from_pool(app_state, redis_client, db, make_question):
+    use_questions(db, [], history=["p0"])
+    payload = {
+        "user_id": "123",
+        "batch_size": 2,
+        "batch": [{"category": "Science", "count": 2}]
+    }
+
+    async def run():
+        await mark_fresh(redis_client, "Science")
+        await main.question_store.push(
+            main.POOL_KEY.format(category="Science"),
+            [make_question(f"p{i}", "Science") for i in range(3)]
+        )
+        return await post_batch(payload)
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert sorted(q["id"] for q in response.json()["batch"]) == ["p1", "p2"]
+    # only the user's history was read, no candidates from the questions table
+    assert [q for q, _ in db.executed if "FROM questions" in q] == []
+
+def test_getbatch_pool_short_falls_through_to_db(app_state, redis_client, db, make_question):
+    use_questions(db, [question_row(f"s{i}", "Science") for i in range(2)])
+    payload = {
+        "user_id": "123",
+        "batch_size": 2,
+        "batch": [{"category": "Science", "count": 2}]
+    }
+
+    async def run():
+        await mark_fresh(redis_client, "Science")
+        await main.question_store.push(
+            main.POOL_KEY.format(category="Science"), [make_question("p0", "Science")]
+        )
+        return await post_batch(payload)
+
+    response = asyncio.run(run())
     assert response.status_code == 200
-    data = response.json()
-    
-    assert len(data) == 2
-    assert data[0][1] == "What is AI?"
-    assert data[1][1] == "Who invented Python?"
+    # one from the pool, the other from the database
+    assert [q["id"] for q in response.json()["batch"]] == ["p0", "s0"]
+    assert [q for q, _ in db.executed if "FROM questions" in q] != []
 
+def test_getbatch_removes_used_up_questions_from_pool(app_state, monkeypatch, redis_client, db, make_question):
+    monkeypatch.setattr(main, "USAGE_THRESHOLD", 5)
+    use_questions(db, [])
+    nearly_used_up = make_question("p0", "Science")
+    nearly_used_up.usage_count = 4
+    payload = {
+        "user_id": "123",
+        "batch_size": 2,
+        "batch": [{"category": "Science", "count": 2}]
+    }
+
+    async def run():
+        await mark_fresh(redis_client, "Science")
+        pool_key = main.POOL_KEY.format(category="Science")
+        await main.question_store.push(pool_key, [nearly_used_up, make_question("p1", "Science")])
+        response = await post_batch(payload)
+        return response, await redis_client.lrange(pool_key, 0, -1)
+
+    response, pool = asyncio.run(run())
+    assert sorted(q["id"] for q in response.json()["batch"]) == ["p0", "p1"]
+    # p0 reached the threshold and is not handed to the next user
+    assert pool == ["p1"]
 
 def test_getbatch_invalid_request():
     payload = {
         "batch_size": 2,
         "batch": [{"category": "Science", "count": 1}]
     }
-    response = client.post("/getbatch/", json=payload)
+    response = asyncio.run(post_batch(payload))
     assert response.status_code == 422
 
-def test_getbatch_db_failure(monkeypatch):
-    def mock_db_failure():
-        raise Exception("Database connection error")
-
-    monkeypatch.setattr("main.get_db_connection", mock_db_failure)
-    
+def test_getbatch_db_failure(app_state, redis_client, db):
+    db.fail = True
     payload = {
         "user_id": "123",
         "batch_size": 2,
         "batch": [{"category": "Science", "count": 1}]
     }
-    response = client.post("/getbatch/", json=payload)
-    assert response.status_code == 200
-    assert response.json() == []
\ No newline at end of file
+
+    async def run():
+        await mark_fresh(redis_client, "Science")
+        return await post_batch(payload)
+
+    assert asyncio.run(run()).status_code == 500
@@ -0,0 +1,99 @@
+import asyncio
+import datetime
+import json
+
+from jobqueue import JobQueue
+
+
+def make_queue(get_connection):
+    return JobQueue(get_connection, max_attempts=3, backoff_base=10, backoff_max=25, lease=60)
+
+
+def test_backoff_doubles_up_to_max(get_connection):
+    queue = make_queue(get_connection)
+    assert [queue.backoff(n) for n in range(1, 5)] == [10, 20, 25, 25]
+
+def test_enqueue_one_job_per_batch(db, get_connection):
+    asyncio.run(make_queue(get_connection).enqueue([[("A", "CAT1")], [("B", "CAT2")]]))
+    _, args = db.executed[0]
+    assert [json.loads(a[0]) for a in args] == [[["A", "CAT1"]], [["B", "CAT2"]]]
+
+def test_claim_decodes_articles(db, get_connection):
+    db.rows = [{"id": 1, "articles": '[["A", "CAT1"]]', "attempts": 1}]
+    jobs = asyncio.run(make_queue(get_connection).claim(2))
+    assert jobs == [{"id": 1, "articles": [("A", "CAT1")], "attempts": 1}]
+    assert db.executed[0][1][0] == 2
+
+def test_claim_nothing_without_room(db, get_connection):
+    assert asyncio.run(make_queue(get_connection).claim(0)) == []
+    assert db.executed == []
+
+def test_fail_retries_then_dead_letters(db, get_connection):
+    queue = make_queue(get_connection)
+    job = {"id": 1, "articles": [("A", "CAT1")], "attempts": 2}
+    assert not asyncio.run(queue.fail(job, "boom"))
+    assert db.executed[-1][1] == (1, "pending", datetime.timedelta(seconds=20), "boom", '[["A", "CAT1"]]')
+    assert asyncio.run(queue.fail(dict(job, attempts=3), "boom"))
+    assert db.executed[-1][1][1] == "dead"
+
+def test_concurrent_runs_claim_within_limit(monkeypatch, db, get_connection):
+    import main
+
+    release = None
+    fetch = db.fetch
+
+    # let the other run in while this claim is waiting on the database
+    async def slow_fetch(query, *args):
+        await asyncio.sleep(0.01)
+        return await fetch(query, *args)
+
+    def respond(query, count, lease):
+        return [{"id": i, "articles": '[["A", "CAT1"]]', "attempts": 1} for i in range(count)]
+
+    async def run_generation_job(job):
+        await release.wait()
+
+    db.fetch = slow_fetch
+    db.respond = respond
+    monkeypatch.setattr(main, "job_queue", make_queue(get_connection))
+    monkeypatch.setattr(main, "run_generation_job", run_generation_job)
+    monkeypatch.setattr(main, "QGEN_CONCURRENCY", 3)
+    monkeypatch.setattr(main, "active_jobs", set())
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        monkeypatch.setattr(main, "claim_lock", asyncio.Lock())
+        await asyncio.gather(main.run_generation_jobs(), main.run_generation_jobs())
+        running = len(main.active_jobs)
+        release.set()
+        await asyncio.gather(*main.active_jobs)
+        return running
+
+    assert asyncio.run(run()) == 3
+    # the second run only sees the slots the first left free
+    assert [args[0] for _, args in db.executed] == [3]
+
+def test_running_job_keeps_its_lease(monkeypatch, db, get_connection):
+    import main
+
+    async def fetch_and_store_questions(articles):
+        await asyncio.sleep(0.05)
+
+    monkeypatch.setattr(main, "job_queue", make_queue(get_connection))
+    monkeypatch.setattr(main, "get_db_connection", get_connection)
+    monkeypatch.setattr(main, "fetch_and_store_questions", fetch_and_store_questions)
+    monkeypatch.setattr(main, "run_generation_jobs", lambda: asyncio.sleep(0))
+    monkeypatch.setattr(main, "GENERATION_HEARTBEAT_INTERVAL", 0.01)
+
+    async def run():
+        await main.run_generation_job({"id": 7, "articles": [("A", "CAT1")], "attempts": 1})
+        renewed = len([q for q, _ in db.executed if "locked_until = NOW()" in q])
+        # the heartbeat stops with the job
+        await asyncio.sleep(0.03)
+        return renewed, len([q for q, _ in db.executed if "locked_until = NOW()" in q])
+
+    renewed, after = asyncio.run(run())
+    assert renewed >= 2
+    assert after == renewed
+    assert "DELETE FROM generation_jobs" in db.executed[-1][0]
@@ -0,0 +1,41 @@
+import asyncio
+
+from qcount import CategoryCounts, COUNT_KEY
+
+
+def test_low_category_claimed_once(redis_client):
+    counts = CategoryCounts(redis_client, low_watermark=5, trigger_cooldown=60)
+
+    async def run():
+        await counts.reset({"CAT1": 6, "CAT2": 10})
+        first = await counts.add({"CAT1": -1, "CAT2": -1})
+        second = await counts.add({"CAT1": -1})
+        third = await counts.add({"CAT1": -1})
+        return first, second, third, await counts.get()
+
+    first, second, third, current = asyncio.run(run())
+    assert first == []
+    assert second == ["CAT1"]
+    # other callers, and replicas, see the cooldown
+    assert third == []
+    assert current == {"CAT1": 3, "CAT2": 9}
+
+def test_zero_deltas_ignored(redis_client):
+    counts = CategoryCounts(redis_client, low_watermark=5, trigger_cooldown=60)
+    assert asyncio.run(counts.add({"CAT1": 0})) == []
+    assert not asyncio.run(redis_client.exists(COUNT_KEY))
+
+def test_changes_reported(redis_client):
+    changes = []
+
+    async def on_change(counts):
+        changes.append(counts)
+
+    counts = CategoryCounts(redis_client, low_watermark=5, trigger_cooldown=60, on_change=on_change)
+
+    async def run():
+        await counts.reset({"CAT1": 6})
+        await counts.add({"CAT1": 2, "CAT2": 0})
+
+    asyncio.run(run())
+    assert changes == [{"CAT1": 6}, {"CAT1": 8}]
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from qgen import AdaptiveLimit, RateMeter, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3", 5) == 3
+    assert parse_retry_after(None, 5) == 5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", 5) == 5
+
+def test_limit_bounds_concurrency():
+    limit = AdaptiveLimit(2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limit:
+            peak = max(peak, limit.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*[call() for _ in range(6)])
+
+    asyncio.run(run())
+    assert peak == 2
+    assert limit.in_flight == 0
+
+def test_overload_halves_and_pauses():
+    limit = AdaptiveLimit(8)
+    limit.overloaded(0.05)
+    assert limit.limit == 4
+
+    async def run():
+        start = time.monotonic()
+        async with limit:
+            return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.04
+    # additive increase back towards the maximum
+    for _ in range(4):
+        limit.succeeded()
+    assert 4 < limit.limit < 5
+
+def test_rate_meter():
+    meter = RateMeter(window=30)
+    meter.record(5)
+    meter.record(10)
+    assert meter.per_minute() == 30
+    assert meter.total == 15
@@ -0,0 +1,103 @@
+import asyncio
+
+from models import Question
+from qstore import QuestionStore, BODY_KEY, REFS_KEY
+
+
+def ids(bodies):
+    return [Question.parse_raw(b).id for b in bodies]
+
+def test_push_shares_bodies_and_counts_refs(redis_client, make_question):
+    store = QuestionStore(redis_client)
+
+    async def run():
+        await store.push("l1", [make_question("a"), make_question("b")])
+        await store.push("l2", [make_question("a")])
+        return await redis_client.hgetall(REFS_KEY), await redis_client.hlen(BODY_KEY)
+
+    refs, bodies = asyncio.run(run())
+    assert refs == {"a": "2", "b": "1"}
+    assert bodies == 2
+
+def test_push_replace_and_cap_release_refs(redis_client, make_question):
+    store = QuestionStore(redis_client)
+
+    async def run():
+        await store.push("l1", [make_question("a"), make_question("b")])
+        await store.push("l1", [make_question("c")], replace=True)
+        # "c" is dropped from the head once "d" and "e" go over the cap
+        length = await store.push("l1", [make_question("d"), make_question("e")], max_len=2)
+        return length, await redis_client.lrange("l1", 0, -1), await redis_client.hgetall(REFS_KEY)
+
+    length, entries, refs = asyncio.run(run())
+    assert length == 2
+    assert entries == ["d", "e"]
+    assert refs == {"d": "1", "e": "1"}
+
+def test_take_reports_shortfall_and_drops_unreferenced(redis_client, make_question):
+    store = QuestionStore(redis_client)
+
+    async def run():
+        await store.push("l1", [make_question("a"), make_question("b")])
+        await store.push("l2", [make_question("a")])
+        taken = await store.take(["l1", "l2"], [1, 3])
+        return taken, await redis_client.hgetall(REFS_KEY), await redis_client.hkeys(BODY_KEY)
+
+    (items, shortfalls), refs, bodies = asyncio.run(run())
+    assert ids(items) == ["a", "a"]
+    assert shortfalls == [0, 2]
+    # "a" is in no list any more, "b" still is
+    assert refs == {"b": "1"}
+    assert bodies == ["b"]
+
+def test_read_window_wraps_without_removing(redis_client, make_question):
+    store = QuestionStore(redis_client)
+
+    async def run():
+        await store.push("l1", [make_question(q) for q in "abcd"])
+        window = await store.read_window("l1", 3, 0.5)
+        return window, await redis_client.llen("l1")
+
+    window, length = asyncio.run(run())
+    assert ids(window) == ["c", "d", "a"]
+    assert length == 4
+
+def test_release_and_remove(redis_client, make_question):
+    store = QuestionStore(redis_client)
+
+    async def run():
+        await store.push("l1", [make_question("a"), make_question("b")])
+        await store.push("l2", [make_question("a"), make_question("c")])
+        await redis_client.sadd("lists", "l2")
+        released = await store.release(["l1"])
+        removed = await store.remove(["l2"], ["c"])
+        refs = await redis_client.hgetall(REFS_KEY)
+        released_set = await store.release_set("lists")
+        return released, removed, refs, released_set, await redis_client.hlen(BODY_KEY)
+
+    released, removed, refs, released_set, bodies = asyncio.run(run())
+    assert (released, removed) == (2, 1)
+    assert refs == {"a": "1"}
+    assert released_set == 1
+    assert bodies == 0
+
+def test_forgotten_question_regenerated_does_not_leak(redis_client, make_question):
+    store = QuestionStore(redis_client)
+
+    async def run():
+        await store.push("l1", [make_question("a")])
+        await store.push("l2", [make_question("a")])
+        await store.forget(["a"])
+        # the list goes without its references being released, e.g. expired
+        await redis_client.delete("l2")
+        # the question is regenerated under the same id
+        await store.push("l3", [make_question("a")])
+        items, _ = await store.take(["l3"], [1])
+        # the stale entry is skipped when read
+        stale, shortfalls = await store.take(["l1"], [1])
+        return items, stale, shortfalls, await redis_client.hlen(REFS_KEY), await redis_client.hlen(BODY_KEY)
+
+    items, stale, shortfalls, refs, bodies = asyncio.run(run())
+    assert ids(items) == ["a"]
+    assert (stale, shortfalls) == ([], [1])
+    assert (refs, bodies) == (0, 0)
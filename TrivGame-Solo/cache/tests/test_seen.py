@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+
+from seen import bloom_parameters, bloom_positions, make_seen_set, SeenSet, BloomSeenSet
+
+
+def test_bloom_parameters():
+    num_bits, num_hashes = bloom_parameters(1000, 0.01)
+    assert 9000 < num_bits < 10000
+    assert num_hashes == 7
+
+def test_bloom_parameters_invalid():
+    with pytest.raises(ValueError):
+        bloom_parameters(0, 0.01)
+    with pytest.raises(ValueError):
+        bloom_parameters(1000, 1.5)
+
+def test_bloom_positions_deterministic():
+    positions = bloom_positions("Frida_Kahlo", 1000, 5)
+    assert positions == bloom_positions("Frida_Kahlo", 1000, 5)
+    assert len(positions) == 5
+    assert all(0 <= p < 1000 for p in positions)
+
+def test_make_seen_set(redis_client):
+    assert type(make_seen_set(redis_client, "set", 60, 100, 0.01)) is SeenSet
+    assert type(make_seen_set(redis_client, "bloom", 60, 100, 0.01)) is BloomSeenSet
+    with pytest.raises(ValueError):
+        make_seen_set(redis_client, "list", 60, 100, 0.01)
+
+@pytest.mark.parametrize("mode", ["set", "bloom"])
+def test_filter_unseen(redis_client, mode):
+    seen_set = make_seen_set(redis_client, mode, 60, 1000, 0.001)
+
+    async def run():
+        assert not await seen_set.is_ready("1")
+        await seen_set.hydrate("1", ["1", "2", "3"])
+        assert await seen_set.is_ready("1")
+        await seen_set.add("1", ["5"])
+        return await seen_set.filter_unseen("1", ["2", "4", "5", "6"])
+
+    assert asyncio.run(run()) == ["4", "6"]
@@ -0,0 +1,68 @@
+import asyncio
+
+from singleflight import SingleFlight, flight_key, LEASE_KEY
+
+
+def make_flight(redis_client):
+    return SingleFlight(
+        redis_client,
+        encode=str,
+        decode=int,
+        lease_ttl=1,
+        result_ttl=1,
+        poll_interval=0.01
+    )
+
+
+def test_flight_key_stable():
+    assert flight_key("1", [("CAT1", 3)]) == flight_key("1", [("CAT1", 3)])
+    assert flight_key("1", [("CAT1", 3)]) != flight_key("2", [("CAT1", 3)])
+
+def test_local_duplicates_share_one_call(redis_client):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run():
+        flight = make_flight(redis_client)
+        return await asyncio.gather(*[flight.do("k", fetch) for _ in range(5)])
+
+    assert asyncio.run(run()) == [42] * 5
+    assert len(calls) == 1
+
+def test_replicas_share_one_call(redis_client):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 7
+
+    async def run():
+        leader = make_flight(redis_client)
+        follower = make_flight(redis_client)
+        first = asyncio.ensure_future(leader.do("k", fetch))
+        await asyncio.sleep(0.01)
+        second = await follower.do("k", fetch)
+        return await first, second, await redis_client.exists(LEASE_KEY.format(key="k"))
+
+    first, second, leased = asyncio.run(run())
+    assert (first, second) == (7, 7)
+    assert len(calls) == 1
+    assert not leased
+
+def test_sequential_calls_run_again(redis_client):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        flight = make_flight(redis_client)
+        return [await flight.do("k", fetch), await flight.do("k", fetch)]
+
+    assert asyncio.run(run()) == [1, 2]
@@ -0,0 +1,51 @@
+import asyncio
+import json
+import time
+
+import main
+from qstore import QuestionStore
+from snapshot import save_snapshot, load_snapshot
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "snapshot.json"
+    save_snapshot(str(path), ["CAT1", "CAT2"], {"CAT1": ['{"id": "q1"}']})
+    snapshot = load_snapshot(str(path), max_age=60)
+    assert snapshot["categories"] == ["CAT1", "CAT2"]
+    assert snapshot["pools"] == {"CAT1": ['{"id": "q1"}']}
+    # only the snapshot itself is left behind
+    assert [p.name for p in tmp_path.iterdir()] == ["snapshot.json"]
+
+def test_missing_or_corrupt(tmp_path):
+    path = tmp_path / "snapshot.json"
+    assert load_snapshot(str(path), max_age=60) is None
+    path.write_text("{not json")
+    assert load_snapshot(str(path), max_age=60) is None
+
+def test_stale(tmp_path):
+    path = tmp_path / "snapshot.json"
+    save_snapshot(str(path), ["CAT1"], {})
+    snapshot = json.loads(path.read_text())
+    snapshot["saved_at"] = time.time() - 120
+    path.write_text(json.dumps(snapshot))
+    assert load_snapshot(str(path), max_age=60) is None
+
+
+def test_restore_drops_unservable_questions(monkeypatch, redis_client, db, get_connection, make_question):
+    db.rows = [{"id": "a"}]
+    monkeypatch.setattr(main, "redis_client", redis_client)
+    monkeypatch.setattr(main, "question_store", QuestionStore(redis_client))
+    monkeypatch.setattr(main, "get_db_connection", get_connection)
+
+    def body(qid):
+        return make_question(qid).json()
+
+    async def run():
+        restored = await main.restore_pools({"CAT1": [body("a"), body("gone")], "CAT2": [body("gone")]})
+        return restored, await redis_client.lrange("pool:CAT1", 0, -1), await redis_client.exists("pool:CAT2")
+
+    restored, pool, cat2 = asyncio.run(run())
+    assert [args[0] for _, args in db.executed] == [["a", "gone", "gone"]]
+    assert restored == 1
+    assert pool == ["a"]
+    assert not cat2
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import main
+from qgen import AdaptiveLimit
+
+
+def question(title):
+    return {"prompt1": "1", "prompt2": "2", "prompt3": "3", "answer": "a", "title": title}
+
+def use_stream(monkeypatch, lines):
+    async def stream_questions(payload):
+        for line in lines:
+            yield line
+
+    batches = []
+
+    async def store_questions(items):
+        batches.append([title for title, _, _ in items])
+        return len(items)
+
+    monkeypatch.setattr(main, "QGEN_STREAM", True)
+    monkeypatch.setattr(main, "QGEN_STREAM_FLUSH_SIZE", 2)
+    monkeypatch.setattr(main, "QGEN_STREAM_FLUSH_INTERVAL", 60)
+    monkeypatch.setattr(main, "stream_questions", stream_questions)
+    monkeypatch.setattr(main, "store_questions", store_questions)
+    return batches
+
+def test_streamed_questions_stored_in_batches(monkeypatch):
+    batches = use_stream(monkeypatch, [
+        {"ok": True, "title": t, "question": question(t)} for t in ["a", "b", "unknown", "c"]
+    ])
+    asyncio.run(main.fetch_and_store_questions([("a", "CAT1"), ("b", "CAT1"), ("c", "CAT2")]))
+    # the line for an article that was not requested is skipped
+    assert batches == [["a", "b"], ["c"]]
+
+def test_stream_stopped_keeps_pending(monkeypatch):
+    batches = use_stream(monkeypatch, [
+        {"ok": True, "title": "a", "question": question("a")},
+        {"ok": False, "error": "quota"},
+    ])
+    with pytest.raises(main.GenerationStopped, match="quota") as stopped:
+        asyncio.run(main.fetch_and_store_questions([("a", "CAT1"), ("b", "CAT1")]))
+    assert batches == [["a"]]
+    # the retry only asks for what did not arrive
+    assert stopped.value.remaining == [("b", "CAT1")]
+
+def test_timeout_mid_stream_is_not_retried(monkeypatch):
+    requests = []
+
+    async def body():
+        yield json.dumps({"ok": True, "title": "a", "question": question("a")}).encode() + b"\n"
+        raise httpx.ReadTimeout("slow")
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=body())
+
+    limit = AdaptiveLimit(4)
+    monkeypatch.setattr(main, "qgen_client", httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://qgen"))
+    monkeypatch.setattr(main, "qgen_limit", limit)
+    overloaded = main.generation_metrics["overloaded_responses"]
+
+    async def collect():
+        return [item async for item in main.stream_questions({})]
+
+    items = asyncio.run(collect())
+    assert [item["ok"] for item in items] == [True, False]
+    assert items[0]["title"] == "a"
+    assert len(requests) == 1
+    # a stream that was making progress is not a sign of overload
+    assert main.generation_metrics["overloaded_responses"] == overloaded
+    assert limit.limit == 4
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+
+from writebehind import WriteBehindBuffer
+
+
+def make_buffer(get_connection, max_pending=10, on_exhausted=None):
+    return WriteBehindBuffer(get_connection, max_pending, 5, on_exhausted)
+
+
+def test_add_coalesces(get_connection):
+    buffer = make_buffer(get_connection, max_pending=4)
+    assert not buffer.add("1", ["a", "b"])
+    assert not buffer.add("2", ["a"])
+    assert buffer.add("2", ["a", "c"])
+    assert buffer.usage == {"a": 3, "b": 1, "c": 1}
+    assert buffer.pending == 4
+
+def test_flush_writes_once(db, get_connection):
+    buffer = make_buffer(get_connection)
+    buffer.add("1", ["b", "a"])
+    buffer.add("2", ["a"])
+
+    usage = asyncio.run(buffer.flush())
+
+    assert usage == {"a": 2, "b": 1}
+    update_args = db.executed[0][1]
+    assert update_args == (["a", "b"], [2, 1], 5)
+    assert db.copied == [("user_question_staging", [("1", "a"), ("1", "b"), ("2", "a")])]
+    assert buffer.pending == 0
+    assert not buffer.usage
+
+def test_flush_empty_is_noop(db, get_connection):
+    asyncio.run(make_buffer(get_connection).flush())
+    assert db.executed == []
+
+def test_flush_failure_keeps_data(db, get_connection):
+    db.fail = True
+    buffer = make_buffer(get_connection)
+    buffer.add("1", ["a"])
+    with pytest.raises(Exception):
+        asyncio.run(buffer.flush())
+    buffer.add("1", ["b"])
+    assert buffer.usage == {"a": 1, "b": 1}
+    assert buffer.seen_pairs == {("1", "a"), ("1", "b")}
+
+def test_flush_reports_exhausted(db, get_connection):
+    reported = []
+
+    async def on_exhausted(counts):
+        reported.append(counts)
+
+    db.rows = [{"category": "CAT1", "n": 2}]
+    buffer = make_buffer(get_connection, on_exhausted=on_exhausted)
+    buffer.add("1", ["a"])
+    asyncio.run(buffer.flush())
+    assert reported == [{"CAT1": 2}]
+
+def test_repeated_failures_drop_batch(db, get_connection):
+    db.fail = True
+    buffer = make_buffer(get_connection)
+    buffer.max_attempts = 2
+    buffer.add("1", ["a"])
+    for _ in range(2):
+        with pytest.raises(Exception):
+            asyncio.run(buffer.flush())
+    assert buffer.pending == 0
+    assert not buffer.usage
+    # later writes go through once the database accepts them again
+    db.fail = False
+    buffer.add("1", ["b"])
+    assert asyncio.run(buffer.flush()) == {"b": 1}
+
+def test_unknown_users_skipped(db, get_connection):
+    buffer = make_buffer(get_connection)
+    buffer.add("1", ["a"])
+    asyncio.run(buffer.flush())
+    insert = db.executed[-1][0]
+    assert "JOIN users u ON u.id = s.user_id" in insert
@@ -0,0 +1,130 @@
+import asyncio
+from collections import Counter
+
+
+class WriteBehindBuffer:
+    """
+    Coalescing write-behind buffer for the bookkeeping done when questions are served.
+
+    Usage count increments are aggregated per question id and (user_id,
+    question_id) pairs are de-duplicated in memory, then written to Postgres
+    in one transaction per flush: a single UPDATE joined against unnest()
+    arrays and a COPY of the pairs into user_question_store.
+
+    Attributes
+    ----------
+    get_connection : callable
+        Returns an async context manager yielding an asyncpg connection.
+    max_pending : int
+        Number of buffered pairs after which ``add`` asks for a flush.
+    usage_threshold : int
+        Usage count at which a question is used up.
+    on_exhausted : callable, optional
+        Awaited after a flush with the number of questions per category that
+        reached ``usage_threshold`` in it.
+    max_attempts : int, optional
+        Flushes a batch may fail before it is dropped, by default 3.
+    """
+    def __init__(self, get_connection, max_pending, usage_threshold, on_exhausted=None, max_attempts=3):
+        self.get_connection = get_connection
+        self.max_pending = max_pending
+        self.usage_threshold = usage_threshold
+        self.on_exhausted = on_exhausted
+        self.max_attempts = max_attempts
+        self.failures = 0
+        self.usage = Counter()
+        self.seen_pairs = set()
+        self.lock = asyncio.Lock()
+
+    @property
+    def pending(self):
+        return len(self.seen_pairs)
+
+    def add(self, user_id, question_ids):
+        """
+        Buffer that ``question_ids`` were served to ``user_id``.
+
+        Returns
+        -------
+        should_flush : bool
+            True once the buffer has reached ``max_pending`` pairs.
+        """
+        for qid in question_ids:
+            self.usage[qid] += 1
+            self.seen_pairs.add((user_id, qid))
+        return self.pending >= self.max_pending
+
+    async def flush(self):
+        """
+        Write everything buffered so far. On failure the data is put back
+        so the next flush retries it, until ``max_attempts`` flushes in a
+        row have failed; then it is dropped so it cannot block later writes.
+
+        Returns
+        -------
+        usage : collections.Counter
+            The usage increments that were written, by question id.
+        """
+        async with self.lock:
+            usage, self.usage = self.usage, Counter()
+            seen_pairs, self.seen_pairs = self.seen_pairs, set()
+            if not usage and not seen_pairs:
+                return usage
+            try:
+                exhausted = await self._write(usage, seen_pairs)
+            except Exception:
+                self.failures += 1
+                if self.failures < self.max_attempts:
+                    self.usage.update(usage)
+                    self.seen_pairs |= seen_pairs
+                else:
+                    print(f"Dropping {len(usage)} usage counts and {len(seen_pairs)} seen pairs after {self.failures} failed flushes")
+                    self.failures = 0
+                raise
+            self.failures = 0
+        if exhausted and self.on_exhausted is not None:
+            await self.on_exhausted(exhausted)
+        return usage
+
+    async def _write(self, usage, seen_pairs):
+        # sorted ids keep row lock order stable across concurrent flushes
+        ids = sorted(usage)
+        exhausted = {}
+        async with self.get_connection() as conn, conn.transaction():
+            if ids:
+                rows = await conn.fetch("""
+                    WITH updated AS (
+                        UPDATE questions q
+                        SET usage_count = q.usage_count + v.n
+                        FROM unnest($1::text[], $2::int[]) AS v(id, n)
+                        WHERE q.id = v.id
+                        RETURNING q.category, q.usage_count, v.n
+                    )
+                    SELECT category, COUNT(*) AS n FROM updated
+                    WHERE usage_count >= $3 AND usage_count - n < $3
+                    GROUP BY category
+                """, ids, [usage[qid] for qid in ids], self.usage_threshold)
+                exhausted = {r["category"]: r["n"] for r in rows}
+
+            if seen_pairs:
+                await conn.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS user_question_staging (
+                        user_id VARCHAR(255),
+                        question_id VARCHAR(255)
+                    ) ON COMMIT DELETE ROWS
+                """)
+                await conn.copy_records_to_table(
+                    "user_question_staging",
+                    records=sorted(seen_pairs)
+                )
+                # skip questions evicted while their pairs were buffered, and
+                # unknown users, whose rows would fail the foreign key
+                await conn.execute("""
+                    INSERT INTO user_question_store (user_id, question_id)
+                    SELECT s.user_id, s.question_id
+                    FROM user_question_staging s
+                    JOIN questions q ON q.id = s.question_id
+                    JOIN users u ON u.id = s.user_id
+                    ON CONFLICT DO NOTHING
+                """)
+        return exhausted
@@ -7,9 +7,19 @@ CREATE TABLE IF NOT EXISTS questions (
     answer TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     usage_count INT DEFAULT 0,
-    downvote_count INT DEFAULT 0
+    downvote_count INT DEFAULT 0,
+    random_rank DOUBLE PRECISION NOT NULL DEFAULT random()
 );
 
+-- Candidate paging in the cache service walks questions by category in id order
+CREATE INDEX IF NOT EXISTS questions_category_id_idx ON questions (category, id);
+-- or from a random point in random_rank order
+CREATE INDEX IF NOT EXISTS questions_category_random_rank_idx ON questions (category, random_rank);
+-- Eviction deletes in chunks by each of these predicates
+CREATE INDEX IF NOT EXISTS questions_usage_count_idx ON questions (usage_count);
+CREATE INDEX IF NOT EXISTS questions_downvote_count_idx ON questions (downvote_count);
+CREATE INDEX IF NOT EXISTS questions_created_at_idx ON questions (created_at);
+
 INSERT INTO questions (id, category, hint1, hint2, hint3, answer) VALUES
 ('1', 'CAT1', 'h1', 'h2', 'h3', 'ans'),
 ('2', 'CAT1', 'h1', 'h2', 'h3', 'ans'),
@@ -62,6 +72,9 @@ CREATE TABLE IF NOT EXISTS user_question_store (
     PRIMARY KEY (user_id, question_id)
 );
 
+-- Deleting a question cascades here by question_id, which the primary key can't serve
+CREATE INDEX IF NOT EXISTS user_question_store_question_id_idx ON user_question_store (question_id);
+
 INSERT INTO user_question_store (user_id, question_id) VALUES
 ('1', '1'),
 ('1', '2'),
@@ -77,9 +90,28 @@ CREATE TABLE IF NOT EXISTS wiki_articles (
     title TEXT NOT NULL,
     category TEXT NOT NULL,
     last_used TIMESTAMP DEFAULT NULL,
+    claimed_until TIMESTAMP DEFAULT NULL,
     PRIMARY KEY (title, category)
 );
 
+-- Generation claims unused articles by category
+CREATE INDEX IF NOT EXISTS wiki_articles_category_idx ON wiki_articles (category);
+
+-- Durable queue of question generation batches for the cache service
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    articles JSONB NOT NULL, -- [[title, category], ...]
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, running or dead
+    attempts INT NOT NULL DEFAULT 0,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_until TIMESTAMP DEFAULT NULL,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS generation_jobs_status_run_after_idx ON generation_jobs (status, run_after);
+
 COPY wiki_articles(title, category) 
 FROM '/docker-entrypoint-initdb.d/data/wiki_articles.csv' 
 DELIMITER ',' CSV HEADER;
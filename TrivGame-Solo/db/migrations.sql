@@ -0,0 +1,28 @@
+-- Schema changes for databases created before init.sql had them. init.sql
+-- only runs on an empty data volume, so this runs on every start through
+-- the db-migrate service in docker-compose.yml. Every statement must be
+-- safe to run again.
+
+-- random_rank for indexed random selection. The default is volatile, so
+-- adding the column evaluates it for every existing row, backfilling each
+-- with its own rank.
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS random_rank DOUBLE PRECISION NOT NULL DEFAULT random();
+CREATE INDEX IF NOT EXISTS questions_category_random_rank_idx ON questions (category, random_rank);
+
+-- Expiring claims on articles while their questions are generated
+ALTER TABLE wiki_articles ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMP DEFAULT NULL;
+CREATE INDEX IF NOT EXISTS wiki_articles_category_idx ON wiki_articles (category);
+
+-- Durable queue of question generation batches
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    articles JSONB NOT NULL, -- [[title, category], ...]
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, running or dead
+    attempts INT NOT NULL DEFAULT 0,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_until TIMESTAMP DEFAULT NULL,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS generation_jobs_status_run_after_idx ON generation_jobs (status, run_after);
@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import ParticlesBackground from "./ParticlesBackground";
 
@@ -18,8 +18,26 @@ const categories = [
 const CategoryPage = () => {
     const navigate = useNavigate();
     const [values, setValues] = useState(Array(10).fill(1));
+    const [counts, setCounts] = useState({});
     const maxTotal = 10;
 
+    useEffect(() => {
+        const fetchCounts = async () => {
+            try {
+                const res = await fetch(`/cache/categories/`);
+                if (!res.ok) return;
+                const data = await res.json();
+                setCounts(data.categories.reduce((acc, category) => {
+                    acc[category.name] = category.count;
+                    return acc;
+                }, {}));
+            } catch (err) {
+                console.error("Failed to load category counts", err);
+            }
+        };
+        fetchCounts();
+    }, []);
+
     const handleSliderChange = (index, newValue) => {
         let total = values.reduce((sum, val) => sum + val, 0);
         let diff = newValue - values[index];
@@ -67,7 +85,10 @@ const CategoryPage = () => {
                                 onChange={(e) => handleSliderChange(index, Number(e.target.value))}
                                 className="w-full cursor-pointer"
                             />
-                            <p className="text-xs text-gray-600">Selected: {values[index]}</p>
+                            <p className="text-xs text-gray-600">
+                                Selected: {values[index]}
+                                {counts[category] !== undefined && ` (${counts[category]} available)`}
+                            </p>
                         </div>
                     ))}
                 </div>
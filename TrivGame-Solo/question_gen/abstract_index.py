@@ -0,0 +1,188 @@
+"""
+Offline index of Wikipedia abstracts, built from an abstracts dump such as
+enwiki-latest-abstract.xml.gz.
+
+Build the index once:
+
+    python abstract_index.py build enwiki-latest-abstract.xml.gz /data/abstracts
+
+and time lookups of the seeded articles against it:
+
+    python abstract_index.py bench /data/abstracts ../seedtool/db/data/wiki_articles.csv
+
+The build writes two files. ``<prefix>.data`` holds each article as its
+normalized title, a NUL byte and its abstract, in UTF-8. ``<prefix>.idx``
+holds one fixed-width record per article (64-bit title hash, offset, length),
+sorted by hash, and is binary searched in place through mmap.
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import mmap
+import os
+import struct
+import time
+import xml.etree.ElementTree as ET
+
+RECORD = struct.Struct("<QQQ") # title hash, offset into the data file, length
+TITLE_PREFIX = "Wikipedia: "
+
+
+def normalize_title(title):
+    """
+    The canonical form of an article title: underscores as spaces, runs of
+    whitespace collapsed and the first letter upper case, as MediaWiki does.
+    """
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+def title_hash(title):
+    digest = hashlib.blake2b(normalize_title(title).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def iter_abstracts(dump_path):
+    """
+    Yield (title, abstract) for each document of an abstracts dump.
+    """
+    opener = gzip.open if dump_path.endswith(".gz") else open
+    with opener(dump_path, "rb") as f:
+        root = None
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if root is None:
+                root = elem
+            if event != "end" or elem.tag != "doc":
+                continue
+            title = elem.findtext("title") or ""
+            if title.startswith(TITLE_PREFIX):
+                title = title[len(TITLE_PREFIX):]
+            if title:
+                yield title, elem.findtext("abstract") or ""
+            # documents are not needed once read, keep memory flat
+            root.clear()
+
+
+def build_index(dump_path, prefix):
+    """
+    Index an abstracts dump into ``<prefix>.data`` and ``<prefix>.idx``.
+
+    Returns
+    -------
+    count : int
+        Number of articles indexed. Later duplicates of a title are skipped.
+    """
+    entries = {}
+    with open(prefix + ".data", "wb") as data:
+        offset = 0
+        for title, abstract in iter_abstracts(dump_path):
+            title = normalize_title(title)
+            key = title_hash(title)
+            if key in entries:
+                continue
+            record = title.encode() + b"\0" + abstract.encode()
+            data.write(record)
+            entries[key] = (offset, len(record))
+            offset += len(record)
+    with open(prefix + ".idx", "wb") as idx:
+        for key in sorted(entries):
+            idx.write(RECORD.pack(key, *entries[key]))
+    return len(entries)
+
+
+class AbstractIndex:
+    """
+    Read-only view of an index built by ``build_index``.
+
+    Both files are memory mapped, so opening the index is instant and only
+    the pages touched by lookups are read.
+
+    Attributes
+    ----------
+    prefix : str
+        Path of the index files without their extension.
+    """
+    def __init__(self, prefix):
+        self.prefix = prefix
+        with open(prefix + ".idx", "rb") as f:
+            self.idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        with open(prefix + ".data", "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self.count = len(self.idx) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, title):
+        """
+        The stored (title, abstract) bytes of an article, or None.
+        """
+        title = normalize_title(title)
+        key = title_hash(title)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if RECORD.unpack_from(self.idx, mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count:
+            return None
+        found, offset, length = RECORD.unpack_from(self.idx, lo * RECORD.size)
+        if found != key:
+            return None
+        stored_title, _, abstract = self.data[offset:offset + length].partition(b"\0")
+        # a hash collision with another title is a miss
+        if stored_title != title.encode():
+            return None
+        return abstract
+
+    def exists(self, title):
+        return self._find(title) is not None
+
+    def summary(self, title):
+        """
+        The abstract of an article, or None if it is not in the dump.
+        """
+        abstract = self._find(title)
+        return None if abstract is None else abstract.decode()
+
+    def close(self):
+        for mapped in (self.idx, self.data):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+
+def benchmark(prefix, titles_csv):
+    """
+    Look up every title of a CSV with a ``title`` column and report the
+    time per lookup.
+    """
+    with open(titles_csv, newline="") as f:
+        titles = [row["title"] for row in csv.DictReader(f)]
+    index = AbstractIndex(prefix)
+    start = time.perf_counter()
+    found = sum(index.summary(title) is not None for title in titles)
+    elapsed = time.perf_counter() - start
+    index.close()
+    print(f"{len(titles)} lookups, {found} found, {elapsed / max(len(titles), 1) * 1e6:.1f}us per lookup")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index an abstracts dump")
+    build.add_argument("dump")
+    build.add_argument("prefix")
+    bench = commands.add_parser("bench", help="time lookups of the titles in a CSV")
+    bench.add_argument("prefix")
+    bench.add_argument("titles_csv")
+    args = parser.parse_args()
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_index(args.dump, args.prefix)
+        print(f"Indexed {count} articles in {time.perf_counter() - start:.1f}s")
+    else:
+        benchmark(args.prefix, args.titles_csv)
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def completion_key(model, prompt):
+    """
+    Content address of a completion: the SHA-256 of the model and the full
+    prompt, which includes the article summary.
+    """
+    return hashlib.sha256(f"{model}\0{prompt}".encode()).hexdigest()
+
+
+class MemoryStore:
+    """
+    Completions in a process-local LRU dict, lost on restart.
+
+    Attributes
+    ----------
+    max_entries : int
+        Completions to keep before the least recently used is dropped.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, content, tokens):
+        self.entries[key] = (content, tokens)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def close(self):
+        pass
+
+
+class SqliteStore:
+    """
+    Completions in a SQLite file that survives restarts, least recently used
+    dropped first.
+
+    Attributes
+    ----------
+    path : str
+        The SQLite file.
+    max_entries : int
+        Completions to keep.
+    """
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)")
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content, tokens FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self.conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+                self.conn.commit()
+        return row
+
+    def put(self, key, content, tokens):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completions (key, content, tokens, last_used) VALUES (?, ?, ?, ?)",
+                (key, content, tokens, time.time())
+            )
+            self.conn.execute("""
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class LLMCache:
+    """
+    Cache of usable LLM completions by content address, so a prompt that
+    was answered before, e.g. for an article of a retried batch, costs no
+    LLM call.
+
+    Attributes
+    ----------
+    store : MemoryStore or SqliteStore
+        Where completions are kept.
+    cost_per_1k_tokens : float
+        Dollars per thousand tokens, to price the tokens saved.
+    hits, misses : int
+        Lookups answered from the cache, and ones that were not.
+    tokens_saved : int
+        Tokens the cached completions used when they were first generated,
+        summed over hits.
+    """
+    def __init__(self, store, cost_per_1k_tokens):
+        self.store = store
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def get(self, model, prompt):
+        """
+        The cached completion text for a prompt, or None.
+        """
+        entry = self.store.get(completion_key(model, prompt))
+        if entry is None:
+            self.misses += 1
+            return None
+        content, tokens = entry
+        self.hits += 1
+        self.tokens_saved += tokens
+        return content
+
+    def put(self, model, prompt, content, tokens):
+        self.store.put(completion_key(model, prompt), content, tokens)
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "dollars_saved": self.tokens_saved / 1000 * self.cost_per_1k_tokens,
+        }
+
+
+def make_store(kind, path, max_entries):
+    """
+    A completion store by name: "memory", "sqlite", or "none" for no cache.
+    """
+    if kind == "memory":
+        return MemoryStore(max_entries)
+    if kind == "sqlite":
+        return SqliteStore(path, max_entries)
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown LLM cache store {kind}")
@@ -1,11 +1,26 @@
 import wikipediaapi
-from openai import OpenAI, RateLimitError
-from fastapi import FastAPI
+from openai import AsyncOpenAI, RateLimitError
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional
+import asyncio
+import json
 import os
-import time
+import threading
+
+try:
+    from .ratelimit import RateLimiter
+    from .summary_cache import SummaryCache
+    from .abstract_index import AbstractIndex
+    from .llm_cache import LLMCache, make_store
+except ImportError: # run as a top-level module by uvicorn main:app
+    from ratelimit import RateLimiter
+    from summary_cache import SummaryCache
+    from abstract_index import AbstractIndex
+    from llm_cache import LLMCache, make_store
 
 # wiki_wiki = wikipediaapi.Wikipedia(user_agent= 'SWEats (geoffreyxu@g.ucla.edu)', language='en')
 # llm = OpenAI()
@@ -13,6 +28,35 @@ import time
 wiki_wiki = None
 llm = None
 
+# Wikipedia summaries are kept on disk so an article is only fetched once
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "/data/summaries.sqlite")
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 100000))
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", 30 * 24 * 60 * 60)) # in seconds
+summary_cache = None
+
+# With WIKI_SOURCE "index", summaries are read from a local abstracts index
+# built by abstract_index.py instead of the Wikipedia API
+WIKI_SOURCE = os.getenv("WIKI_SOURCE", "api") # "api" or "index"
+ABSTRACT_INDEX_PATH = os.getenv("ABSTRACT_INDEX_PATH", "/data/abstracts") # without .idx/.data
+abstract_index = None
+
+# Usable completions are cached by a hash of model and prompt, so articles
+# of a retried batch are not sent to the LLM again
+LLM_CACHE_STORE = os.getenv("LLM_CACHE_STORE", "sqlite") # "memory", "sqlite" or "none"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "/data/completions.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+LLM_COST_PER_1K_TOKENS = float(os.getenv("LLM_COST_PER_1K_TOKENS", 0.002)) # in dollars
+llm_cache = None
+
+# With LLM_BATCH_SIZE above 1, articles are sent to the LLM that many at a
+# time in one JSON completion, and items it gets wrong are retried one by one
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", 1))
+batch_metrics = {
+    "batched_requests": 0,
+    "batched_questions": 0,
+    "fallback_questions": 0,
+}
+
 tags_metadata = [
     {
         "name": "questions",
@@ -20,6 +64,10 @@ tags_metadata = [
             If OPENAI_USER_AGENT is set to 'DUMMY', the response will be a dummy response\
                 instead of calling the chatbot."
     },
+    {
+        "name": "metrics",
+        "description": "Completion cache, summary cache and batching statistics"
+    },
     {
         "name": "health",
         "description": "Health check for the API"
@@ -34,6 +82,20 @@ class Question(BaseModel):
     prompt2: str
     prompt3: str
     answer: str
+    title: Optional[str] = None # the article the question was generated from
+
+class QuestionItem(BaseModel):
+    title: str = ""
+    question: Optional[Question] = None
+    ok: bool = True
+    error: str = ""
+
+class BatchItem(BaseModel):
+    title: str
+    prompt1: str = Field(min_length=1)
+    prompt2: str = Field(min_length=1)
+    prompt3: str = Field(min_length=1)
+    answer: str = Field(min_length=1)
 
 class Questions(BaseModel):
     questions: list[Question]
@@ -45,9 +107,25 @@ class Questions(BaseModel):
 async def lifespan(app: FastAPI):
     global wiki_wiki
     global llm
+    global summary_cache
+    global abstract_index
     wiki_wiki = wikipediaapi.Wikipedia(user_agent=os.environ['OPENAI_USER_AGENT'], language='en')
-    llm = OpenAI()
+    llm = AsyncOpenAI()
+    summary_cache = SummaryCache(SUMMARY_CACHE_PATH, SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_TTL)
+    global llm_cache
+    llm_cache_store = make_store(LLM_CACHE_STORE, LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES)
+    if llm_cache_store is not None:
+        llm_cache = LLMCache(llm_cache_store, LLM_COST_PER_1K_TOKENS)
+    if WIKI_SOURCE == "index":
+        abstract_index = AbstractIndex(ABSTRACT_INDEX_PATH)
+        print(f"Loaded abstract index of {len(abstract_index)} articles")
     yield
+    await llm.close()
+    summary_cache.close()
+    if llm_cache is not None:
+        llm_cache.store.close()
+    if abstract_index is not None:
+        abstract_index.close()
 
 
 app = FastAPI(lifespan=lifespan, openapi_tags=tags_metadata)
@@ -63,9 +141,27 @@ def read_root():
     return {"Hello": "World"}
 
 DUMMY_MODE = os.getenv("DUMMY_MODE", "False").lower() == "true"
+DUMMY_DELAY = float(os.getenv("DUMMY_DELAY", 7)) # in seconds, simulated generation time per article
+
+# Articles of a batch are generated concurrently, up to LLM_CONCURRENCY LLM
+# calls at a time across all requests, and paced to the account's requests
+# and tokens per minute
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 200000))
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", 150)) # reserved per call until usage is known
+llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+llm_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+
+# Requests beyond MAX_INFLIGHT_REQUESTS are turned away with 503 and a
+# Retry-After header, which callers use to back off
+MAX_INFLIGHT_REQUESTS = int(os.getenv("MAX_INFLIGHT_REQUESTS", 4))
+RETRY_AFTER = int(os.getenv("RETRY_AFTER", 10)) # in seconds
+inflight = threading.BoundedSemaphore(MAX_INFLIGHT_REQUESTS)
 
 @app.post("/questions", tags=["questions"])
-def read_questions(articles: Articles)-> Questions:
+async def read_questions(articles: Articles)-> Questions:
     print("=== read_questions CALLED ===")
     """
     Given a list of article titles, generate a NAQT style trivia question for each article.
@@ -78,49 +174,161 @@ def read_questions(articles: Articles)-> Questions:
     -------
     questions: A list of NAQT style trivia questions.
     """
+    if not inflight.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many requests in flight",
+            headers={"Retry-After": str(RETRY_AFTER)}
+        )
+    try:
+        return await generate_questions(articles)
+    finally:
+        inflight.release()
 
-    questions = []
-    ok = True
-    error = ""
-    print("reading questions")
-    # FOR TESTING PURPOSES WITHOUT USING OPENAI OR WIKIPEDIA
-    if DUMMY_MODE:
-        print("Testing in DUMMY MODE")
-        for title in articles.article_names:
-            question = Question(prompt1="prompt1", prompt2="prompt2", prompt3="prompt3", answer=title)
-            questions.append(question)
-        time.sleep(len(articles.article_names) * 7) # Simulate a long wait time
+class GenerationError(Exception):
+    """
+    Raised when generation has to stop for the rest of a batch.
+    """
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of a prompt, at about four characters per token.
+    """
+    return len(text) // 4 + 1
+
+def fetch_page_summary(article_name: str) -> Optional[str]:
+    """
+    Fetch the article's summary from Wikipedia, or None if it does not exist.
+    """
+    page = wiki_wiki.page(article_name)
+    if not page.exists():
+        return None
+    return page.summary
+
+def fetch_summary(article_name: str) -> Optional[str]:
+    """
+    The article's summary, or None if it does not exist, from the abstract
+    index when it is in use, otherwise from the summary cache if it has it.
+    Blocking.
+    """
+    if abstract_index is not None:
+        return abstract_index.summary(article_name)
+    if summary_cache is None:
+        return fetch_page_summary(article_name)
+    return summary_cache.get(article_name, fetch_page_summary)
 
-        return Questions(questions=questions, ok=ok, error=error)
+def build_prompt(summary: str) -> str:
+    prompt = "Create a NAQT style triva prompt using 3 clues which contain one fact each in decreasing obscurity given the following abstract:\n" + summary
+    prompt += "\n Each clue should be less than 15 words long. The first clue should be prefaced with '1.', the second with '2.', and the third with '3.'. The answer should be prefaced with 'ANSWER:'."
     
-    for article_name in articles.article_names:
-        print(f"Generating question for article {article_name}")
-        page = wiki_wiki.page(article_name)
-        if not page.exists():
-            error = f"Article {article_name} does not exist."
-            ok = False
-            break
-        
+    # NOTE: The following line actually makes the question generation significantly worse if used instead of the above line.
+    # This is likely because the weird symbol makes the prompt out of distribution.
 
-        prompt = "Create a NAQT style triva prompt using 3 clues which contain one fact each in decreasing obscurity given the following abstract:\n" + page.summary
-        prompt += "\n Each clue should be less than 15 words long. The first clue should be prefaced with '1.', the second with '2.', and the third with '3.'. The answer should be prefaced with 'ANSWER:'."
-        
-        # NOTE: The following line actually makes the question generation significantly worse if used instead of the above line.
-        # This is likely because the weird symbol makes the prompt out of distribution.
+    # prompt += "\n The first clue should be prefaced with '*|*', the second with '*|*', and the third with *|*.'. The answer should be prefaced with '*|*'."
+    return prompt
+
+def build_batch_prompt(summaries: dict) -> str:
+    """
+    One prompt asking for a question per article, answered as JSON, so the
+    instructions are sent once for the whole batch.
+    """
+    prompt = "For each abstract below, create a NAQT style triva prompt using 3 clues which contain one fact each in decreasing obscurity."
+    prompt += " Each clue should be less than 15 words long."
+    prompt += ' Reply with a JSON object {"questions": [...]} holding one object per abstract with the keys "title" (the title given with the abstract), "prompt1", "prompt2" and "prompt3" (the clues, without numbering) and "answer".'
+    for title, summary in summaries.items():
+        prompt += f"\n\nTitle: {title}\nAbstract: {summary}"
+    return prompt
 
-        # prompt += "\n The first clue should be prefaced with '*|*', the second with '*|*', and the third with *|*.'. The answer should be prefaced with '*|*'."
+def format_question(question: Question) -> str:
+    """
+    A question written as a single-article completion, for the LLM cache.
+    """
+    return f"1. {question.prompt1}\n2. {question.prompt2}\n3. {question.prompt3}\nANSWER: {question.answer}"
 
-        if os.environ['OPENAI_USER_AGENT'] == 'DUMMY':
-            question = Question(prompt1="1. Clue 1", prompt2="2. Clue 2", prompt3="3. Clue 3", answer="ANSWER: Answer")
-            print(f"Dummy question for article {article_name}", flush=True)
-            questions.append(question)
+def parse_batch(content: str, titles) -> dict:
+    """
+    The valid questions of a batch completion by title. Items that are
+    malformed, have an empty field or a title not asked for are left out.
+    """
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return {}
+    items = data.get("questions") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return {}
+    questions = {}
+    for raw in items:
+        try:
+            item = BatchItem.parse_obj(raw)
+        except ValidationError:
             continue
+        if item.title in titles and item.title not in questions:
+            questions[item.title] = Question(prompt1=item.prompt1, prompt2=item.prompt2, prompt3=item.prompt3, answer=item.answer)
+    return questions
+
+def parse_question(content: str) -> Optional[Question]:
+    """
+    The question in a completion, or None if a part of it is empty.
+
+    Raises
+    ------
+    IndexError: If the completion is missing one of the markers.
+    """
+    prompt1 = content.split("1.")[1].split("\n2.")[0].strip()
+    prompt2 = content.split("\n2.")[1].split("\n3.")[0].strip()
+    prompt3 = content.split("\n3.")[1].split("ANSWER:")[0].strip()
+    answer = content.split("ANSWER:")[1].strip()
+
+    if len(prompt1) and len(prompt2) and len(prompt3) and len(answer):
+        return Question(prompt1=prompt1, prompt2=prompt2, prompt3=prompt3, answer=answer)
+    return None
+
+async def generate_question(article_name: str, summary: Optional[str] = None, check_cache: bool = True) -> Optional[Question]:
+    """
+    Generate a question for one article, from ``summary`` if already fetched.
+    With ``check_cache`` false the completion cache is not looked up, for
+    callers that already missed it, but a new completion is still cached.
+
+    The Wikipedia lookup runs in a worker thread and the LLM call waits for
+    a free slot and for the rate limiter.
+
+    Returns
+    -------
+    question: The question, or None if the article does not exist or the LLM
+        did not produce a usable one.
+
+    Raises
+    ------
+    GenerationError: If the LLM quota is used up.
+    """
+    print(f"Generating question for article {article_name}")
+    if summary is None:
+        summary = await asyncio.to_thread(fetch_summary, article_name)
+    if summary is None:
+        print(f"Article {article_name} does not exist. Skipping.", flush=True)
+        return None
+
+    prompt = build_prompt(summary)
 
-        while True:
-            print("Hitting LLM")
-            try: 
-                completion = llm.chat.completions.create(
-                    model="gpt-3.5-turbo",
+    if os.environ['OPENAI_USER_AGENT'] == 'DUMMY':
+        print(f"Dummy question for article {article_name}", flush=True)
+        return Question(prompt1="1. Clue 1", prompt2="2. Clue 2", prompt3="3. Clue 3", answer="ANSWER: Answer")
+
+    if llm_cache is not None and check_cache:
+        content = llm_cache.get(LLM_MODEL, prompt)
+        if content is not None:
+            print(f"Cached completion for article {article_name}", flush=True)
+            return parse_question(content)
+
+    while True:
+        print("Hitting LLM")
+        try: 
+            reserved = estimate_tokens(prompt) + LLM_COMPLETION_TOKENS
+            async with llm_slots:
+                await llm_limiter.acquire(reserved)
+                completion = await llm.chat.completions.create(
+                    model=LLM_MODEL,
                     # model="gpt-4.5-preview",
                     messages=[
                         {"role": "developer", "content": "You are a helpful assistant."},
@@ -130,41 +338,229 @@ def read_questions(articles: Articles)-> Questions:
                         }
                     ]
                 )
-                # print(completion.choices[0].message, flush=True)
-                print(completion.choices[0].message.content, flush=True)
-                content = completion.choices[0].message.content
-                print("=== LLM Raw Output ===", flush=True)
-                print(content, flush=True)
-
-                prompt1 = content.split("1.")[1].split("\n2.")[0].strip()
-                prompt2 = content.split("\n2.")[1].split("\n3.")[0].strip()
-                prompt3 = content.split("\n3.")[1].split("ANSWER:")[0].strip()
-                answer = content.split("ANSWER:")[1].strip()
-
-                if len(prompt1) and len(prompt2) and len(prompt3) and len(answer):
-                    question = Question(prompt1=prompt1, prompt2=prompt2, prompt3=prompt3, answer=answer)
-                    questions.append(question)
-                    break
-                else:
-                    print(f"Invalid completion for article {article_name}. Trying again.", flush=True)
-            
-            except RateLimitError as e:
-                if e.type == 'insufficient_quota':
-                    error = "Out of money"
-                    ok = False
-                    break
-                else:
-                    print("Rate limit error. Trying again.", flush=True)
-
-            except Exception as e:
-                print("❌ Exception from LLM or missing fields:", e)
-                break
-
-
-        if not ok:
-            break
+            if completion.usage is not None:
+                llm_limiter.settle(reserved, completion.usage.total_tokens)
+            # print(completion.choices[0].message, flush=True)
+            print(completion.choices[0].message.content, flush=True)
+            content = completion.choices[0].message.content
+            print("=== LLM Raw Output ===", flush=True)
+            print(content, flush=True)
+
+            question = parse_question(content)
+            if question is not None:
+                if llm_cache is not None:
+                    tokens = completion.usage.total_tokens if completion.usage is not None else 0
+                    llm_cache.put(LLM_MODEL, prompt, content, tokens)
+                return question
+            else:
+                print(f"Invalid completion for article {article_name}. Trying again.", flush=True)
+        
+        except RateLimitError as e:
+            if e.type == 'insufficient_quota':
+                raise GenerationError("Out of money")
+            else:
+                print("Rate limit error. Trying again.", flush=True)
+
+        except Exception as e:
+            print("❌ Exception from LLM or missing fields:", e)
+            return None
+
+async def generate_question_batch(article_names: list[str]) -> dict:
+    """
+    Generate questions for several articles with one completion.
+
+    Articles whose single-article completion is cached are answered from the
+    cache. The rest are sent together, and any the completion has no valid
+    question for are generated one by one.
+
+    Returns
+    -------
+    questions: The question or None, by article name. None for articles that
+        do not exist.
+
+    Raises
+    ------
+    GenerationError: If the LLM quota is used up.
+    """
+    summaries = await asyncio.gather(*[asyncio.to_thread(fetch_summary, name) for name in article_names])
+    summaries = dict(zip(article_names, summaries))
+
+    questions = {}
+    pending = {}
+    for name, summary in summaries.items():
+        if summary is None:
+            print(f"Article {name} does not exist. Skipping.", flush=True)
+            questions[name] = None
+            continue
+        content = llm_cache.get(LLM_MODEL, build_prompt(summary)) if llm_cache is not None else None
+        if content is not None:
+            questions[name] = parse_question(content)
+        else:
+            pending[name] = summary
+
+    if len(pending) > 1 and os.environ['OPENAI_USER_AGENT'] != 'DUMMY':
+        print(f"Hitting LLM for a batch of {len(pending)} articles")
+        prompt = build_batch_prompt(pending)
+        reserved = estimate_tokens(prompt) + LLM_COMPLETION_TOKENS * len(pending)
+        try:
+            async with llm_slots:
+                await llm_limiter.acquire(reserved)
+                completion = await llm.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=[
+                        {"role": "developer", "content": "You are a helpful assistant."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={"type": "json_object"}
+                )
+            tokens = 0
+            if completion.usage is not None:
+                llm_limiter.settle(reserved, completion.usage.total_tokens)
+                tokens = completion.usage.total_tokens
+            batch = parse_batch(completion.choices[0].message.content, pending)
+            batch_metrics["batched_requests"] += 1
+            batch_metrics["batched_questions"] += len(batch)
+            for name, question in batch.items():
+                questions[name] = question
+                if llm_cache is not None:
+                    llm_cache.put(LLM_MODEL, build_prompt(pending[name]), format_question(question), tokens // len(pending))
+        except RateLimitError as e:
+            if e.type == 'insufficient_quota':
+                raise GenerationError("Out of money")
+            print("Rate limit error on batch. Falling back to single articles.", flush=True)
+        except Exception as e:
+            print("❌ Exception from LLM on batch:", e)
+
+    missing = [name for name in pending if name not in questions]
+    if missing:
+        print(f"Generating {len(missing)} articles of the batch one by one", flush=True)
+        if len(pending) > 1:
+            batch_metrics["fallback_questions"] += len(missing)
+        # pending articles already missed the cache, looking again would count them twice
+        fallback = await asyncio.gather(*[generate_question(name, pending[name], check_cache=False) for name in missing])
+        questions.update(zip(missing, fallback))
+    return questions
+
+async def generate_titled_questions(article_names: list[str]):
+    """
+    Generate questions for a group of articles: one at a time, or all in one
+    completion with LLM_BATCH_SIZE above 1.
+
+    Returns
+    -------
+    questions: (article name, question or None) for each article.
+    """
+    # FOR TESTING PURPOSES WITHOUT USING OPENAI OR WIKIPEDIA
+    if DUMMY_MODE:
+        await asyncio.sleep(DUMMY_DELAY) # Simulate a long wait time
+        return [(name, Question(prompt1="prompt1", prompt2="prompt2", prompt3="prompt3", answer=name, title=name)) for name in article_names]
+
+    if len(article_names) > 1:
+        questions = await generate_question_batch(article_names)
+    else:
+        questions = {name: await generate_question(name) for name in article_names}
+    for name, question in questions.items():
+        if question is not None:
+            question.title = name
+    return [(name, questions[name]) for name in article_names]
+
+async def iter_questions(article_names: list[str]):
+    """
+    Generate questions for all articles concurrently, in groups of
+    LLM_BATCH_SIZE, and yield (article name, question or None) for each one
+    as soon as its group is done, in completion order. An article that does
+    not exist yields None and leaves the other groups running.
+
+    Raises
+    ------
+    GenerationError: If generation has to stop for the remaining articles,
+        which are then cancelled.
+    """
+    if DUMMY_MODE:
+        print("Testing in DUMMY MODE")
+    size = max(LLM_BATCH_SIZE, 1)
+    tasks = [
+        asyncio.create_task(generate_titled_questions(article_names[i:i + size]))
+        for i in range(0, len(article_names), size)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for item in await next_done:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def generate_questions(articles: Articles) -> Questions:
+    questions = []
+    ok = True
+    error = ""
+    print("reading questions")
+    try:
+        async for _, question in iter_questions(articles.article_names):
+            if question is not None:
+                questions.append(question)
+    except GenerationError as e:
+        ok = False
+        error = str(e)
     return Questions(questions=questions, ok=ok, error=error)
 
+class InflightStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse holding an inflight slot, given back once the response
+    is over: sent in full, cut short by the client, or never started because
+    the client left before the body.
+    """
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # stops generation of whatever the client will not read
+            await self.body_iterator.aclose()
+            inflight.release()
+
+@app.post("/questions/stream", tags=["questions"])
+async def stream_questions(articles: Articles):
+    """
+    Streaming variant of /questions: one JSON object per line (NDJSON), sent
+    as soon as each article's question is generated.
+
+    Each line is a QuestionItem. An article without a usable question is
+    sent with no question; if generation has to stop, the last line carries
+    ok=false and the error.
+    """
+    if not inflight.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many requests in flight",
+            headers={"Retry-After": str(RETRY_AFTER)}
+        )
+
+    async def lines():
+        try:
+            async for title, question in iter_questions(articles.article_names):
+                yield QuestionItem(title=title, question=question).json() + "\n"
+        except GenerationError as e:
+            yield QuestionItem(ok=False, error=str(e)).json() + "\n"
+
+    return InflightStreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/metrics", tags=["metrics"])
+def get_metrics():
+    """
+    Hit ratios of the completion and summary caches, the tokens and dollars
+    the completion cache saved, and how many questions batched completions
+    produced or left to single-article fallback.
+    """
+    return {
+        "llm_cache": llm_cache.metrics() if llm_cache is not None else None,
+        "summary_cache": {
+            "hits": summary_cache.hits,
+            "misses": summary_cache.misses,
+        } if summary_cache is not None else None,
+        "batching": batch_metrics,
+    }
+
 @app.get("/health", tags=["health"])
 def health_check():
     if os.environ['OPENAI_USER_AGENT'] == 'DUMMY':
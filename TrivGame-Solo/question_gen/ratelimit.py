@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute`` tokens per minute.
+
+    The balance may go negative when a caller is charged more than it
+    reserved, which delays later callers until the debt is paid back.
+
+    Attributes
+    ----------
+    per_minute : float
+        Refill rate, and the bucket's capacity.
+    tokens : float
+        Tokens currently available.
+    """
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        Seconds until ``amount`` tokens are available.
+        """
+        self.refill()
+        # a request larger than the bucket only waits for a full bucket
+        missing = min(amount, self.per_minute) - self.tokens
+        return max(missing, 0) * 60 / self.per_minute
+
+    def take(self, amount):
+        self.refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """
+    Limits LLM calls to a number of requests and of tokens per minute,
+    shared by every request the process is handling.
+
+    Callers reserve an estimate of the tokens a call will use with
+    ``acquire`` and correct it with ``settle`` once the response reports
+    the actual usage. Waiters are served in arrival order.
+
+    Attributes
+    ----------
+    requests : TokenBucket
+        Requests per minute.
+    tokens : TokenBucket
+        Tokens per minute.
+    """
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens):
+        """
+        Wait until one request and ``tokens`` tokens can be spent, and spend them.
+        """
+        async with self.lock:
+            while True:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+    def settle(self, reserved, used):
+        """
+        Charge the difference between the tokens a call used and reserved.
+        """
+        self.tokens.take(used - reserved)
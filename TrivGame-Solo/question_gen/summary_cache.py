@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class SummaryCache:
+    """
+    Wikipedia summaries by article title, persisted in a SQLite file.
+
+    Articles that do not exist are cached too, so they are not looked up
+    again either. Entries older than ``ttl`` are fetched again, and once
+    there are more than ``max_entries`` the least recently used ones are
+    dropped. The connection is shared by threads behind a lock, and WAL mode
+    lets other processes read the file while one writes.
+
+    Attributes
+    ----------
+    path : str
+        The SQLite file.
+    max_entries : int
+        Number of summaries to keep.
+    ttl : float
+        Seconds before a summary is fetched again.
+    hits, misses : int
+        Lookups answered from the file, and ones that had to fetch.
+    """
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                title TEXT PRIMARY KEY,
+                summary TEXT, -- NULL if the article does not exist
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self.conn.commit()
+
+    def get(self, title, fetch):
+        """
+        The summary of an article, fetched with ``fetch(title)`` on a miss.
+
+        Parameters
+        ----------
+        title : str
+            The article title.
+        fetch : callable
+            Returns the summary, or None if the article does not exist.
+
+        Returns
+        -------
+        summary : str or None
+            The summary, or None if the article does not exist.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT summary, fetched_at FROM summaries WHERE title = ?", (title,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                self.conn.execute("UPDATE summaries SET last_used = ? WHERE title = ?", (now, title))
+                self.conn.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+
+        # fetch outside the lock so other titles are not held up
+        summary = fetch(title)
+        self.put(title, summary)
+        return summary
+
+    def put(self, title, summary):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summaries (title, summary, fetched_at, last_used) VALUES (?, ?, ?, ?)",
+                (title, summary, now, now)
+            )
+            self.conn.execute("""
+                DELETE FROM summaries WHERE title IN (
+                    SELECT title FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
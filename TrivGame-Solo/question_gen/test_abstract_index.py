@@ -0,0 +1,54 @@
+import gzip
+
+from .abstract_index import AbstractIndex, build_index, normalize_title
+
+DUMP = """<feed>
+<doc>
+<title>Wikipedia: Abraham Lincoln</title>
+<url>https://en.wikipedia.org/wiki/Abraham_Lincoln</url>
+<abstract>Abraham Lincoln was the 16th president of the United States.</abstract>
+<links><sublink linktype="nav"><anchor>Early life</anchor><link>https://en.wikipedia.org/wiki/Abraham_Lincoln#Early_life</link></sublink></links>
+</doc>
+<doc>
+<title>Wikipedia: Zürich</title>
+<url>https://en.wikipedia.org/wiki/Z%C3%BCrich</url>
+<abstract>Zürich is the largest city in Switzerland.</abstract>
+</doc>
+<doc>
+<title>Wikipedia: Abraham Lincoln</title>
+<abstract>A later duplicate.</abstract>
+</doc>
+</feed>
+"""
+
+
+def build(tmp_path, compress=False):
+    path = tmp_path / ("abstracts.xml.gz" if compress else "abstracts.xml")
+    if compress:
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(DUMP)
+    else:
+        path.write_text(DUMP, encoding="utf-8")
+    prefix = str(tmp_path / "abstracts")
+    return build_index(str(path), prefix), prefix
+
+
+def test_normalize_title():
+    assert normalize_title("abraham_Lincoln ") == "Abraham Lincoln"
+    assert normalize_title("Pablo  Escobar") == "Pablo Escobar"
+
+def test_lookup(tmp_path):
+    count, prefix = build(tmp_path)
+    assert count == 2
+    index = AbstractIndex(prefix)
+    assert index.summary("Abraham_Lincoln") == "Abraham Lincoln was the 16th president of the United States."
+    assert index.summary("Zürich") == "Zürich is the largest city in Switzerland."
+    assert index.exists("abraham_Lincoln")
+    assert not index.exists("Pablo Escobar")
+    assert index.summary("Pablo Escobar") is None
+    index.close()
+
+def test_build_from_gzip(tmp_path):
+    count, prefix = build(tmp_path, compress=True)
+    assert count == 2
+    assert len(AbstractIndex(prefix)) == 2
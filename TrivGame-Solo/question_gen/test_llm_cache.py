@@ -0,0 +1,38 @@
+import pytest
+
+from .llm_cache import LLMCache, MemoryStore, SqliteStore, completion_key, make_store
+
+
+def test_key_depends_on_model_and_prompt():
+    assert completion_key("m1", "p") == completion_key("m1", "p")
+    assert completion_key("m1", "p") != completion_key("m2", "p")
+    assert completion_key("m1", "p") != completion_key("m1", "q")
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_least_recently_used_evicted(tmp_path, kind):
+    store = make_store(kind, str(tmp_path / "completions.sqlite"), max_entries=2)
+    store.put("a", "A", 1)
+    store.put("b", "B", 1)
+    store.get("a")
+    store.put("c", "C", 1)
+    assert store.get("b") is None
+    assert tuple(store.get("a")) == ("A", 1)
+    assert tuple(store.get("c")) == ("C", 1)
+
+def test_sqlite_store_persists(tmp_path):
+    path = str(tmp_path / "completions.sqlite")
+    SqliteStore(path, max_entries=10).put("a", "A", 5)
+    assert tuple(SqliteStore(path, max_entries=10).get("a")) == ("A", 5)
+
+def test_metrics():
+    cache = LLMCache(MemoryStore(10), cost_per_1k_tokens=2.0)
+    assert cache.get("model", "prompt") is None
+    cache.put("model", "prompt", "content", 500)
+    assert cache.get("model", "prompt") == "content"
+    assert cache.metrics() == {
+        "hits": 1,
+        "misses": 1,
+        "hit_ratio": 0.5,
+        "tokens_saved": 500,
+        "dollars_saved": 1.0,
+    }
@@ -1,8 +1,23 @@
+from fastapi import FastAPI, Request
 from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
+from openai import AsyncOpenAI
+import asyncio
+import json
 import pytest
+import threading
+import time
+from starlette.requests import ClientDisconnect
 
+from . import main
 from .main import app
+from .ratelimit import RateLimiter
+from .llm_cache import LLMCache, MemoryStore
+
+# generation runs on asyncio tasks
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
 
 # client = TestClient(app)
 
@@ -19,4 +34,199 @@ async def test_post_questions():
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         response = await client.post("/questions", json={"article_names": ["Pablo Escobar", 'Abraham_Lincoln']})
     assert response.status_code == 200
-    print(response.json())
\ No newline at end of file
+    print(response.json())
+
+@pytest.mark.anyio
+async def test_stream_questions(monkeypatch):
+    monkeypatch.setattr(main, "DUMMY_MODE", True)
+    monkeypatch.setattr(main, "DUMMY_DELAY", 0)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/questions/stream", json={"article_names": ["Pablo Escobar", "Abraham_Lincoln"]})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["title"] for line in lines) == ["Abraham_Lincoln", "Pablo Escobar"]
+    assert all(line["ok"] and line["question"] for line in lines)
+
+@pytest.mark.anyio
+async def test_stream_slot_released_when_client_leaves(monkeypatch):
+    monkeypatch.setattr(main, "DUMMY_MODE", True)
+    monkeypatch.setattr(main, "inflight", threading.BoundedSemaphore(1))
+    response = await main.stream_questions(main.Articles(article_names=["Pablo Escobar"]))
+
+    # the client is gone before the body starts
+    async def send(message):
+        raise OSError("Connection reset")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    with pytest.raises(ClientDisconnect):
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+    assert main.inflight.acquire(blocking=False)
+
+# A local stand-in for the OpenAI API that answers every completion after a fixed delay
+MOCK_LLM_LATENCY = 0.2
+mock_llm = FastAPI()
+mock_llm.state.in_flight = 0
+mock_llm.state.peak = 0
+mock_llm.state.calls = 0
+
+def mock_batch_content(prompt):
+    """
+    A JSON answer to a batch prompt, with an empty clue for titles starting
+    with "Broken" so they fail validation.
+    """
+    titles = [line[len("Title: "):] for line in prompt.splitlines() if line.startswith("Title: ")]
+    return json.dumps({"questions": [{
+        "title": title,
+        "prompt1": "" if title.startswith("Broken") else "Clue one",
+        "prompt2": "Clue two",
+        "prompt3": "Clue three",
+        "answer": "Answer",
+    } for title in titles]})
+
+@mock_llm.post("/v1/chat/completions")
+async def mock_completion(request: Request):
+    body = await request.json()
+    mock_llm.state.calls += 1
+    mock_llm.state.in_flight += 1
+    mock_llm.state.peak = max(mock_llm.state.peak, mock_llm.state.in_flight)
+    await asyncio.sleep(MOCK_LLM_LATENCY)
+    mock_llm.state.in_flight -= 1
+    content = "1. Clue one\n2. Clue two\n3. Clue three\nANSWER: Answer"
+    if body.get("response_format", {}).get("type") == "json_object":
+        content = mock_batch_content(body["messages"][-1]["content"])
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "mock",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": 50, "completion_tokens": 20, "total_tokens": 70},
+    }
+
+class MockPage:
+    summary = "An abstract."
+
+    def __init__(self, name):
+        self.name = name
+
+    def exists(self):
+        return not self.name.startswith("Missing")
+
+class MockWiki:
+    def page(self, name):
+        return MockPage(name)
+
+def use_mock_llm(monkeypatch, concurrency):
+    monkeypatch.setenv("OPENAI_USER_AGENT", "test")
+    monkeypatch.setattr(main, "wiki_wiki", MockWiki())
+    monkeypatch.setattr(main, "llm_slots", asyncio.Semaphore(concurrency))
+    monkeypatch.setattr(main, "llm_limiter", RateLimiter(1000, 10**6))
+    monkeypatch.setattr(main, "llm", AsyncOpenAI(
+        api_key="test",
+        base_url="http://mock-llm/v1",
+        http_client=AsyncClient(transport=ASGITransport(app=mock_llm), base_url="http://mock-llm/v1"),
+    ))
+    mock_llm.state.peak = 0
+    mock_llm.state.calls = 0
+
+async def post_batch(titles):
+    start = time.monotonic()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/questions", json={"article_names": titles})
+    return response, time.monotonic() - start
+
+@pytest.mark.anyio
+async def test_batch_latency_close_to_single_article(monkeypatch):
+    use_mock_llm(monkeypatch, concurrency=10)
+    titles = [f"Article {i}" for i in range(10)]
+    response, elapsed = await post_batch(titles)
+    assert response.status_code == 200
+    assert sorted(q["title"] for q in response.json()["questions"]) == sorted(titles)
+    # one round trip, not ten
+    assert elapsed < 3 * MOCK_LLM_LATENCY
+
+@pytest.mark.anyio
+async def test_llm_calls_bounded(monkeypatch):
+    use_mock_llm(monkeypatch, concurrency=2)
+    response, elapsed = await post_batch([f"Article {i}" for i in range(6)])
+    assert len(response.json()["questions"]) == 6
+    assert mock_llm.state.peak == 2
+    assert elapsed >= 3 * MOCK_LLM_LATENCY
+
+@pytest.mark.anyio
+async def test_replayed_batch_costs_no_llm_calls(monkeypatch):
+    use_mock_llm(monkeypatch, concurrency=10)
+    monkeypatch.setattr(main, "llm_cache", LLMCache(MemoryStore(100), cost_per_1k_tokens=2.0))
+    titles = ["Article 1", "Article 2", "Article 3"]
+    await post_batch(titles)
+    calls = mock_llm.state.calls
+    response, _ = await post_batch(titles)
+    assert len(response.json()["questions"]) == 3
+    assert mock_llm.state.calls == calls
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        metrics = (await client.get("/metrics")).json()["llm_cache"]
+    assert metrics["hit_ratio"] == 0.5
+    assert metrics["tokens_saved"] == 3 * 70
+
+@pytest.mark.anyio
+async def test_batched_prompting_throughput(monkeypatch):
+    # LLM calls are the bottleneck: two at a time, each taking MOCK_LLM_LATENCY
+    titles = [f"Article {i}" for i in range(20)]
+    use_mock_llm(monkeypatch, concurrency=2)
+    monkeypatch.setattr(main, "LLM_BATCH_SIZE", 1)
+    _, single_elapsed = await post_batch(titles)
+    single_calls = mock_llm.state.calls
+
+    use_mock_llm(monkeypatch, concurrency=2)
+    monkeypatch.setattr(main, "LLM_BATCH_SIZE", 5)
+    response, batched_elapsed = await post_batch(titles)
+    assert sorted(q["title"] for q in response.json()["questions"]) == sorted(titles)
+    assert mock_llm.state.calls == single_calls // 5
+    print(f"questions per minute: {len(titles) / single_elapsed * 60:.0f} single, {len(titles) / batched_elapsed * 60:.0f} batched")
+    assert batched_elapsed < single_elapsed / 2
+
+@pytest.mark.anyio
+async def test_invalid_batch_items_fall_back(monkeypatch):
+    use_mock_llm(monkeypatch, concurrency=4)
+    monkeypatch.setattr(main, "LLM_BATCH_SIZE", 4)
+    titles = ["Article 1", "Broken 2", "Article 3", "Broken 4"]
+    response, _ = await post_batch(titles)
+    questions = {q["title"]: q for q in response.json()["questions"]}
+    assert sorted(questions) == sorted(titles)
+    assert questions["Broken 2"]["prompt1"] == "Clue one"
+    # one batch call, then one call per invalid item
+    assert mock_llm.state.calls == 3
+
+@pytest.mark.anyio
+async def test_fallback_counts_each_miss_once(monkeypatch):
+    use_mock_llm(monkeypatch, concurrency=4)
+    monkeypatch.setattr(main, "LLM_BATCH_SIZE", 4)
+    monkeypatch.setattr(main, "llm_cache", LLMCache(MemoryStore(100), cost_per_1k_tokens=2.0))
+    await post_batch(["Article 1", "Broken 2", "Article 3", "Broken 4"])
+    assert main.llm_cache.metrics()["misses"] == 4
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("batch_size", [1, 2])
+async def test_missing_article_does_not_stop_batch(monkeypatch, batch_size):
+    use_mock_llm(monkeypatch, concurrency=4)
+    monkeypatch.setattr(main, "LLM_BATCH_SIZE", batch_size)
+    response, _ = await post_batch(["Article 1", "Missing 2", "Article 3", "Article 4"])
+    body = response.json()
+    assert body["ok"]
+    assert sorted(q["title"] for q in body["questions"]) == ["Article 1", "Article 3", "Article 4"]
+
+def test_parse_batch_validates_items():
+    content = json.dumps({"questions": [
+        {"title": "A", "prompt1": "1", "prompt2": "2", "prompt3": "3", "answer": "a"},
+        {"title": "B", "prompt1": "1", "prompt2": "2", "prompt3": "3"},
+        {"title": "C", "prompt1": "1", "prompt2": "2", "prompt3": "3", "answer": "c"},
+        "not an object",
+    ]})
+    assert list(main.parse_batch(content, {"A", "B"})) == ["A"]
+    assert main.parse_batch("not json", {"A"}) == {}
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from .ratelimit import RateLimiter, TokenBucket
+
+
+def test_bucket_waits_for_missing_tokens():
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    # one token per second
+    assert 1.9 < bucket.wait_time(2) <= 2
+
+def test_oversized_request_waits_for_full_bucket():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(100) == 0
+
+def test_limiter_paces_requests():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=100000)
+    limiter.requests.take(600)
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(2):
+            await limiter.acquire(10)
+        return time.monotonic() - start
+
+    # ten requests per second once the burst is spent
+    assert asyncio.run(run()) >= 0.18
+
+def test_settle_charges_extra_tokens():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    asyncio.run(limiter.acquire(100))
+    limiter.settle(reserved=100, used=300)
+    assert limiter.tokens.tokens < 301
@@ -0,0 +1,49 @@
+from .summary_cache import SummaryCache
+
+
+class CountingFetch:
+    def __init__(self, summaries):
+        self.summaries = summaries
+        self.calls = []
+
+    def __call__(self, title):
+        self.calls.append(title)
+        return self.summaries.get(title)
+
+
+def test_repeat_lookups_skip_fetch(tmp_path):
+    fetch = CountingFetch({"Paris": "Capital of France."})
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite"), max_entries=10, ttl=60)
+    assert cache.get("Paris", fetch) == "Capital of France."
+    assert cache.get("Paris", fetch) == "Capital of France."
+    # missing articles are remembered too
+    assert cache.get("Nowhere", fetch) is None
+    assert cache.get("Nowhere", fetch) is None
+    assert fetch.calls == ["Paris", "Nowhere"]
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "summaries.sqlite")
+    SummaryCache(path, max_entries=10, ttl=60).get("Paris", CountingFetch({"Paris": "Capital."}))
+    fetch = CountingFetch({})
+    assert SummaryCache(path, max_entries=10, ttl=60).get("Paris", fetch) == "Capital."
+    assert fetch.calls == []
+
+def test_expired_entries_fetched_again(tmp_path):
+    fetch = CountingFetch({"Paris": "Capital."})
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite"), max_entries=10, ttl=-1)
+    cache.get("Paris", fetch)
+    cache.get("Paris", fetch)
+    assert fetch.calls == ["Paris", "Paris"]
+
+def test_least_recently_used_evicted(tmp_path):
+    fetch = CountingFetch({"A": "a", "B": "b", "C": "c"})
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite"), max_entries=2, ttl=60)
+    cache.get("A", fetch)
+    cache.get("B", fetch)
+    cache.get("A", fetch)
+    cache.get("C", fetch)
+    assert len(cache) == 2
+    cache.get("A", fetch)
+    cache.get("B", fetch)
+    assert fetch.calls == ["A", "B", "C", "B"]
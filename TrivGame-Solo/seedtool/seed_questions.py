@@ -4,10 +4,30 @@ import wikipediaapi
 from os import environ
 import dotenv
 import json
+import os
+import sys
 dotenv.load_dotenv()
 
+# Share question-gen's on-disk summary cache so seeded articles are not fetched again;
+# docker-compose mounts db/data into question-gen, which reads the same file
+SEEDTOOL_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SEEDTOOL_DIR, "..", "question_gen"))
+from summary_cache import SummaryCache
+
 wiki_wiki = wikipediaapi.Wikipedia(user_agent=environ['OPENAI_USER_AGENT'], language='en')
 llm = OpenAI()
+summary_cache = SummaryCache(
+    environ.get("SUMMARY_CACHE_PATH", os.path.join(SEEDTOOL_DIR, "db", "data", "summaries.sqlite")),
+    int(environ.get("SUMMARY_CACHE_MAX_ENTRIES", 100000)),
+    int(environ.get("SUMMARY_CACHE_TTL", 30 * 24 * 60 * 60)) # in seconds
+)
+
+def fetch_page_summary(article_name):
+    page = wiki_wiki.page(article_name)
+    if not page.exists():
+        return None
+    return page.summary
+
 def sample_df(df, category_column, n=10):
     """
     Should only run after seed.py has been run to populate the database with articles.
@@ -48,10 +68,12 @@ def seed_questions(sampled_df):
     for i, row in sampled_df.iterrows():
         print(f"Generating question for article {row['title']}")
         article_name = row["title"]
-        page = wiki_wiki.page(article_name)
-        
+        summary = summary_cache.get(article_name, fetch_page_summary)
+        if summary is None:
+            print(f"Article {article_name} does not exist. Skipping.")
+            continue
 
-        prompt = "Create a NAQT style triva prompt using 3 clues which contain one fact each in decreasing obscurity given the following abstract:\n" + page.summary
+        prompt = "Create a NAQT style triva prompt using 3 clues which contain one fact each in decreasing obscurity given the following abstract:\n" + summary
         prompt += "\n Each clue should be less than 15 words long. The first clue should be prefaced with '1.', the second with '2.', and the third with '3.'. The answer should be prefaced with 'ANSWER:'."
         
         # NOTE: The following line actually makes the question generation significantly worse if used instead of the above line.